@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        import api.signals  # --> Count database connections and queries per worker
+        from api import metrics
+
+        metrics.install()  # --> Time DRF serializers and renderers (api.metrics)
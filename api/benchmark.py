@@ -0,0 +1,177 @@
+"""
+In-process load drivers shared by the bench_* management commands
+- run_wsgi(): a fixed pool of worker threads calling a WSGI app
+- run_asgi(): one event loop with N requests in flight on an ASGI app
+Both return a Result; no server or network is involved.
+"""
+
+import asyncio
+import io
+import threading
+import time
+from statistics import quantiles
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+class Result:
+    def __init__(self, elapsed, timings, statuses):
+        self.elapsed = elapsed
+        self.timings = timings
+        self.statuses = statuses
+
+    @property
+    def throughput(self):
+        return len(self.timings) / self.elapsed if self.elapsed else 0
+
+    def percentile(self, p):
+        """---p-th percentile latency in ms (p in 1..99)---"""
+        if len(self.timings) < 2:
+            return self.timings[0] * 1000 if self.timings else 0
+        return quantiles([t * 1000 for t in self.timings], n=100)[p - 1]
+
+
+def wsgi_environ(path, host="127.0.0.1", headers=None):
+    path, _, query = path.partition("?")
+    environ = {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "SERVER_NAME": host,
+        "SERVER_PORT": "80",
+        "HTTP_HOST": host,
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "wsgi.input": io.BytesIO(),
+        "wsgi.errors": io.StringIO(),
+        "wsgi.url_scheme": "http",
+        "wsgi.version": (1, 0),
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for name, value in (headers or {}).items():
+        environ[f"HTTP_{name.upper().replace('-', '_')}"] = value
+    return environ
+
+
+def run_wsgi(app, paths, workers, host="127.0.0.1", headers=None):
+    """
+    Send every path in paths through app from workers threads
+    - Clients may queue any number of requests; the worker pool is the limit
+    - Each worker closes its database connections when it is done
+    """
+
+    timings, statuses = [], set()
+    remaining = iter(paths)
+    lock = threading.Lock()
+
+    def work():
+        try:
+            while True:
+                with lock:
+                    path = next(remaining, None)
+                if path is None:
+                    return
+                environ = wsgi_environ(path, host, headers)
+                start = time.perf_counter()
+                status = []
+                body = app(environ, lambda s, h, exc=None: status.append(s))
+                b"".join(body)
+                body.close()
+                timings.append(time.perf_counter() - start)
+                statuses.add(status[0].split()[0])
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=work) for _ in range(workers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return Result(time.perf_counter() - start, timings, statuses)
+
+
+async def run_asgi(app, paths, concurrency, host="127.0.0.1"):
+    """---Send every path in paths through app, at most concurrency at a time---"""
+
+    timings, statuses = [], set()
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(path):
+        path, _, query = path.partition("?")
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "headers": [(b"host", host.encode())],
+            "client": ("127.0.0.1", 0),
+            "server": (host, 80),
+        }
+        sent_body = []
+
+        async def receive():
+            if not sent_body:
+                sent_body.append(True)
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await asyncio.Future()  # --> a connection that stays open, like a real client
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.add(str(message["status"]))
+
+        async with limit:
+            start = time.perf_counter()
+            await app(scope, receive, send)
+            timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(path) for path in paths))
+    return Result(time.perf_counter() - start, timings, statuses)
+
+
+def cold_paths(path, count, cold=True):
+    """---count copies of path, each with a unique query string when cold---"""
+
+    if not cold:
+        return [path] * count
+    separator = "&" if "?" in path else "?"
+    return [f"{path}{separator}nocache={number}" for number in range(count)]
+
+
+def add_query_latency(seconds):
+    """---Sleep before every query on every connection (simulated round trip)---"""
+
+    if seconds <= 0:
+        return
+
+    def slow_round_trip(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def add_wrapper(connection, **kwargs):
+        if slow_round_trip not in connection.execute_wrappers:
+            connection.execute_wrappers.append(slow_round_trip)
+
+    # --> Every connection, including the ones worker threads open later
+    connection_created.connect(add_wrapper, weak=False)
+    for connection in connections.all():
+        add_wrapper(connection)
+
+
+def add_connect_latency(seconds):
+    """---Sleep whenever a new connection is opened (simulated TCP/TLS/auth handshake)---"""
+
+    if seconds <= 0:
+        return
+
+    def slow_handshake(connection, **kwargs):
+        time.sleep(seconds)
+
+    connection_created.connect(slow_handshake, weak=False)
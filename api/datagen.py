@@ -0,0 +1,426 @@
+"""
+Synthetic, reproducible library datasets for benchmarking
+- Same seed + same sizes = same rows (names, ISBNs, loans, fines), with
+  loan dates counted back from the day it runs
+- Everything goes in through bulk_create in batches; memory stays flat
+  apart from one small array per book/member
+- Borrowing is skewed: a few books and members account for most loans,
+  like a real circulation desk
+- Loan history is backdated over the last N days: most loans come back on
+  time, some late (with fines, mostly paid), some are still out and a part
+  of those are overdue
+"""
+
+import random
+import secrets
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from catalog.cache import invalidate
+from catalog.importers import REFRESH_SEARCH_VECTOR_SQL
+from catalog.models import Author, Book, Category
+from catalog.search import book_index, uses_postgres_search
+from circulation import analytics
+from circulation.fines import accrue_fines, fine_amount, fine_policy
+from circulation.models import BorrowRecord, Fine
+from circulation.popularity import rollup
+from users.models import Member, User
+
+
+# --> Generated accounts live under this domain, so a second run can detect them
+EMAIL_DOMAIN = "members.example.org"
+LIBRARIAN_EMAIL = f"librarian@{EMAIL_DOMAIN}"
+LOAN_DAYS = 14
+
+CATEGORIES = [
+    "Fiction", "Mystery", "Thriller", "Science Fiction", "Fantasy", "Romance",
+    "Historical Fiction", "Horror", "Biography", "History", "Science",
+    "Mathematics", "Computer Science", "Philosophy", "Psychology", "Economics",
+    "Politics", "Travel", "Cooking", "Art", "Music", "Poetry", "Children",
+    "Young Adult",
+]
+FIRST_NAMES = [
+    "Amina", "Arif", "Ayesha", "Carlos", "Chen", "David", "Elena", "Farhan",
+    "Fatima", "Grace", "Hannah", "Hiro", "Imran", "Isabel", "James", "Jamal",
+    "Julia", "Karim", "Laila", "Liam", "Maria", "Mei", "Nadia", "Noah",
+    "Olivia", "Omar", "Priya", "Rafael", "Rahim", "Sara", "Sofia", "Tanvir",
+    "Tomas", "Yusuf", "Zara",
+]
+LAST_NAMES = [
+    "Ahmed", "Ali", "Anderson", "Begum", "Chowdhury", "Costa", "Das", "Fischer",
+    "Garcia", "Haque", "Hossain", "Islam", "Ivanova", "Kim", "Khan", "Lee",
+    "Lopez", "Martin", "Miah", "Nakamura", "Novak", "Okafor", "Patel",
+    "Rahman", "Rossi", "Sarkar", "Schmidt", "Silva", "Smith", "Tanaka",
+    "Uddin", "Wang", "Williams",
+]
+TITLE_WORDS = [
+    "River", "Night", "Garden", "Silent", "Empire", "Shadow", "Glass", "Winter",
+    "Lost", "Golden", "Storm", "Memory", "City", "Ocean", "Fire", "Secret",
+    "Forest", "Light", "Machine", "House", "Road", "Island", "Stone", "Letters",
+    "Mountain", "Dream", "Clock", "Mirror", "Harvest", "Signal", "Crown",
+    "Bridge", "Desert", "Song", "Theory", "Journey", "Voices", "Atlas",
+    "Python", "Django", "Algorithms", "Data", "History", "Science", "Art",
+]
+PUBLISHERS = [
+    "Penguin", "HarperCollins", "Macmillan", "Hachette", "Simon & Schuster",
+    "Oxford University Press", "Cambridge University Press", "O'Reilly",
+    "No Starch Press", "Pearson", "Springer", "Vintage", "Bloomsbury",
+]
+
+DEFAULT_SIZES = {
+    "authors": 2000,
+    "categories": len(CATEGORIES),
+    "books": 100000,
+    "members": 5000,
+    "loans": 200000,
+    "days": 365,
+}
+
+
+def isbn13(number):
+    """---A valid, unique ISBN-13 in the 979-8 range for the n-th generated book---"""
+
+    digits = f"9798{number:08d}"
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits))
+    return digits + str((10 - total % 10) % 10)
+
+
+@contextmanager
+def backdating(*fields):
+    """---Let bulk inserts write auto_now_add fields (loan history is in the past)---"""
+
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field, _ in saved:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
+
+
+class LibraryDataGenerator:
+    """
+    Fill the database with a synthetic library
+    - generate() runs every step in order and returns the row counts
+    - skew: exponent for the popularity curve (1 = uniform, higher = a
+      smaller set of books gets most loans)
+    - report(step, rows, seconds) is called after each step
+    - password: shared by every generated account; a random one when not
+      given (read it back from .password)
+    """
+
+    def __init__(
+        self,
+        seed=42,
+        sizes=None,
+        batch_size=5000,
+        skew=3.0,
+        password=None,
+        report=None,
+    ):
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.sizes = {**DEFAULT_SIZES, **(sizes or {})}
+        self.batch_size = batch_size
+        self.skew = skew
+        self.password = password or secrets.token_urlsafe(12)
+        self.report = report or (lambda step, rows, seconds: None)
+        self.today = timezone.now().date()
+        self.stats = {}
+
+    def generate(self):
+        steps = (
+            self.categories,
+            self.authors,
+            self.books,
+            self.members,
+            self.loans,
+            self.fines,
+            self.finish,
+        )
+        for step in steps:
+            started = time.perf_counter()
+            rows = step()
+            if rows is not None:
+                self.stats[step.__name__] = rows
+            self.report(step.__name__, rows, time.perf_counter() - started)
+        return self.stats
+
+    def batches(self, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def pick(self, count, skew):
+        """---An index in range(count), small indexes much more likely when skew > 1---"""
+
+        return min(int(count * self.rng.random() ** skew), count - 1)
+
+    # --> Catalog --------------------------------------------------------
+
+    def categories(self):
+        names = []
+        for number in range(self.sizes["categories"]):
+            name = CATEGORIES[number % len(CATEGORIES)]
+            if number >= len(CATEGORIES):
+                name = f"{name} {number // len(CATEGORIES) + 1}"
+            names.append(name)
+        existing = set(Category.objects.filter(name__in=names).values_list("name", flat=True))
+        Category.objects.bulk_create(
+            [
+                Category(name=name, description=f"{name} books")
+                for name in names
+                if name not in existing
+            ]
+        )
+        self.category_ids = list(
+            Category.objects.filter(name__in=names).order_by("pk").values_list("pk", flat=True)
+        )
+        return len(names) - len(existing)
+
+    def authors(self):
+        rng = self.rng
+        created = 0
+        for batch in self.batches(range(self.sizes["authors"])):
+            authors = []
+            for _ in batch:
+                born = self.today - timedelta(days=rng.randint(25 * 365, 120 * 365))
+                died = None
+                if rng.random() < 0.3:
+                    died = born + timedelta(days=rng.randint(40 * 365, 90 * 365))
+                authors.append(
+                    Author(
+                        first_name=rng.choice(FIRST_NAMES),
+                        last_name=rng.choice(LAST_NAMES),
+                        biography="A writer of many things.",
+                        birth_date=born,
+                        death_date=died if died and died < self.today else None,
+                    )
+                )
+            created += len(Author.objects.bulk_create(authors))
+        # --> The newest authors are ours, whatever was in the table before
+        self.author_ids = list(
+            Author.objects.order_by("-pk").values_list("pk", flat=True)[: self.sizes["authors"]]
+        )
+        return created
+
+    def books(self):
+        rng = self.rng
+        created = 0
+        for batch in self.batches(range(self.sizes["books"])):
+            books = []
+            for number in batch:
+                words = rng.sample(TITLE_WORDS, rng.randint(2, 4))
+                copies = 1 + self.pick(8, 2)  # --> Mostly 1-2 copies, a few up to 8
+                books.append(
+                    Book(
+                        title=" ".join(["The"] + words if rng.random() < 0.3 else words),
+                        subtitle=(
+                            None
+                            if rng.random() < 0.6
+                            else f"A {rng.choice(TITLE_WORDS).lower()} story"
+                        ),
+                        isbn=isbn13(number),
+                        description=" ".join(rng.choices(TITLE_WORDS, k=12)).lower(),
+                        category_id=rng.choice(self.category_ids),
+                        author_id=self.author_ids[self.pick(len(self.author_ids), 1.5)],
+                        publication_date=self.today - timedelta(days=rng.randint(30, 80 * 365)),
+                        publisher=rng.choice(PUBLISHERS),
+                        total_copies=copies,
+                        available_copies=copies,
+                    )
+                )
+            with transaction.atomic():
+                Book.objects.bulk_create(books, ignore_conflicts=True)
+                if uses_postgres_search():
+                    with connection.cursor() as cursor:
+                        cursor.execute(REFRESH_SEARCH_VECTOR_SQL, [[book.isbn for book in books]])
+            created += len(books)
+
+        # --> pk and stock of every generated book, in generation (= ISBN) order
+        self.book_ids, self.copies = array("q"), array("H")
+        generated = (
+            Book.objects.filter(isbn__startswith="9798")
+            .order_by("isbn")
+            .values_list("pk", "total_copies")
+        )
+        for pk, copies in generated.iterator(chunk_size=self.batch_size):
+            self.book_ids.append(pk)
+            self.copies.append(copies)
+        return created
+
+    # --> Members ----------------------------------------------------------
+
+    def members(self):
+        rng = self.rng
+        # --> One hash for everyone: hashing a million passwords would dominate the run
+        password = make_password(self.password)
+        User.objects.get_or_create(
+            email=LIBRARIAN_EMAIL,
+            defaults={
+                "is_staff": True,
+                "password": password,
+                "first_name": "Head",
+                "last_name": "Librarian",
+            },
+        )
+        self.member_ids = array("q")
+        for batch in self.batches(range(self.sizes["members"])):
+            users = [
+                User(
+                    email=f"member{number}@{EMAIL_DOMAIN}",
+                    first_name=rng.choice(FIRST_NAMES),
+                    last_name=rng.choice(LAST_NAMES),
+                    password=password,
+                )
+                for number in batch
+            ]
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+                # --> Re-read ids: not every backend returns them from bulk inserts
+                user_ids = list(
+                    User.objects.filter(email__in=[user.email for user in users])
+                    .order_by("pk")
+                    .values_list("pk", flat=True)
+                )
+                Member.objects.bulk_create(
+                    [
+                        Member(
+                            user_id=user_id,
+                            phone_number=f"+8801{rng.randint(300000000, 999999999)}",
+                            address=f"{rng.randint(1, 200)} {rng.choice(TITLE_WORDS)} Road",
+                        )
+                        for user_id in user_ids
+                    ]
+                )
+            self.member_ids.extend(
+                Member.objects.filter(user_id__in=user_ids)
+                .order_by("pk")
+                .values_list("pk", flat=True)
+            )
+        return len(self.member_ids)
+
+    # --> Circulation ------------------------------------------------------
+
+    def loan_rows(self):
+        """
+        Yield BorrowRecords oldest first
+        - 75% back on time, 17% late, 8% not returned; returns that would
+          land after today are still out
+        - a loan still out on a book with no copy left is skipped
+        """
+
+        rng = self.rng
+        days = self.sizes["days"]
+        start = self.today - timedelta(days=days)
+        per_day = [0] * days
+        for _ in range(self.sizes["loans"]):
+            # --> More recent days are busier
+            per_day[min(int(days * rng.random() ** 0.8), days - 1)] += 1
+
+        out = array("H", bytes(2 * len(self.book_ids)))
+        self.skipped = 0
+        for offset, count in enumerate(per_day):
+            borrowed = start + timedelta(days=offset)
+            due = borrowed + timedelta(days=LOAN_DAYS)
+            for _ in range(count):
+                position = self.pick(len(self.book_ids), self.skew)
+                outcome = rng.random()
+                if outcome < 0.75:
+                    returned = borrowed + timedelta(days=rng.randint(0, LOAN_DAYS))
+                elif outcome < 0.92:
+                    returned = due + timedelta(days=rng.randint(1, 45))
+                else:
+                    returned = None
+                if returned is not None and returned > self.today:
+                    returned = None
+                if returned is None:
+                    if out[position] >= self.copies[position]:
+                        self.skipped += 1
+                        continue
+                    out[position] += 1
+                yield BorrowRecord(
+                    member_id=self.member_ids[self.pick(len(self.member_ids), 2)],
+                    book_id=self.book_ids[position],
+                    borrow_date=borrowed,
+                    due_date=due,
+                    return_date=returned,
+                    is_returned=returned is not None,
+                )
+        self.out = out
+
+    def loans(self):
+        self.first_loan = BorrowRecord.objects.aggregate(last=Max("pk"))["last"] or 0
+        created = 0
+        with backdating(BorrowRecord._meta.get_field("borrow_date")):
+            for batch in self.batches(self.loan_rows()):
+                BorrowRecord.objects.bulk_create(batch)
+                created += len(batch)
+
+        # --> Books with copies out: available = total - out, one UPDATE per count
+        by_count = {}
+        for position, count in enumerate(self.out):
+            if count:
+                by_count.setdefault(count, []).append(self.book_ids[position])
+        for count, book_ids in by_count.items():
+            for batch in self.batches(book_ids):
+                Book.objects.filter(pk__in=batch).update(
+                    available_copies=F("total_copies") - count
+                )
+        return created
+
+    def fines(self):
+        """---Fines for loans returned late (70% paid) and for overdue loans still out---"""
+
+        rate, cap = fine_policy()
+        late = (
+            BorrowRecord.objects.filter(
+                pk__gt=self.first_loan, is_returned=True, return_date__gt=F("due_date")
+            )
+            .order_by("pk")
+            .values_list("pk", "due_date", "return_date")
+        )
+        created = 0
+        for batch in self.batches(late.iterator(chunk_size=self.batch_size)):
+            fines = []
+            for pk, due, returned in batch:
+                paid = (pk * 2654435761 + self.seed) % 10 < 7
+                fines.append(
+                    Fine(
+                        borrow_record_id=pk,
+                        amount=fine_amount(due, returned, rate, cap),
+                        paid=paid,
+                        paid_at=(
+                            timezone.make_aware(datetime(returned.year, returned.month, returned.day, 12))
+                            if paid
+                            else None
+                        ),
+                    )
+                )
+            Fine.objects.bulk_create(fines, ignore_conflicts=True)
+            created += len(fines)
+        return created + accrue_fines(batch_size=self.batch_size)["upserted"]
+
+    def finish(self):
+        # --> bulk_create skipped the popularity signals and the circulation rollups
+        rollup(batch_size=self.batch_size)
+        analytics.rebuild(batch_size=self.batch_size)
+        if not uses_postgres_search():
+            book_index.reset()
+        invalidate(
+            "authors", "authors:details", "categories", "categories:details",
+            "books", "books:details",
+        )
@@ -0,0 +1,96 @@
+"""
+Database connection counters for this worker process
+- opened: new connections made (each one paid a TCP/TLS/auth handshake)
+- requests: requests finished; 1 - opened / requests is the reuse ratio
+- open: connections currently held by this process's threads
+- pool: psycopg_pool's own counters when DB_CONNECTION_MODE=pool (there
+  opened counts checkouts; pool.connections_num counts real connections)
+Counts are per process; sum them across workers when monitoring.
+"""
+
+import os
+import threading
+import time
+import weakref
+
+from django.db import connections
+
+
+_lock = threading.Lock()
+_started = time.time()
+_requests = 0
+_opened = {}
+_live = weakref.WeakSet()
+
+
+def connection_opened(connection):
+    with _lock:
+        _opened[connection.alias] = _opened.get(connection.alias, 0) + 1
+        _live.add(connection)
+
+
+def request_finished():
+    global _requests
+    with _lock:
+        _requests += 1
+
+
+def counters():
+    """---(requests, {alias: connections opened}) so far---"""
+
+    with _lock:
+        return _requests, dict(_opened)
+
+
+def _mode(settings_dict):
+    if settings_dict.get("OPTIONS", {}).get("pool"):
+        return "pool"
+    return "persistent" if settings_dict.get("CONN_MAX_AGE") else "none"
+
+
+def _pool_stats(connection):
+    if _mode(connection.settings_dict) != "pool":
+        return None
+    pool = connection.pool
+    return {"min_size": pool.min_size, "max_size": pool.max_size, **pool.get_stats()}
+
+
+def snapshot():
+    """---Everything above, per database alias, for the health endpoint---"""
+
+    with _lock:
+        requests, opened = _requests, dict(_opened)
+        live = list(_live)
+
+    databases = {}
+    for alias in connections:
+        settings_dict = connections.settings[alias]
+        count = opened.get(alias, 0)
+        databases[alias] = {
+            "vendor": connections[alias].vendor,
+            "mode": _mode(settings_dict),
+            "conn_max_age": settings_dict.get("CONN_MAX_AGE"),
+            "health_checks": settings_dict.get("CONN_HEALTH_CHECKS", False),
+            "opened": count,
+            "open": sum(
+                1 for wrapper in live if wrapper.alias == alias and wrapper.connection is not None
+            ),
+            "reuse_ratio": round(1 - count / requests, 3) if requests else None,
+            "pool": _pool_stats(connections[alias]),
+        }
+    return {
+        "pid": os.getpid(),
+        "uptime": round(time.time() - _started),
+        "requests": requests,
+        "databases": databases,
+    }
+
+
+def ping(alias="default"):
+    """---Round-trip time of SELECT 1 in ms; raises if the database is unreachable---"""
+
+    start = time.perf_counter()
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    return round((time.perf_counter() - start) * 1000, 2)
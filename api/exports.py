@@ -0,0 +1,153 @@
+import csv
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from catalog.models import Author, Book
+from circulation.models import BorrowRecord, Fine
+
+
+# --> Rows fetched per round trip; PostgreSQL streams them through a server-side cursor
+CHUNK_SIZE = 2000
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+# --> name: (model, [(column, lookup), ...], field the borrow_date range applies to)
+EXPORTS = {
+    "books": (
+        Book,
+        [
+            ("id", "id"),
+            ("isbn", "isbn"),
+            ("title", "title"),
+            ("subtitle", "subtitle"),
+            ("author_id", "author_id"),
+            ("author_first_name", "author__first_name"),
+            ("author_last_name", "author__last_name"),
+            ("category", "category__name"),
+            ("publisher", "publisher"),
+            ("publication_date", "publication_date"),
+            ("total_copies", "total_copies"),
+            ("available_copies", "available_copies"),
+        ],
+        None,
+    ),
+    "authors": (
+        Author,
+        [
+            ("id", "id"),
+            ("first_name", "first_name"),
+            ("last_name", "last_name"),
+            ("birth_date", "birth_date"),
+            ("death_date", "death_date"),
+        ],
+        None,
+    ),
+    "borrow-records": (
+        BorrowRecord,
+        [
+            ("id", "id"),
+            ("member_id", "member_id"),
+            ("member_email", "member__user__email"),
+            ("book_id", "book_id"),
+            ("book_isbn", "book__isbn"),
+            ("borrow_date", "borrow_date"),
+            ("due_date", "due_date"),
+            ("return_date", "return_date"),
+            ("is_returned", "is_returned"),
+        ],
+        "borrow_date",
+    ),
+    "fines": (
+        Fine,
+        [
+            ("id", "id"),
+            ("borrow_record_id", "borrow_record_id"),
+            ("member_email", "borrow_record__member__user__email"),
+            ("borrow_date", "borrow_record__borrow_date"),
+            ("amount", "amount"),
+            ("paid", "paid"),
+            ("paid_at", "paid_at"),
+        ],
+        "borrow_record__borrow_date",
+    ),
+}
+
+
+def export_rows(name, borrow_date_from=None, borrow_date_to=None, chunk_size=CHUNK_SIZE):
+    """
+    Return (columns, row iterator) for one export
+    - values_list + iterator(): tuples straight off the cursor, nothing cached
+    - Primary key order, so re-running with the same filters is reproducible
+    """
+
+    model, fields, date_field = EXPORTS[name]
+    queryset = model.objects.order_by("pk")
+    if date_field:
+        if borrow_date_from:
+            queryset = queryset.filter(**{f"{date_field}__gte": borrow_date_from})
+        if borrow_date_to:
+            queryset = queryset.filter(**{f"{date_field}__lte": borrow_date_to})
+
+    columns = [column for column, _ in fields]
+    rows = queryset.values_list(*[lookup for _, lookup in fields]).iterator(
+        chunk_size=chunk_size
+    )
+    return columns, rows
+
+
+class _Line:
+    """---File-like target for csv.writer that hands back the line it was given---"""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(columns, rows):
+    writer = csv.writer(_Line())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def render_ndjson(columns, rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(columns, row))) + "\n"
+
+
+RENDERERS = {"csv": render_csv, "ndjson": render_ndjson}
+
+
+def render(fmt, columns, rows, lines_per_chunk=500):
+    """---Yield the export as text, a few hundred lines per chunk---"""
+
+    buffer = []
+    for line in RENDERERS[fmt](columns, rows):
+        buffer.append(line)
+        if len(buffer) >= lines_per_chunk:
+            yield "".join(buffer)
+            buffer = []
+    if buffer:
+        yield "".join(buffer)
+
+
+async def stream_async(chunks):
+    """
+    The same chunks as an async iterator, for responses served by the ASGI app
+    - Given a sync iterator, Django's ASGI handler reads it to the end before
+      sending a byte; here every chunk is sent as soon as it is rendered
+    - Chunks are rendered in the request's sync thread, so the cursor stays on
+      the connection that opened it
+    """
+
+    chunks = iter(chunks)
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while True:
+        chunk = await next_chunk(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
@@ -0,0 +1,252 @@
+"""
+Outbound email through a database outbox
+- With EMAIL_BACKEND = QueuedEmailBackend (opt-in; it needs a worker),
+  send_mail(), djoser's activation and password reset emails and anything
+  else built on EmailMessage only INSERT an OutboundEmail row, inside the
+  request's transaction, so a rolled-back signup sends nothing and no
+  request waits on SMTP
+- Deliverer (manage.py send_queued_email) claims due rows in batches and
+  sends them through LIBRARY_EMAIL["DELIVERY_BACKEND"] over one connection
+  that stays open while there is mail to send
+- Failed sends are retried with exponential backoff and jitter; 5xx SMTP
+  replies and messages out of attempts are marked failed
+- Claiming pushes next_attempt_at past the send window (LEASE), so several
+  workers never send the same row and a crashed worker's batch comes back;
+  without SKIP LOCKED (SQLite) the lease is a conditional UPDATE per row
+"""
+
+import base64
+import random
+import smtplib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from api.models import OutboundEmail
+
+
+def email_config():
+    config = getattr(settings, "LIBRARY_EMAIL", {})
+    return {
+        "DELIVERY_BACKEND": config.get(
+            "DELIVERY_BACKEND", "django.core.mail.backends.smtp.EmailBackend"
+        ),
+        "BATCH_SIZE": config.get("BATCH_SIZE", 100),
+        "MAX_ATTEMPTS": config.get("MAX_ATTEMPTS", 8),
+        "BACKOFF": config.get("BACKOFF", 30),
+        "MAX_BACKOFF": config.get("MAX_BACKOFF", 6 * 3600),
+        "LEASE": config.get("LEASE", 300),
+        "POLL_INTERVAL": config.get("POLL_INTERVAL", 2),
+    }
+
+
+def _attachment(attachment):
+    if not isinstance(attachment, tuple):
+        raise ValueError("Only (filename, content, mimetype) attachments can be queued.")
+    filename, content, mimetype = attachment
+    if isinstance(content, str):
+        content = content.encode()
+    return [filename, base64.b64encode(content).decode("ascii"), mimetype]
+
+
+def to_row(message):
+    return OutboundEmail(
+        subject=message.subject,
+        body=message.body,
+        from_email=message.from_email,
+        to=list(message.to),
+        cc=list(message.cc),
+        bcc=list(message.bcc),
+        reply_to=list(message.reply_to),
+        headers=dict(message.extra_headers),
+        alternatives=[list(part) for part in getattr(message, "alternatives", [])],
+        attachments=[_attachment(attachment) for attachment in message.attachments],
+    )
+
+
+def to_message(row, backend=None):
+    message = EmailMultiAlternatives(
+        subject=row.subject,
+        body=row.body,
+        from_email=row.from_email,
+        to=row.to,
+        cc=row.cc,
+        bcc=row.bcc,
+        reply_to=row.reply_to,
+        headers=row.headers,
+        connection=backend,
+    )
+    for content, mimetype in row.alternatives:
+        message.attach_alternative(content, mimetype)
+    for filename, content, mimetype in row.attachments:
+        message.attach(filename, base64.b64decode(content), mimetype)
+    return message
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """---EMAIL_BACKEND that writes messages to the outbox (one INSERT per call)---"""
+
+    def send_messages(self, email_messages):
+        messages = [message for message in email_messages if message.recipients()]
+        if not messages:
+            return 0
+        try:
+            OutboundEmail.objects.bulk_create([to_row(message) for message in messages])
+        except Exception:
+            if not self.fail_silently:
+                raise
+            return 0
+        return len(messages)
+
+
+def backoff(attempts, config):
+    """---Seconds before retry number `attempts`: doubling from BACKOFF, capped, jittered---"""
+
+    delay = min(config["BACKOFF"] * 2 ** (attempts - 1), config["MAX_BACKOFF"])
+    return delay * random.uniform(0.8, 1.2)
+
+
+def permanent(error):
+    """---Whether retrying can't help: the server rejected the message (5xx)---"""
+
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+class Deliverer:
+    """
+    Sends the outbox through one delivery connection
+    - deliver() claims up to batch_size due rows and sends them one by one
+      over the open connection; the connection is reopened after an error
+    - close() when the queue runs dry, so an idle SMTP session doesn't
+      time out on the server's side
+    """
+
+    def __init__(self, backend=None, batch_size=None):
+        self.config = email_config()
+        self.batch_size = batch_size or self.config["BATCH_SIZE"]
+        self.connection = get_connection(backend or self.config["DELIVERY_BACKEND"])
+        self.opened = 0  # --> Connections opened, to see the reuse
+        self._open = False
+
+    def claim(self, now):
+        """---Due rows, oldest first, leased to this worker for LEASE seconds---"""
+
+        due = OutboundEmail.objects.filter(
+            status=OutboundEmail.PENDING, next_attempt_at__lte=now
+        ).order_by("next_attempt_at", "id")
+        with transaction.atomic():
+            if connection.features.has_select_for_update_skip_locked:
+                due = due.select_for_update(skip_locked=True)
+            return self.lease(list(due[: self.batch_size]), now)
+
+    def lease(self, rows, now):
+        """
+        Push rows past the send window; returns the ones this worker got
+        - Without SKIP LOCKED another worker may have read the same rows: each
+          lease only lands while next_attempt_at is still the value read, so
+          one of them gets the row and the other drops it
+        """
+
+        until = now + timedelta(seconds=self.config["LEASE"])
+        if connection.features.has_select_for_update_skip_locked:
+            if rows:
+                OutboundEmail.objects.filter(pk__in=[row.pk for row in rows]).update(
+                    next_attempt_at=until
+                )
+            return rows
+        return [
+            row
+            for row in rows
+            if OutboundEmail.objects.filter(
+                pk=row.pk, status=OutboundEmail.PENDING, next_attempt_at=row.next_attempt_at
+            ).update(next_attempt_at=until)
+        ]
+
+    def _connect(self):
+        if not self._open:
+            self.connection.open()
+            self._open = True
+            self.opened += 1
+
+    def _give_up_or_retry(self, row, error, retrying, failed):
+        row.attempts += 1
+        row.last_error = f"{type(error).__name__}: {error}"[:2000]
+        if permanent(error) or row.attempts >= self.config["MAX_ATTEMPTS"]:
+            row.status = OutboundEmail.FAILED
+            failed.append(row)
+        else:
+            row.next_attempt_at = timezone.now() + timedelta(
+                seconds=backoff(row.attempts, self.config)
+            )
+            retrying.append(row)
+
+    def deliver(self):
+        """---Send one batch; returns {"sent", "retrying", "failed"} counts---"""
+
+        rows = self.claim(timezone.now())
+        sent, retrying, failed = [], [], []
+        for index, row in enumerate(rows):
+            try:
+                self._connect()
+            except Exception as error:
+                # --> Server unreachable: the rest of the batch backs off with this one
+                for waiting in rows[index:]:
+                    self._give_up_or_retry(waiting, error, retrying, failed)
+                break
+            try:
+                self.connection.send_messages([to_message(row, self.connection)])
+            except Exception as error:
+                self.close()  # --> The session may be broken; the next message reconnects
+                self._give_up_or_retry(row, error, retrying, failed)
+            else:
+                sent.append(row.pk)
+
+        if sent:
+            OutboundEmail.objects.filter(pk__in=sent).update(
+                status=OutboundEmail.SENT,
+                sent_at=timezone.now(),
+                attempts=F("attempts") + 1,
+                last_error="",
+            )
+        if retrying or failed:
+            OutboundEmail.objects.bulk_update(
+                retrying + failed, ["status", "attempts", "next_attempt_at", "last_error"]
+            )
+        return {"sent": len(sent), "retrying": len(retrying), "failed": len(failed)}
+
+    def close(self):
+        if self._open:
+            self._open = False
+            try:
+                self.connection.close()
+            except Exception:
+                pass  # --> Already dropped by the server
+
+    def run(self, once=False, interval=None, stop=lambda: False):
+        """
+        Deliver until the queue is empty (once=True) or forever, sleeping
+        `interval` seconds whenever there is nothing due
+        Yields each non-empty batch's counts.
+        """
+
+        interval = self.config["POLL_INTERVAL"] if interval is None else interval
+        try:
+            while not stop():
+                counts = self.deliver()
+                if any(counts.values()):
+                    yield counts
+                if sum(counts.values()) < self.batch_size:
+                    self.close()
+                    if once:
+                        return
+                    time.sleep(interval)
+        finally:
+            self.close()
@@ -0,0 +1,100 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from api import dbstats
+from api.benchmark import add_connect_latency, add_query_latency, cold_paths, run_wsgi
+
+
+MODES = ("none", "persistent", "pool")
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure requests/second through the WSGI application with a new "
+        "database connection per request (none), persistent health-checked "
+        "connections (persistent) and, on PostgreSQL with psycopg 3, a "
+        "connection pool (pool). On SQLite, --connect-latency stands in for "
+        "the TCP/TLS/auth handshake a hosted PostgreSQL charges per connection."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--modes", default="none,persistent")
+        parser.add_argument("--path", default="/api/v1/books/{pk}/")
+        parser.add_argument("--requests", type=int, default=300)
+        parser.add_argument("--workers", type=int, default=4, help="WSGI worker threads")
+        parser.add_argument(
+            "--connect-latency",
+            type=float,
+            default=20.0,
+            help="Extra ms per new connection (0 to disable)",
+        )
+        parser.add_argument(
+            "--latency", type=float, default=1.0, help="Extra ms per query (0 to disable)"
+        )
+        parser.add_argument("--pool-size", type=int, default=4)
+        parser.add_argument("--host", default="127.0.0.1")
+
+    def handle(self, *args, **options):
+        from catalog.models import Book
+
+        modes = options["modes"].split(",")
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f"Unknown modes: {', '.join(sorted(unknown))}")
+        database = connections.settings["default"]
+        if "pool" in modes and connections["default"].vendor != "postgresql":
+            raise CommandError("The pool mode needs PostgreSQL with psycopg 3.")
+        book = Book.objects.order_by("pk").first()
+        if book is None:
+            raise CommandError("Load some books first (import_catalog).")
+
+        from library_management.wsgi import app
+
+        # --> Every request misses the response cache, so every request queries
+        paths = cold_paths(options["path"].format(pk=book.pk), options["requests"])
+        add_connect_latency(options["connect_latency"] / 1000)
+        add_query_latency(options["latency"] / 1000)
+        connections.close_all()
+
+        self.stdout.write(
+            f"{options['requests']} requests per run, {options['workers']} WSGI workers, "
+            f"+{options['connect_latency']:.1f} ms per connection, "
+            f"+{options['latency']:.1f} ms per query ({connections['default'].vendor})\n"
+        )
+        self.stdout.write(
+            f"{'mode':<11} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'connections':>12}"
+        )
+        original = {key: database.get(key) for key in ("CONN_MAX_AGE", "CONN_HEALTH_CHECKS")}
+        original_options = dict(database.get("OPTIONS", {}))
+        try:
+            for mode in modes:
+                self.configure(database, original_options, mode, options["pool_size"])
+                _, before = dbstats.counters()
+                result = run_wsgi(app, paths, options["workers"], options["host"])
+                _, after = dbstats.counters()
+                opened = after.get("default", 0) - before.get("default", 0)
+                self.report(mode, result, opened)
+        finally:
+            database.update(original)
+            database["OPTIONS"] = original_options
+
+    def configure(self, database, original_options, mode, pool_size):
+        """---New worker threads build their connections from this dict---"""
+
+        database["OPTIONS"] = {
+            key: value for key, value in original_options.items() if key != "pool"
+        }
+        database["CONN_MAX_AGE"] = 600 if mode == "persistent" else 0
+        database["CONN_HEALTH_CHECKS"] = mode == "persistent"
+        if mode == "pool":
+            database["OPTIONS"]["pool"] = original_options.get("pool") or {
+                "min_size": pool_size,
+                "max_size": pool_size,
+            }
+
+    def report(self, mode, result, opened):
+        flag = "" if result.statuses == {"200"} else f"  statuses={sorted(result.statuses)}"
+        self.stdout.write(
+            f"{mode:<11} {result.throughput:>8.0f} {result.percentile(50):>8.1f} "
+            f"{result.percentile(95):>8.1f} {opened:>12}{flag}"
+        )
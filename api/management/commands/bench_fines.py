@@ -0,0 +1,96 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api.datagen import LOAN_DAYS, backdating
+from catalog.models import Book
+from circulation.fines import accrue_fines, fine_amount, fine_policy
+from circulation.models import BorrowRecord, Fine
+from users.models import Member
+
+
+class Command(BaseCommand):
+    help = (
+        "Time accrue_fines over millions of overdue loans: --loans overdue, "
+        "unreturned loans are added to the current database (--paid of them "
+        "with a paid fine), then fines are accrued from scratch, again for the "
+        "same day (nothing left to write) and for the next day (every unpaid "
+        "fine below the cap moves). Everything it wrote is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loans", type=int, default=1000000, help="Overdue loans to add")
+        parser.add_argument("--max-days-late", type=int, default=90)
+        parser.add_argument(
+            "--paid", type=float, default=0.1, help="Share of the loans whose fine is paid"
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1 or options["max_days_late"] < 1:
+            raise CommandError("--batch-size and --max-days-late must be at least 1")
+        if options["loans"] < 0 or not 0 <= options["paid"] <= 1:
+            raise CommandError("--loans can't be negative and --paid is a share (0 to 1)")
+        member_ids = list(Member.objects.order_by("pk").values_list("pk", flat=True)[:1000])
+        book_ids = list(Book.objects.order_by("pk").values_list("pk", flat=True)[:1000])
+        if not member_ids or not book_ids:
+            raise CommandError("Needs members and books: run gen_library_data.")
+
+        today = timezone.now().date()
+        runs = (("first", today), ("same day", today), ("next day", today + timedelta(days=1)))
+        self.stdout.write(
+            f"{'run':<10} {'scanned':>10} {'upserted':>10} {'seconds':>8} {'loans/s':>9}"
+        )
+        with transaction.atomic():
+            started = time.perf_counter()
+            added = self.add_loans(member_ids, book_ids, today, options)
+            self.report("generate", added, None, time.perf_counter() - started)
+            for name, as_of in runs:
+                started = time.perf_counter()
+                stats = accrue_fines(as_of=as_of, batch_size=options["batch_size"])
+                seconds = time.perf_counter() - started
+                self.report(name, stats["scanned"], stats["upserted"], seconds)
+            transaction.set_rollback(True)  # --> Leave the dataset as it was
+
+        self.stdout.write(self.style.SUCCESS(f"Rolled back the {added} loans added for the run."))
+
+    def add_loans(self, member_ids, book_ids, today, options):
+        rng = random.Random(options["seed"])
+        rate, cap = fine_policy()
+        added = 0
+        with backdating(BorrowRecord._meta.get_field("borrow_date")):
+            while added < options["loans"]:
+                loans = []
+                for _ in range(min(options["batch_size"], options["loans"] - added)):
+                    due = today - timedelta(days=rng.randint(1, options["max_days_late"]))
+                    loans.append(
+                        BorrowRecord(
+                            member_id=rng.choice(member_ids),
+                            book_id=rng.choice(book_ids),
+                            borrow_date=due - timedelta(days=LOAN_DAYS),
+                            due_date=due,
+                        )
+                    )
+                BorrowRecord.objects.bulk_create(loans)
+                Fine.objects.bulk_create(
+                    Fine(
+                        borrow_record_id=loan.pk,
+                        amount=fine_amount(loan.due_date, today, rate, cap),
+                        paid=True,
+                        paid_at=timezone.now(),
+                    )
+                    for loan in loans
+                    if rng.random() < options["paid"]
+                )
+                added += len(loans)
+        return added
+
+    def report(self, name, scanned, upserted, seconds):
+        rate = f"{scanned / seconds:.0f}" if seconds else "-"
+        upserted = "-" if upserted is None else upserted
+        self.stdout.write(f"{name:<10} {scanned:>10} {upserted:>10} {seconds:>8.2f} {rate:>9}")
@@ -0,0 +1,248 @@
+import json
+import random
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.utils import timezone
+
+from api.benchmark import Result
+from api.datagen import LIBRARIAN_EMAIL, TITLE_WORDS
+from catalog.models import Book
+from circulation.models import BorrowRecord
+from library_management import schema
+from users.models import Member, User
+from users.serializers import TokenObtainPairSerializer
+
+
+SCENARIOS = (
+    "book-list",
+    "book-search",
+    "book-popular",
+    "book-available",
+    "borrow",
+    "return",
+    "loan-list",
+    "my-loans",
+    "my-dashboard",
+    "reports",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the key endpoints in-process against the current database (load it "
+        "with gen_library_data), one request at a time, and write p50/p95/p99 "
+        "latency and query counts per scenario to a JSON file. --compare prints "
+        "the change against an earlier run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+        parser.add_argument("--requests", type=int, default=50, help="Measured requests per scenario")
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument(
+            "--cold",
+            action="store_true",
+            help="Unique query string on reads, so none is answered from the response cache",
+        )
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("-o", "--output", help="Default: bench-results/library-<timestamp>.json")
+        parser.add_argument("--compare", help="Earlier result file to compare against")
+        parser.add_argument("--host", default="127.0.0.1")
+
+    def handle(self, *args, **options):
+        names = options["scenarios"].split(",")
+        unknown = set(names) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        if "return" in names and "borrow" not in names:
+            raise CommandError("The return scenario returns the loans made by borrow.")
+
+        librarian = (
+            User.objects.filter(email=LIBRARIAN_EMAIL).first()
+            or User.objects.filter(is_staff=True).order_by("pk").first()
+        )
+        member = Member.objects.select_related("user").order_by("pk").first()
+        if librarian is None or member is None or not Book.objects.exists():
+            raise CommandError("Needs books, a librarian and a member: run gen_library_data.")
+
+        self.rng = random.Random(options["seed"])
+        self.cold = options["cold"]
+        self.counter = 0
+        self.client = Client(HTTP_HOST=options["host"])
+        self.auth = {
+            "librarian": self.bearer(librarian),
+            "member": self.bearer(member.user),
+        }
+        self.borrowed = []
+
+        results = {}
+        self.stdout.write(
+            f"{'scenario':<15} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8}"
+        )
+        for name in SCENARIOS:
+            if name not in names:
+                continue
+            requests = getattr(self, "scenario_" + name.replace("-", "_"))(options)
+            for _ in range(options["warmup"]):
+                if name in ("borrow", "return"):
+                    break  # --> Writes change state; every one of them is measured
+                self.send(*next(requests))
+            results[name] = self.measure(requests, options["requests"])
+            self.report(name, results[name])
+
+        output = {
+            "created": timezone.now().isoformat(),
+            "code_version": schema.code_version(),
+            "database": connection.vendor,
+            "dataset": {
+                "books": Book.objects.count(),
+                "members": Member.objects.count(),
+                "loans": BorrowRecord.objects.count(),
+            },
+            "options": {
+                key: options[key] for key in ("requests", "warmup", "cold", "seed")
+            },
+            "scenarios": results,
+        }
+        path = Path(
+            options["output"]
+            or f"bench-results/library-{timezone.now():%Y%m%d-%H%M%S}.json"
+        )
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(output, indent=2) + "\n")
+        self.stdout.write(self.style.SUCCESS(f"Wrote {path}"))
+
+        if options["compare"]:
+            self.compare(json.loads(Path(options["compare"]).read_text()), output)
+
+    def bearer(self, user):
+        token = TokenObtainPairSerializer.get_token(user).access_token
+        return {"HTTP_AUTHORIZATION": f"JWT {token}"}
+
+    def read(self, path):
+        if self.cold:
+            self.counter += 1
+            path += f"{'&' if '?' in path else '?'}nocache={self.counter}"
+        return path
+
+    # --> Each scenario yields (method, path, data, who) forever
+
+    def scenario_book_list(self, options):
+        while True:
+            yield "get", self.read(f"/api/v1/books/?page={self.rng.randint(1, 50)}"), None, None
+
+    def scenario_book_search(self, options):
+        while True:
+            word = self.rng.choice(TITLE_WORDS).lower()
+            yield "get", self.read(f"/api/v1/books/?search={word}"), None, None
+
+    def scenario_book_popular(self, options):
+        while True:
+            window = self.rng.choice(["7d", "30d", "all"])
+            yield "get", self.read(f"/api/v1/books/popular/?window={window}"), None, None
+
+    def scenario_book_available(self, options):
+        while True:
+            yield "get", self.read("/api/v1/books/available/"), None, None
+
+    def scenario_borrow(self, options):
+        count = options["requests"]
+        books = list(
+            Book.objects.filter(available_copies__gt=0)
+            .order_by("pk")
+            .values_list("pk", flat=True)[: count * 20]
+        )
+        if len(books) < count:
+            raise CommandError("Not enough available books to borrow.")
+        for book in self.rng.sample(books, count):
+            yield "post", "/api/v1/borrow-records/", {"book": book}, "member"
+
+    def scenario_return(self, options):
+        for record in self.borrowed:
+            yield "post", f"/api/v1/borrow-records/{record}/return/", None, "member"
+
+    def scenario_loan_list(self, options):
+        while True:
+            path = f"/api/v1/borrow-records/?page={self.rng.randint(1, 20)}"
+            yield "get", self.read(path), None, "librarian"
+
+    def scenario_my_loans(self, options):
+        while True:
+            yield "get", self.read("/api/v1/borrow-records/"), None, "member"
+
+    def scenario_my_dashboard(self, options):
+        while True:
+            yield "get", self.read("/api/v1/members/me/dashboard/"), None, "member"
+
+    def scenario_reports(self, options):
+        while True:
+            by = self.rng.choice(["category", "author", "cohort"])
+            if self.rng.random() < 0.5:
+                path = f"/api/v1/reports/circulation/?by={by}&period=month&from=2000-01-01"
+            else:
+                path = f"/api/v1/reports/circulation/totals/?by={by}&order=overdue_rate"
+            yield "get", self.read(path), None, "librarian"
+
+    def send(self, method, path, data, who):
+        headers = self.auth[who] if who else {}
+        if method == "get":
+            return self.client.get(path, **headers)
+        return self.client.post(path, data or {}, content_type="application/json", **headers)
+
+    def measure(self, requests, count):
+        timings, statuses, queries = [], {}, []
+        executed = [0]
+
+        def count_query(execute, sql, params, many, context):
+            executed[0] += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with connection.execute_wrapper(count_query):
+            for request in requests:
+                if len(timings) >= count:
+                    break
+                executed[0] = 0
+                start = time.perf_counter()
+                response = self.send(*request)
+                timings.append(time.perf_counter() - start)
+                queries.append(executed[0])
+                statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+                if request[1] == "/api/v1/borrow-records/" and response.status_code == 201:
+                    self.borrowed.append(response.json()["id"])
+
+        result = Result(time.perf_counter() - started, timings, set(statuses))
+        return {
+            "requests": len(timings),
+            "p50_ms": round(result.percentile(50), 2),
+            "p95_ms": round(result.percentile(95), 2),
+            "p99_ms": round(result.percentile(99), 2),
+            "mean_ms": round(sum(timings) / len(timings) * 1000, 2) if timings else 0,
+            "max_ms": round(max(timings) * 1000, 2) if timings else 0,
+            "queries_mean": round(sum(queries) / len(queries), 2) if queries else 0,
+            "queries_max": max(queries, default=0),
+            "statuses": statuses,
+        }
+
+    def report(self, name, result):
+        flag = "" if set(result["statuses"]) <= {"200", "201"} else f"  statuses={result['statuses']}"
+        self.stdout.write(
+            f"{name:<15} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} "
+            f"{result['p99_ms']:>8.1f} {result['queries_mean']:>8.1f}{flag}"
+        )
+
+    def compare(self, before, after):
+        self.stdout.write(f"\nAgainst {before.get('created', 'earlier run')} (p95, queries):")
+        for name, now in after["scenarios"].items():
+            then = before.get("scenarios", {}).get(name)
+            if not then:
+                continue
+            change = (now["p95_ms"] - then["p95_ms"]) / then["p95_ms"] * 100 if then["p95_ms"] else 0
+            self.stdout.write(
+                f"{name:<15} {then['p95_ms']:>8.1f} -> {now['p95_ms']:>8.1f} ms ({change:+.0f}%)  "
+                f"queries {then['queries_mean']:.1f} -> {now['queries_mean']:.1f}"
+            )
@@ -0,0 +1,89 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from api import queryplans
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN every hot queryset (api.queryplans) against the current database "
+        "and fail if any of them reads a large table without an index, or sorts a "
+        "paged query instead of reading an index in order. Run it "
+        "after gen_library_data; --output keeps the plans for review."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--queries", help="Comma separated names (default: all)")
+        parser.add_argument(
+            "--min-rows",
+            type=int,
+            default=10000,
+            help="Full scans of tables smaller than this are not a regression",
+        )
+        parser.add_argument("--no-analyze", action="store_true", help="Keep the current statistics")
+        parser.add_argument("--show", action="store_true", help="Print every plan")
+        parser.add_argument("-o", "--output", help="Write the plans to this JSON file")
+
+    def handle(self, *args, **options):
+        names = options["queries"].split(",") if options["queries"] else list(queryplans.HOT_QUERIES)
+        unknown = set(names) - set(queryplans.HOT_QUERIES)
+        if unknown:
+            raise CommandError(f"Unknown queries: {', '.join(sorted(unknown))}")
+
+        sample = queryplans.sample()
+        if sample is None:
+            raise CommandError("Needs books and loans to plan against: run gen_library_data.")
+
+        tables = {table for name in names for table in queryplans.HOT_QUERIES[name]["tables"]}
+        if not options["no_analyze"]:
+            queryplans.analyze(sorted(tables))
+        sizes = {}
+
+        plans, failures = {}, []
+        for name in names:
+            hot = queryplans.HOT_QUERIES[name]
+            queryset = hot["build"](sample)
+            plan = queryset.explain()
+            scans = queryplans.full_scans(plan)
+            for table in scans:
+                if table not in sizes:
+                    sizes[table] = queryplans.row_count(table)
+            regressions = [
+                f"full scan of {table}"
+                for table in scans
+                if table in hot["tables"] and sizes[table] >= options["min_rows"]
+            ]
+            if hot["ordered"] and queryplans.sorts(plan):
+                regressions.append("sorts instead of reading an index in order")
+            plans[name] = {
+                "sql": str(queryset.query),
+                "plan": plan,
+                "full_scans": scans,
+                "problems": regressions,
+                "ok": not regressions,
+            }
+
+            if regressions:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"FAIL {name}: {'; '.join(regressions)}"))
+            else:
+                self.stdout.write(f"ok   {name}")
+            if options["show"] or regressions:
+                for line in plan.splitlines():
+                    self.stdout.write(f"       {line}")
+
+        if options["output"]:
+            path = Path(options["output"])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(
+                json.dumps({"database": connection.vendor, "rows": sizes, "plans": plans}, indent=2)
+                + "\n"
+            )
+            self.stdout.write(f"Wrote {path}")
+
+        if failures:
+            raise CommandError(f"{len(failures)} hot query plans regressed: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS(f"{len(names)} query plans checked, no regressions"))
@@ -0,0 +1,65 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.exports import EXPORTS, FORMATS, export_rows, render
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream books, authors, borrow records or fines to a CSV or NDJSON file "
+        "(or stdout) in constant memory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("name", choices=list(EXPORTS))
+        parser.add_argument("--format", choices=list(FORMATS), default="csv")
+        parser.add_argument("--output", "-o", help="File to write (default: stdout)")
+        parser.add_argument(
+            "--from",
+            dest="borrow_date_from",
+            type=date.fromisoformat,
+            help="Earliest borrow_date, YYYY-MM-DD (borrow-records, fines)",
+        )
+        parser.add_argument(
+            "--to",
+            dest="borrow_date_to",
+            type=date.fromisoformat,
+            help="Latest borrow_date, YYYY-MM-DD (borrow-records, fines)",
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+
+        columns, rows = export_rows(
+            options["name"],
+            borrow_date_from=options["borrow_date_from"],
+            borrow_date_to=options["borrow_date_to"],
+            chunk_size=options["chunk_size"],
+        )
+
+        counted = self.count(rows)
+        start = time.perf_counter()
+        if options["output"]:
+            newline = "" if options["format"] == "csv" else None
+            with open(options["output"], "w", encoding="utf-8", newline=newline) as stream:
+                for chunk in render(options["format"], columns, counted):
+                    stream.write(chunk)
+        else:
+            for chunk in render(options["format"], columns, counted):
+                self.stdout.write(chunk, ending="")
+        elapsed = time.perf_counter() - start
+
+        self.stderr.write(
+            f"Exported {self.rows} {options['name']} rows in {elapsed:.2f}s "
+            f"({self.rows / elapsed if elapsed else 0:.0f} rows/s)."
+        )
+
+    def count(self, rows):
+        self.rows = 0
+        for row in rows:
+            self.rows += 1
+            yield row
@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.datagen import DEFAULT_SIZES, EMAIL_DOMAIN, LIBRARIAN_EMAIL, LibraryDataGenerator
+from users.models import User
+
+try:
+    import resource
+except ImportError:  # --> Not available on Windows
+    resource = None
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill an empty database with a reproducible synthetic library: authors, "
+        "categories, books, members and a skewed borrow history with overdue "
+        "loans and fines, all through bulk inserts. Meant for benchmarking "
+        "(see bench_library); every generated account uses --password, or a "
+        "random one that is printed at the end."
+    )
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULT_SIZES.items():
+            parser.add_argument(f"--{name}", type=int, default=default)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--skew",
+            type=float,
+            default=3.0,
+            help="Popularity skew of loans over books (1 = uniform)",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--password", help="Password of every generated account")
+
+    def handle(self, *args, **options):
+        if User.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").exists():
+            raise CommandError(
+                f"Generated data (@{EMAIL_DOMAIN}) is already here; use a fresh database."
+            )
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        sizes = {name: options[name] for name in DEFAULT_SIZES}
+        if min(sizes["books"], sizes["members"], sizes["days"], sizes["authors"]) < 1:
+            raise CommandError("--books, --members, --authors and --days must be at least 1")
+        if sizes["categories"] < 1:
+            raise CommandError("--categories must be at least 1")
+
+        generator = LibraryDataGenerator(
+            seed=options["seed"],
+            sizes=sizes,
+            batch_size=options["batch_size"],
+            skew=options["skew"],
+            password=options["password"],
+            report=self.report,
+        )
+        stats = generator.generate()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated {stats['books']} books, {stats['authors']} authors, "
+                f"{stats['categories']} categories, {stats['members']} members, "
+                f"{stats['loans']} loans ({generator.skipped} skipped: no copy left) "
+                f"and {stats['fines']} fines. Librarian: {LIBRARIAN_EMAIL}"
+            )
+        )
+        if not options["password"]:
+            self.stdout.write(f"Password of every generated account: {generator.password}")
+        if resource is not None:
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            self.stdout.write(f"Peak memory: {peak:.0f} MB")
+
+    def report(self, step, rows, seconds):
+        rate = f" ({rows / seconds:.0f} rows/s)" if rows and seconds else ""
+        count = f"{rows} rows" if rows is not None else "done"
+        self.stdout.write(f"  {step:<10} {count} in {seconds:.2f}s{rate}")
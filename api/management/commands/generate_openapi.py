@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from library_management import schema
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the OpenAPI schema served by /swagger/, /redoc/ and "
+        "/openapi.json into API_SCHEMA['DIR'], keyed by the code version. "
+        "Run it at deploy so no request has to introspect the API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate even if the artifact for this version exists",
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        path, written = schema.write_schema(force=options["force"])
+        if not written:
+            self.stdout.write(f"Schema {schema.code_version()} is up to date: {path}")
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote schema {schema.code_version()} to {path} "
+                f"({path.stat().st_size // 1024} KiB in {time.perf_counter() - start:.2f}s)"
+            )
+        )
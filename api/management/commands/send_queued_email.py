@@ -0,0 +1,61 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.mail import Deliverer
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver the email outbox (api.OutboundEmail) in batches over one reused "
+        "connection, retrying failures with backoff. Runs until stopped; --once "
+        "drains what is due and exits (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit when nothing is due")
+        parser.add_argument("--batch-size", type=int, help="Default: LIBRARY_EMAIL")
+        parser.add_argument(
+            "--interval", type=float, help="Seconds to wait when idle (default: LIBRARY_EMAIL)"
+        )
+        parser.add_argument(
+            "--backend",
+            help="Delivery backend, e.g. django.core.mail.backends.console.EmailBackend "
+            "(default: LIBRARY_EMAIL DELIVERY_BACKEND)",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] is not None and options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        stopping = []
+        if not options["once"]:
+            # --> Finish the current batch on SIGTERM instead of dropping leased rows
+            signal.signal(signal.SIGTERM, lambda *args: stopping.append(True))
+
+        deliverer = Deliverer(options["backend"], options["batch_size"])
+        totals = {"sent": 0, "retrying": 0, "failed": 0}
+        start = time.perf_counter()
+        try:
+            for counts in deliverer.run(
+                once=options["once"], interval=options["interval"], stop=lambda: stopping
+            ):
+                for key, value in counts.items():
+                    totals[key] += value
+                if not options["once"]:
+                    self.stdout.write(
+                        f"sent {counts['sent']}, retrying {counts['retrying']}, "
+                        f"failed {counts['failed']}"
+                    )
+        except KeyboardInterrupt:
+            pass
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Sent {totals['sent']} emails ({totals['retrying']} to retry, "
+                f"{totals['failed']} failed) over {deliverer.opened} connections "
+                f"in {elapsed:.2f}s."
+            )
+        )
@@ -0,0 +1,100 @@
+import asyncio
+from email import message_from_bytes, policy
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Local SMTP stand-in for developing against the email outbox: accepts "
+        "plain SMTP (no TLS, no auth) and prints one line per message. Point "
+        "EMAIL_HOST/EMAIL_PORT at it with EMAIL_USE_TLS=False. --fail-every N "
+        "answers every Nth message with a temporary error to exercise retries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=1025)
+        parser.add_argument("--fail-every", type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options["fail_every"] < 0:
+            raise CommandError("--fail-every must be 0 (never) or more")
+        self.fail_every = options["fail_every"]
+        self.messages = 0
+        self.connections = 0
+        try:
+            asyncio.run(self.serve(options["host"], options["port"]))
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Received {self.messages} messages over {self.connections} connections."
+            )
+        )
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.session, host, port)
+        self.stdout.write(f"SMTP sink listening on {host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+    async def session(self, reader, writer):
+        self.connections += 1
+
+        def reply(line):
+            writer.write(f"{line}\r\n".encode())
+
+        reply("220 smtp-sink ready")
+        sender, recipients = None, []
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.decode(errors="replace").strip()
+            verb = command[:4].upper()
+            if verb in ("EHLO", "HELO"):
+                reply("250-smtp-sink" if verb == "EHLO" else "250 smtp-sink")
+                if verb == "EHLO":
+                    reply("250 8BITMIME")
+            elif verb == "MAIL":
+                sender, recipients = command.split(":", 1)[1].strip(), []
+                reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command.split(":", 1)[1].strip())
+                reply("250 OK")
+            elif verb == "DATA":
+                reply("354 End data with <CR><LF>.<CR><LF>")
+                await writer.drain()
+                reply(self.receive(await self.read_data(reader), sender, recipients))
+                sender, recipients = None, []
+            elif verb in ("RSET", "NOOP"):
+                reply("250 OK")
+            elif verb == "QUIT":
+                reply("221 Bye")
+                await writer.drain()
+                break
+            else:
+                reply("502 Command not implemented")
+            await writer.drain()
+        writer.close()
+
+    async def read_data(self, reader):
+        lines = []
+        while True:
+            line = await reader.readline()
+            if not line or line in (b".\r\n", b".\n"):
+                return b"".join(lines)
+            lines.append(line[1:] if line.startswith(b"..") else line)  # --> Dot-unstuffing
+
+    def receive(self, data, sender, recipients):
+        self.messages += 1
+        attempt = self.messages
+        if self.fail_every and attempt % self.fail_every == 0:
+            self.stdout.write(f"#{attempt} refused (451) for {', '.join(recipients)}")
+            return "451 4.3.0 Try again later"
+        message = message_from_bytes(data, policy=policy.default)
+        self.stdout.write(
+            f"#{attempt} {sender} -> {', '.join(recipients)}: {message['Subject']}"
+        )
+        return "250 OK: queued"
@@ -0,0 +1,241 @@
+"""
+Per-request performance numbers and in-memory aggregates
+- RequestStats collects DB queries/time and serialization time for the
+  request running in the current context (thread or asyncio task)
+- Every connection gets an execute wrapper (see api.signals); it only
+  counts while a request is being measured
+- Serializer.data and the JSON/browsable renderers are wrapped once by
+  install(); time spent in queries they trigger is booked as DB time
+- Registry aggregates latency histograms per view and renders them in
+  Prometheus text format for /metrics
+Numbers are per worker process, like api.dbstats.
+"""
+
+import contextvars
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+
+from api import dbstats
+
+
+# --> Upper bounds in seconds; the +Inf bucket is implied
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = contextvars.ContextVar("request_stats", default=None)
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time", "serialize_time", "_span")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self._span = False
+
+
+def start_request():
+    """---Begin measuring the current request; pass the token to finish_request()---"""
+
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - start
+
+
+def _timed(function):
+    """---Book function's time as serialization, minus the DB time it caused---"""
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        stats = _current.get()
+        if stats is None or stats._span:
+            # --> Not measuring, or nested inside an outer serializer/renderer call
+            return function(*args, **kwargs)
+        stats._span = True
+        db_before = stats.db_time
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            stats.serialize_time += elapsed - (stats.db_time - db_before)
+            stats._span = False
+
+    wrapper.__wrapped_for_metrics__ = True
+    return wrapper
+
+
+def install():
+    """---Wrap DRF serialization entry points (idempotent)---"""
+
+    from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+    from rest_framework.serializers import ListSerializer, Serializer
+
+    for cls in (Serializer, ListSerializer):
+        prop = cls.__dict__["data"]
+        if not getattr(prop.fget, "__wrapped_for_metrics__", False):
+            cls.data = property(_timed(prop.fget))
+    for cls in (JSONRenderer, BrowsableAPIRenderer):
+        render = cls.__dict__["render"]
+        if not getattr(render, "__wrapped_for_metrics__", False):
+            cls.render = _timed(render)
+
+
+def view_name(request):
+    """---BookViewSet.popular, ExportView.get, async-book-list (URL name) ... or "unmatched"---"""
+
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    func = match.func
+    cls = getattr(func, "cls", None)
+    if cls is None:
+        return match.view_name or func.__name__
+    actions = getattr(func, "actions", None)
+    method = request.method.lower()
+    action = actions.get(method, method) if actions else method
+    return f"{cls.__name__}.{action}"
+
+
+class Registry:
+    """---Counters and latency histograms keyed by (view, method)---"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, view, method, status, duration, stats):
+        with self._lock:
+            series = self._series.get((view, method))
+            if series is None:
+                series = self._series[(view, method)] = {
+                    "buckets": [0] * len(self.buckets),
+                    "count": 0,
+                    "sum": 0.0,
+                    "queries": 0,
+                    "db": 0.0,
+                    "serialize": 0.0,
+                    "statuses": {},
+                }
+            for index, bound in enumerate(self.buckets):
+                if duration <= bound:
+                    series["buckets"][index] += 1
+            series["count"] += 1
+            series["sum"] += duration
+            series["queries"] += stats.queries
+            series["db"] += stats.db_time
+            series["serialize"] += stats.serialize_time
+            status = f"{status // 100}xx"
+            series["statuses"][status] = series["statuses"].get(status, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        """---Prometheus text exposition format 0.0.4---"""
+
+        with self._lock:
+            series = {
+                key: {**value, "buckets": list(value["buckets"]), "statuses": dict(value["statuses"])}
+                for key, value in sorted(self._series.items())
+            }
+
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        family(
+            "library_http_request_duration_seconds",
+            "histogram",
+            "Wall time per request, by view and method.",
+        )
+        for (view, method), value in series.items():
+            labels = _labels(view=view, method=method)
+            for bound, count in zip(self.buckets, value["buckets"]):
+                lines.append(
+                    f"library_http_request_duration_seconds_bucket{{{labels},le=\"{bound}\"}} {count}"
+                )
+            lines.append(
+                f"library_http_request_duration_seconds_bucket{{{labels},le=\"+Inf\"}} {value['count']}"
+            )
+            lines.append(f"library_http_request_duration_seconds_sum{{{labels}}} {value['sum']:.6f}")
+            lines.append(f"library_http_request_duration_seconds_count{{{labels}}} {value['count']}")
+
+        family("library_http_requests_total", "counter", "Requests by view, method and status class.")
+        for (view, method), value in series.items():
+            for status, count in sorted(value["statuses"].items()):
+                labels = _labels(view=view, method=method, status=status)
+                lines.append(f"library_http_requests_total{{{labels}}} {count}")
+
+        for name, field, help_text in (
+            ("library_http_db_queries_total", "queries", "Database queries run by requests."),
+            ("library_http_db_seconds_total", "db", "Time requests spent in database queries."),
+            (
+                "library_http_serialize_seconds_total",
+                "serialize",
+                "Time requests spent in DRF serializers and renderers.",
+            ),
+        ):
+            family(name, "counter", help_text)
+            for (view, method), value in series.items():
+                number = value[field]
+                number = f"{number:.6f}" if isinstance(number, float) else number
+                lines.append(f"{name}{{{_labels(view=view, method=method)}}} {number}")
+
+        _, opened = dbstats.counters()
+        family(
+            "library_db_connections_opened_total",
+            "counter",
+            "Database connections opened by this worker.",
+        )
+        for alias, count in sorted(opened.items()):
+            lines.append(f"library_db_connections_opened_total{{{_labels(alias=alias)}}} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(**labels):
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return ",".join(f'{name}="{escape(value)}"' for name, value in labels.items())
+
+
+def server_timing(duration, stats):
+    """---Server-Timing header value (milliseconds)---"""
+
+    return ", ".join(
+        (
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"',
+            f"serialize;dur={stats.serialize_time * 1000:.1f}",
+            f"total;dur={duration * 1000:.1f}",
+        )
+    )
+
+
+def _config():
+    return getattr(settings, "LIBRARY_METRICS", {})
+
+
+registry = Registry(_config().get("BUCKETS", DEFAULT_BUCKETS))
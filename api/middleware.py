@@ -0,0 +1,88 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from api import metrics
+
+
+class PerformanceMiddleware:
+    """
+    Measure every request and record it in api.metrics.registry
+    - Wall time, DB queries and time, serialization time, view name
+    - Adds a Server-Timing header when LIBRARY_METRICS["SERVER_TIMING"] is on
+      (off by default) so the breakdown shows in browser dev tools
+    - Works for both WSGI and ASGI; put it first in MIDDLEWARE so the wall
+      time covers the rest of the stack
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = metrics._config().get("SERVER_TIMING", False)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token = metrics.start_request()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.finish_request(token)
+        return self.record(request, response, time.perf_counter() - start, stats)
+
+    async def __acall__(self, request):
+        stats, token = metrics.start_request()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.finish_request(token)
+        return self.record(request, response, time.perf_counter() - start, stats)
+
+    def record(self, request, response, duration, stats):
+        # --> Streamed bodies (exports) are produced after this point; only setup is timed
+        metrics.registry.observe(
+            metrics.view_name(request), request.method, response.status_code, duration, stats
+        )
+        if self.server_timing:
+            response["Server-Timing"] = metrics.server_timing(duration, stats)
+        return response
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that can sit in an async middleware stack
+    - WhiteNoise 6 is sync-only, which makes Django run every view below it,
+      async ones included, in the single thread-sensitive executor under
+      ASGI: one long-polling request would hold up every other sync call
+    - Static files are looked up and opened off the event loop; everything
+      else passes straight through
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,175 @@
+"""
+EXPLAIN plans of the hot querysets
+- HOT_QUERIES holds the querysets behind the busiest endpoints and jobs,
+  built through the same code the views use, with parameters picked from
+  the data in the database
+- full_scans() reads a PostgreSQL or SQLite plan and returns the tables it
+  reads front to back (Seq Scan / SCAN without an index); sorts() tells
+  whether it sorts rows instead of reading them in index order
+- manage.py check_query_plans explains every one of them and fails when a
+  plan scans a large table or sorts a paged query, so a dropped index or a
+  query change that stops using one shows up before it reaches production
+"""
+
+import json
+import re
+from datetime import timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+from catalog.models import Book
+from catalog.paginations import KeysetPagination
+from catalog.serializers import BookSerializer
+from circulation.fines import overdue_loans
+from circulation.models import BorrowRecord, Hold
+from circulation.serializers import BorrowRecordSerializer
+
+
+PAGE = 10
+
+HOT_QUERIES = {}
+
+_PG_SEQ_SCAN = re.compile(r"Seq Scan on (\w+)")
+_PG_SORT = re.compile(r"(?:^|->)\s*Sort\b")  # --> Not "Incremental Sort", which follows an index
+_SQLITE_SCAN = re.compile(r"\bSCAN (\w+)(.*)$")
+_SQLITE_SORT = "USE TEMP B-TREE FOR ORDER BY"
+
+
+def hot_query(name, *tables, ordered=False):
+    """
+    Register builder(sample) -> queryset under name
+    - tables: must not be read front to back
+    - ordered: a page (ORDER BY ... LIMIT) that must come in index order
+    """
+
+    def register(builder):
+        HOT_QUERIES[name] = {"build": builder, "tables": tables, "ordered": ordered}
+        return builder
+
+    return register
+
+
+def sample():
+    """---Parameters for the builders, taken from existing rows (None if there is no data)---"""
+
+    middle = Book.objects.count() // 2
+    book = Book.objects.order_by("title", "id").values("title", "id")[middle : middle + 1].first()
+    loan = BorrowRecord.objects.order_by("-id").values("member_id").first()
+    published = (
+        Book.objects.exclude(publication_date=None)
+        .order_by("-publication_date")
+        .values_list("publication_date", flat=True)
+        .first()
+    )
+    if book is None or loan is None or published is None:
+        return None
+    return {
+        "book": book,
+        "member": loan["member_id"],
+        "published": (published - timedelta(days=30), published),
+        "today": timezone.now().date(),
+    }
+
+
+def _books():
+    return BookSerializer.setup_eager_loading(Book.objects.defer("search_vector"))
+
+
+def _loans():
+    return BorrowRecordSerializer.setup_eager_loading(BorrowRecord.objects.all())
+
+
+@hot_query("book-list", "catalog_book", ordered=True)
+def book_list(sample):
+    return _books().order_by("title")[:PAGE]
+
+
+@hot_query("book-list-cursor", "catalog_book", ordered=True)
+def book_list_cursor(sample):
+    ordering = ("title", "id")
+    position = json.dumps([sample["book"]["title"], str(sample["book"]["id"])])
+    after = KeysetPagination()._after(position, ordering, reverse=False)
+    return _books().filter(after).order_by(*ordering)[: PAGE + 1]
+
+
+@hot_query("book-published-between", "catalog_book", ordered=True)
+def book_published_between(sample):
+    start, end = sample["published"]
+    return _books().filter(publication_date__gte=start, publication_date__lte=end).order_by(
+        "publication_date"
+    )[:PAGE]
+
+
+# --> Reads most of the table whatever the plan (most books are in stock): recorded, not guarded
+@hot_query("book-available")
+def book_available(sample):
+    return _books().filter(available_copies__gt=0).order_by("id")
+
+
+@hot_query("loan-list", "circulation_borrowrecord", ordered=True)
+def loan_list(sample):
+    return _loans().order_by("-borrow_date", "-id")[:PAGE]
+
+
+@hot_query("member-loans", "circulation_borrowrecord", ordered=True)
+def member_loans(sample):
+    return _loans().filter(member_id=sample["member"]).order_by("-borrow_date")[:PAGE]
+
+
+@hot_query("overdue-loans", "circulation_borrowrecord")
+def overdue(sample):
+    # --> First batch of accrue_fines
+    return overdue_loans(sample["today"]).values_list("pk", "due_date", "fine__amount")[:5000]
+
+
+@hot_query("hold-queue", "circulation_hold", ordered=True)
+def hold_queue(sample):
+    # --> Head of a book's queue, read by every return
+    return Hold.objects.filter(book_id=sample["book"]["id"], status=Hold.WAITING).order_by(
+        "created_at", "id"
+    )[:1]
+
+
+def analyze(tables):
+    """---Refresh planner statistics so plans reflect the data actually loaded---"""
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            for table in tables:
+                # --> VACUUM also sets the visibility map index-only scans rely on
+                cursor.execute(f"VACUUM (ANALYZE) {connection.ops.quote_name(table)}")
+        else:
+            cursor.execute("ANALYZE")
+
+
+def full_scans(plan):
+    """---Tables a text plan reads without an index, in plan order---"""
+
+    tables = []
+    for line in plan.splitlines():
+        match = _PG_SEQ_SCAN.search(line)
+        if match:
+            tables.append(match.group(1))
+            continue
+        match = _SQLITE_SCAN.search(line)
+        if match and "INDEX" not in match.group(2):
+            tables.append(match.group(1))
+    return tables
+
+
+def sorts(plan):
+    """---Whether a text plan sorts the rows itself---"""
+
+    return any(
+        _PG_SORT.search(line) or _SQLITE_SORT in line for line in plan.splitlines()
+    )
+
+
+def row_count(table):
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+        else:
+            cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)}")
+        return max(cursor.fetchone()[0], 0)
@@ -0,0 +1,18 @@
+from django.core.signals import request_finished
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from api import dbstats, metrics
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    dbstats.connection_opened(connection)
+    # --> Query counts/time for the request being measured (api.middleware)
+    if metrics.record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(metrics.record_query)
+
+
+@receiver(request_finished)
+def count_request(sender, **kwargs):
+    dbstats.request_finished()
@@ -1,8 +1,17 @@
 from django.urls import path, include
 from rest_framework_nested import routers
 
+from api.views import (
+    CirculationReportView,
+    CirculationTotalsView,
+    DatabaseHealthView,
+    ExportView,
+)
+from catalog import async_views
 from catalog.views import AuthorViewSet, CategoryViewSet, BookViewSet
-from circulation.views import BorrowRecordViewSet
+from circulation import async_views as circulation_async_views
+from circulation.views import BorrowRecordViewSet, HoldViewSet, MemberDashboardView
+from users.views import MemberImportView
 
 
 router = routers.DefaultRouter()  # ----> Api Root a error day na...link day...
@@ -10,10 +19,27 @@ router.register("authors", AuthorViewSet, basename="authors")
 router.register("categories", CategoryViewSet, basename="categories")
 router.register("books", BookViewSet, basename="books")
 router.register("borrow-records", BorrowRecordViewSet, basename="borrow-records")
+router.register("holds", HoldViewSet, basename="holds")
 
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("members/me/dashboard/", MemberDashboardView.as_view(), name="member-dashboard"),
+    path("members/import/", MemberImportView.as_view(), name="member-import"),
+    path("exports/<str:name>/", ExportView.as_view(), name="exports"),
+    path("reports/circulation/", CirculationReportView.as_view(), name="report-circulation"),
+    path(
+        "reports/circulation/totals/",
+        CirculationTotalsView.as_view(),
+        name="report-circulation-totals",
+    ),
+    path("health/db/", DatabaseHealthView.as_view(), name="health-db"),
+    # --> Async read path for the ASGI app (library_management.asgi)
+    path("async/books/", async_views.book_list, name="async-book-list"),
+    path("async/books/<int:pk>/", async_views.book_detail, name="async-book-detail"),
+    path("async/authors/", async_views.author_list, name="async-author-list"),
+    path("async/categories/", async_views.category_list, name="async-category-list"),
+    path("async/holds/ready/", circulation_async_views.holds_ready, name="async-holds-ready"),
     path("auth/", include("djoser.urls")),
     path("auth/", include("djoser.urls.jwt")),
 ]
@@ -1,3 +1,257 @@
-from django.shortcuts import render
+import hmac
+from datetime import date, timedelta
 
-# Create your views here.
+from django.core.handlers.asgi import ASGIRequest
+from django.db import DatabaseError
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from api import dbstats, metrics
+from api.exports import EXPORTS, FORMATS, export_rows, render, stream_async
+from circulation import analytics
+from circulation.permissions import IsLibrarian
+
+
+def _date_param(request, name):
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValidationError({name: "Use YYYY-MM-DD."})
+
+
+def _choice_param(request, name, choices, default):
+    value = request.query_params.get(name, default)
+    if value not in choices:
+        raise ValidationError({name: f"Choose one of: {', '.join(choices)}."})
+    return value
+
+
+def _int_param(request, name, default=None, maximum=None):
+    value = request.query_params.get(name)
+    if value is None:
+        return default
+    if not value.isdigit() or (maximum is not None and int(value) > maximum):
+        limit = f" up to {maximum}" if maximum is not None else ""
+        raise ValidationError({name: f"Must be a whole number{limit}."})
+    return int(value)
+
+
+def _report_range(request):
+    """---(dimension, from, to); the range defaults to the last 365 days---"""
+
+    dimension = _choice_param(request, "by", analytics.DIMENSIONS, "category")
+    end = _date_param(request, "to") or timezone.now().date()
+    start = _date_param(request, "from") or end - timedelta(days=364)
+    if start > end:
+        raise ValidationError({"from": "Must not be after 'to'."})
+    return dimension, start, end
+
+
+def _named(dimension, rows):
+    names = analytics.labels(dimension, [row["key"] for row in rows])
+    for row in rows:
+        row["name"] = names[row["key"]]
+    return rows
+
+
+_REPORT_PARAMETERS = [
+    openapi.Parameter(
+        "by",
+        openapi.IN_QUERY,
+        type=openapi.TYPE_STRING,
+        enum=analytics.DIMENSIONS,
+        description="Dimension (default: category)",
+    ),
+    openapi.Parameter(
+        "from",
+        openapi.IN_QUERY,
+        type=openapi.TYPE_STRING,
+        format="date",
+        description="First day (default: 364 days before 'to')",
+    ),
+    openapi.Parameter(
+        "to",
+        openapi.IN_QUERY,
+        type=openapi.TYPE_STRING,
+        format="date",
+        description="Last day (default: today)",
+    ),
+]
+
+
+class CirculationReportView(APIView):
+    """
+    Circulation over time from the daily rollups (librarians only)
+    - ?by=all|book|category|author|cohort, ?period=day|month|year
+    - ?from= / ?to= (YYYY-MM-DD), ?key= to follow one book/category/author/cohort
+    - Rows: loans, returns, overdue_returns, overdue_rate, fines_assessed, fines_paid
+    Reads only the circulation rollups, never the loans themselves.
+    """
+
+    permission_classes = [IsLibrarian]
+
+    @swagger_auto_schema(
+        operation_summary="Loans, returns, overdue rate and fines per period",
+        manual_parameters=[
+            *_REPORT_PARAMETERS,
+            openapi.Parameter(
+                "period", openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=list(analytics.PERIODS)
+            ),
+            openapi.Parameter("key", openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ],
+    )
+    def get(self, request):
+        dimension, start, end = _report_range(request)
+        period = _choice_param(request, "period", list(analytics.PERIODS), "month")
+        key = _int_param(request, "key")
+        if dimension == "book" and key is None:
+            raise ValidationError({"key": "Per-book series need ?key=<book id>."})
+
+        rows = analytics.report(dimension, start, end, period, key)
+        return Response(
+            {
+                "by": dimension,
+                "period": period,
+                "from": start,
+                "to": end,
+                "rows": _named(dimension, rows),
+            }
+        )
+
+
+class CirculationTotalsView(APIView):
+    """
+    Totals per book/category/author/cohort over a date range (librarians only)
+    - ?order=loans (default), returns, overdue_returns, overdue_rate,
+      fines_assessed or fines_paid, highest first; ?limit= (default 20)
+    Reads only the circulation rollups, never the loans themselves.
+    """
+
+    permission_classes = [IsLibrarian]
+
+    @swagger_auto_schema(
+        operation_summary="Top books, categories, authors or cohorts over a date range",
+        manual_parameters=[
+            *_REPORT_PARAMETERS,
+            openapi.Parameter(
+                "order", openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=list(analytics.ORDERS)
+            ),
+            openapi.Parameter("limit", openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ],
+    )
+    def get(self, request):
+        dimension, start, end = _report_range(request)
+        order = _choice_param(request, "order", analytics.ORDERS, "loans")
+        limit = _int_param(request, "limit", default=20, maximum=500)
+
+        rows = analytics.totals(dimension, start, end, order, limit)
+        return Response(
+            {
+                "by": dimension,
+                "order": order,
+                "from": start,
+                "to": end,
+                "rows": _named(dimension, rows),
+            }
+        )
+
+
+class ExportView(APIView):
+    """
+    Stream a full table export (librarians only)
+    - /exports/books/, authors/, borrow-records/, fines/
+    - ?output=csv (default) or ndjson
+    - borrow-records and fines: ?borrow_date__gte= / ?borrow_date__lte=
+    Rows are read through a cursor and sent as they arrive, so memory use
+    stays flat no matter how many loans are exported; on the ASGI app too,
+    where the chunks go out through an async iterator.
+    """
+
+    permission_classes = [IsLibrarian]
+
+    @swagger_auto_schema(
+        operation_summary="Stream an export as CSV or NDJSON",
+        manual_parameters=[
+            openapi.Parameter(
+                "output", openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=list(FORMATS)
+            ),
+            *[
+                openapi.Parameter(
+                    name, openapi.IN_QUERY, type=openapi.TYPE_STRING, format="date"
+                )
+                for name in ("borrow_date__gte", "borrow_date__lte")
+            ],
+        ],
+        responses={200: "Streamed file", 400: "Bad Request", 404: "Unknown export"},
+    )
+    def get(self, request, name):
+        if name not in EXPORTS:
+            raise NotFound(f"Unknown export, choose one of: {', '.join(EXPORTS)}.")
+        fmt = request.query_params.get("output", "csv")
+        if fmt not in FORMATS:
+            raise ValidationError({"output": f"Choose one of: {', '.join(FORMATS)}."})
+
+        columns, rows = export_rows(
+            name,
+            borrow_date_from=_date_param(request, "borrow_date__gte"),
+            borrow_date_to=_date_param(request, "borrow_date__lte"),
+        )
+        chunks = render(fmt, columns, rows)
+        if isinstance(request._request, ASGIRequest):
+            chunks = stream_async(chunks)
+        response = StreamingHttpResponse(chunks, content_type=FORMATS[fmt])
+        filename = f"{name}-{timezone.now():%Y%m%d}.{fmt}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+class DatabaseHealthView(APIView):
+    """
+    Database reachability and connection reuse for the worker that answers
+    (librarians only)
+    - ping_ms: one SELECT 1 round trip; 503 when the database is unreachable
+    - databases: connection mode, connections opened, reuse ratio and pool
+      counters, see api.dbstats
+    """
+
+    permission_classes = [IsLibrarian]
+
+    @swagger_auto_schema(
+        operation_summary="Database health and per-worker connection stats",
+        responses={200: "Healthy", 503: "Database unreachable"},
+    )
+    def get(self, request):
+        data = dbstats.snapshot()
+        try:
+            data["ping_ms"] = dbstats.ping()
+        except DatabaseError as error:
+            data["ping_ms"] = None
+            data["error"] = str(error)
+            return Response(data, status=503)
+        return Response(data)
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint for this worker's request metrics
+    - Send Authorization: Bearer <LIBRARY_METRICS["TOKEN"]>
+    - Without a configured token the endpoint does not exist (404)
+    """
+
+    token = metrics._config().get("TOKEN")
+    if not token:
+        raise Http404
+    given = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    if not hmac.compare_digest(given.encode(), token.encode()):
+        return HttpResponse("Unauthorized\n", status=401, content_type="text/plain")
+    return HttpResponse(
+        metrics.registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,143 @@
+"""
+Async read-only twins of the catalog endpoints, for the ASGI application
+- Same filters, search, ordering, serializers and page shape as the
+  viewsets (the viewset builds the queryset; only the I/O is async)
+- Queries run on Django's async ORM, so a slow round trip parks a
+  coroutine instead of a worker thread
+- Responses share the catalog cache and its invalidation; page-number
+  pagination only, no conditional GET
+"""
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from catalog.cache import aresponse_cache_key, get_cache, response_timeout
+from catalog.models import Author, Book, Category
+from catalog.paginations import DefaultPagination
+from catalog.search import uses_postgres_search
+from catalog.serializers import AuthorSerializer, BookSerializer, CategorySerializer
+from catalog.views import AuthorViewSet, BookViewSet, CategoryViewSet
+
+
+def _json(data, status=200):
+    return HttpResponse(
+        JSONRenderer().render(data), status=status, content_type="application/json"
+    )
+
+
+def _view(viewset, request, action, **kwargs):
+    """---A viewset instance set up for request, used for querysets and cache keys---"""
+
+    view = viewset(action=action, format_kwarg=None, kwargs=kwargs)
+    view.request = Request(request)
+    return view
+
+
+async def _cached(view, respond):
+    """---Async counterpart of catalog.cache.cached_response; respond() -> (data, status)---"""
+
+    cache = get_cache()
+    key = await aresponse_cache_key(view.cache_namespace, view, view.request, view.kwargs)
+    data = await cache.aget(key)
+    if data is not None:
+        response = _json(data)
+        response["X-Cache"] = "HIT"
+        return response
+
+    data, status = await respond()
+    if status == 200:
+        await cache.aset(key, data, timeout=response_timeout(view))
+    response = _json(data, status)
+    response["X-Cache"] = "MISS"
+    return response
+
+
+async def _book_queryset(view):
+    if view.request.query_params.get("search") and not uses_postgres_search():
+        # --> The in-process index may have to be built from the database first
+        return await sync_to_async(view.filter_queryset)(view.get_queryset())
+    return view.filter_queryset(view.get_queryset())
+
+
+def _page_link(request, page_number, last_page):
+    if page_number < 1 or page_number > last_page:
+        return None
+    url = request.build_absolute_uri()
+    if page_number == 1:
+        return remove_query_param(url, "page")
+    return replace_query_param(url, "page", page_number)
+
+
+async def _book_page(view):
+    try:
+        books = await _book_queryset(view)
+    except ValidationError as error:
+        return error.detail, 400
+
+    page_size = DefaultPagination.page_size
+    try:
+        page_number = int(view.request.query_params.get("page", 1))
+    except ValueError:
+        page_number = 0
+    count = await books.acount()
+    last_page = max((count + page_size - 1) // page_size, 1)
+    if not 1 <= page_number <= last_page:
+        return {"detail": "Invalid page."}, 404
+
+    start = (page_number - 1) * page_size
+    rows = [book async for book in books[start : start + page_size]]
+    serializer = BookSerializer(rows, many=True, context={"request": view.request})
+    return {
+        "count": count,
+        "next": _page_link(view.request, page_number + 1, last_page),
+        "previous": _page_link(view.request, page_number - 1, last_page),
+        "results": serializer.data,
+    }, 200
+
+
+@require_GET
+async def book_list(request):
+    view = _view(BookViewSet, request, "list")
+    return await _cached(view, lambda: _book_page(view))
+
+
+@require_GET
+async def book_detail(request, pk):
+    view = _view(BookViewSet, request, "retrieve", pk=pk)
+
+    async def respond():
+        try:
+            book = await view.get_queryset().aget(pk=pk)
+        except Book.DoesNotExist:
+            return {"detail": "No Book matches the given query."}, 404
+        return BookSerializer(book, context={"request": view.request}).data, 200
+
+    return await _cached(view, respond)
+
+
+@require_GET
+async def author_list(request):
+    view = _view(AuthorViewSet, request, "list")
+
+    async def respond():
+        authors = [author async for author in Author.objects.all()]
+        context = {"request": view.request}
+        return AuthorSerializer(authors, many=True, context=context).data, 200
+
+    return await _cached(view, respond)
+
+
+@require_GET
+async def category_list(request):
+    view = _view(CategoryViewSet, request, "list")
+
+    async def respond():
+        categories = [category async for category in Category.objects.all()]
+        return CategorySerializer(categories, many=True).data, 200
+
+    return await _cached(view, respond)
@@ -0,0 +1,172 @@
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from rest_framework.response import Response
+
+
+CACHE_ALIAS = "catalog"
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def is_process_local(cache=None):
+    """---Whether every worker has its own copy, so invalidate() only reaches this one---"""
+
+    return isinstance(cache or get_cache(), LocMemCache)
+
+
+def live_timeout():
+    """
+    TTL for entries showing copies on the shelf or a member's loans
+    - Shared backends (Redis, database, file): the alias default; invalidate()
+      keeps every worker exact
+    - Process-local LocMemCache: CATALOG_CACHE_LOCAL_TTL seconds, since
+      borrows and returns handled by other workers never bump this copy
+    """
+
+    if is_process_local():
+        return getattr(settings, "CATALOG_CACHE_LOCAL_TTL", 10)
+    return DEFAULT_TIMEOUT
+
+
+def response_timeout(view):
+    """---TTL for a cached viewset response: live_timeout() when view.cache_live is set---"""
+
+    return live_timeout() if getattr(view, "cache_live", False) else DEFAULT_TIMEOUT
+
+
+def _fresh_generation():
+    # --> Clock-based so a generation evicted from the cache never comes back
+    #     as a value that older entries were keyed on
+    return time.time_ns()
+
+
+def _generations(names):
+    """
+    Current generation of each name. Keys embed generations, so bumping one
+    orphans every entry built on it (they age out via TTL/LRU eviction).
+    """
+
+    cache = get_cache()
+    keys = [f"gen:{name}" for name in names]
+    found = cache.get_many(keys)
+    missing = {key: _fresh_generation() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+async def _agenerations(names):
+    """---_generations() for async views---"""
+
+    cache = get_cache()
+    keys = [f"gen:{name}" for name in names]
+    found = await cache.aget_many(keys)
+    missing = {key: _fresh_generation() for key in keys if key not in found}
+    if missing:
+        await cache.aset_many(missing, timeout=None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+async def agenerations(names):
+    """---Current generations of names, for async code watching them for changes---"""
+
+    return await _agenerations(names)
+
+
+def _bump(names):
+    cache = get_cache()
+    for name in names:
+        try:
+            cache.incr(f"gen:{name}")
+        except ValueError:
+            cache.set(f"gen:{name}", _fresh_generation(), timeout=None)
+
+
+def invalidate(*names):
+    """---Bump generations once the surrounding transaction commits---"""
+
+    transaction.on_commit(lambda: _bump(names))
+
+
+def invalidate_books(book_ids=()):
+    """---Book rows changed: every book list plus those books' detail pages---"""
+
+    invalidate("books", *[f"books:{pk}" for pk in set(book_ids)])
+
+
+def versioned_key(prefix, names, *parts):
+    """---Cache key for data derived from `names`; bumping any of them orphans it---"""
+
+    raw = "|".join(str(part) for part in (*parts, *_generations(names)))
+    return f"{prefix}:{hashlib.md5(raw.encode()).hexdigest()}"
+
+
+def _lookup(view, kwargs):
+    return kwargs.get(view.lookup_url_kwarg or view.lookup_field)
+
+
+def _generation_names(namespace, lookup):
+    if lookup is None:
+        return [namespace]
+    return [f"{namespace}:details", f"{namespace}:{lookup}"]
+
+
+def _response_key(namespace, view, request, lookup, generations):
+    # --> The path keeps the sync and async twins of an endpoint apart (their links differ)
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    raw = f"{request.path}|{view.action}|{lookup}|{query}|{generations}"
+    return f"response:{namespace}:{hashlib.md5(raw.encode()).hexdigest()}"
+
+
+def response_cache_key(namespace, view, request, kwargs):
+    lookup = _lookup(view, kwargs)
+    generations = _generations(_generation_names(namespace, lookup))
+    return _response_key(namespace, view, request, lookup, generations)
+
+
+async def aresponse_cache_key(namespace, view, request, kwargs):
+    lookup = _lookup(view, kwargs)
+    generations = await _agenerations(_generation_names(namespace, lookup))
+    return _response_key(namespace, view, request, lookup, generations)
+
+
+def cached_response(method):
+    """
+    Cache a read-only viewset action's response data in the "catalog" cache
+    - Keyed on action, lookup and the sorted query string
+    - Only 200 responses are stored; X-Cache tells HIT from MISS
+    - Views with cache_live = True expire early on process-local caches
+      (see live_timeout)
+    Apply below @action / @swagger_auto_schema.
+    """
+
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        key = response_cache_key(self.cache_namespace, self, request, kwargs)
+        cache = get_cache()
+
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+            return response
+
+        response = method(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, timeout=response_timeout(self))
+        response["X-Cache"] = "MISS"
+        return response
+
+    return wrapper
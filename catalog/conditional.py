@@ -0,0 +1,150 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce, Greatest
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from catalog.cache import is_process_local, response_cache_key
+
+
+def _timestamp(updated_at):
+    return int(updated_at.timestamp()) if updated_at else None
+
+
+def _lookup(view, kwargs):
+    return kwargs.get(view.lookup_url_kwarg or view.lookup_field)
+
+
+def _modified_at(view):
+    """
+    The row's updated_at, or the latest of it and the updated_at of every
+    relation whose fields the payload embeds (view.validator_relations), so
+    renaming an author changes the ETag of their books
+    """
+
+    relations = getattr(view, "validator_relations", ())
+    if not relations:
+        return F("updated_at")
+    # --> A missing relation (SET_NULL) must not turn the whole GREATEST into NULL
+    return Greatest(
+        "updated_at", *[Coalesce(f"{name}__updated_at", "updated_at") for name in relations]
+    )
+
+
+def row_validators(view, queryset, lookup):
+    """---(etag, last_modified) of one row from _modified_at(), or None if missing---"""
+
+    updated_at = (
+        queryset.filter(**{view.lookup_field: lookup})
+        .annotate(modified_at=_modified_at(view))
+        .values_list("modified_at", flat=True)
+        .first()
+    )
+    if updated_at is None:
+        return None
+    return f'"{lookup}-{int(updated_at.timestamp() * 1_000_000)}"', updated_at
+
+
+def list_validators(view, request):
+    """
+    (etag, None) of a list, without a query
+    - The ETag hashes the response cache key, which embeds the namespace's
+      generation: every write to its rows bumps it (for books also author and
+      category changes, and every borrow and return)
+    - A process-local cache only sees this worker's bumps, so there the ETag
+      also rolls over every CATALOG_CACHE_LOCAL_TTL seconds, like the
+      responses it validates
+    - No Last-Modified: generations carry no time
+    """
+
+    raw = response_cache_key(view.cache_namespace, view, request, {})
+    if is_process_local():
+        raw += f"|{int(time.time() // getattr(settings, 'CATALOG_CACHE_LOCAL_TTL', 10))}"
+    return f'"{hashlib.md5(raw.encode()).hexdigest()}"', None
+
+
+def _set_validators(response, etag, last_modified):
+    if 200 <= response.status_code < 300:
+        response.headers.setdefault("ETag", etag)
+        if last_modified:
+            response.headers.setdefault("Last-Modified", http_date(_timestamp(last_modified)))
+    return response
+
+
+def conditional_response(method):
+    """
+    ETag / Last-Modified for read actions; answers If-None-Match and
+    If-Modified-Since with 304 before the handler queries or serializes.
+    Apply above @cached_response.
+    """
+
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        lookup = _lookup(self, kwargs)
+        if lookup is None:
+            validators = list_validators(self, request)
+        else:
+            validators = row_validators(self, self.get_queryset(), lookup)
+        if validators is None:
+            return method(self, request, *args, **kwargs)  # --> let it 404
+
+        etag, last_modified = validators
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=_timestamp(last_modified)
+        )
+        if not_modified is not None:
+            return not_modified
+        return _set_validators(method(self, request, *args, **kwargs), etag, last_modified)
+
+    return wrapper
+
+
+def conditional_write(method):
+    """
+    If-Match / If-Unmodified-Since for writes: the row is locked, its current
+    ETag checked, and the write runs in the same transaction, so a client
+    holding a stale ETag gets 412 instead of overwriting someone else's change.
+    """
+
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        lookup = _lookup(self, kwargs)
+        queryset = self.get_queryset()
+        with transaction.atomic():
+            # --> Lock the row only: the validator joins nullable relations
+            validators = row_validators(self, queryset.select_for_update(of=("self",)), lookup)
+            if validators is None:
+                return method(self, request, *args, **kwargs)  # --> let it 404
+
+            etag, last_modified = validators
+            precondition_failed = get_conditional_response(
+                request, etag=etag, last_modified=_timestamp(last_modified)
+            )
+            if precondition_failed is not None:
+                return precondition_failed
+            response = method(self, request, *args, **kwargs)
+
+        if request.method != "DELETE":
+            validators = row_validators(self, queryset, lookup)
+            if validators:
+                _set_validators(response, *validators)
+        return response
+
+    return wrapper
+
+
+class ConditionalWriteMixin:
+    """---Adds If-Match support to a ModelViewSet's update (PUT/PATCH) and destroy---"""
+
+    @conditional_write
+    def update(self, request, *args, **kwargs):
+        return super().update(request, *args, **kwargs)
+
+    @conditional_write
+    def destroy(self, request, *args, **kwargs):
+        return super().destroy(request, *args, **kwargs)
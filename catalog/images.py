@@ -0,0 +1,293 @@
+import io
+import logging
+import os
+import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django import forms
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import UploadedFile
+from django.db import models, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+# --> Derivatives per kind of image: name -> (max width, max height), aspect kept
+IMAGE_SIZES = {
+    "cover": {"thumb": (80, 120), "small": (160, 240), "medium": (320, 480)},
+    "photo": {"thumb": (64, 64), "small": (128, 128), "medium": (256, 256)},
+}
+WEBP_QUALITY = 80
+
+# --> Keys written by CloudinaryField / the Cloudinary backend look like image/upload/v1/id.jpg
+CLOUDINARY_KEY_RE = re.compile(r"^(image|raw|video)/(upload|private|authenticated)/")
+
+
+class ImageStorage:
+    """
+    Where original images and their resized WebP derivatives live
+    - save() stores an upload and returns the key kept in the model field
+    - url() / derivative_url() only build strings, so serializers can emit
+      every size for every row without touching the storage
+    - generate_derivatives() does the resizing; it runs after commit, off
+      the request path (see schedule_derivatives)
+    """
+
+    def save(self, kind, upload):
+        raise NotImplementedError
+
+    def url(self, key):
+        raise NotImplementedError
+
+    def derivative_url(self, key, kind, size):
+        raise NotImplementedError
+
+    def generate_derivatives(self, key, kind, force=False):
+        raise NotImplementedError
+
+    def urls(self, key, kind):
+        urls = {"original": self.url(key)}
+        for size in IMAGE_SIZES[kind]:
+            urls[size] = self.derivative_url(key, kind, size)
+        return urls
+
+
+class LocalImageStorage(ImageStorage):
+    """
+    Originals and derivatives on the local filesystem under MEDIA_ROOT
+    - images/<kind>/<uuid>.<ext> for originals
+    - images/<kind>/<size>/<uuid>.webp for derivatives, made with Pillow
+    Works offline, which is what development and test runs want.
+    """
+
+    def __init__(self, location=None, base_url=None):
+        self.storage = FileSystemStorage(
+            location=location or settings.MEDIA_ROOT,
+            base_url=base_url or settings.MEDIA_URL,
+        )
+
+    def save(self, kind, upload):
+        extension = os.path.splitext(upload.name or "")[1].lower() or ".jpg"
+        if hasattr(upload, "seek"):
+            upload.seek(0)
+        return self.storage.save(f"images/{kind}/{uuid.uuid4().hex}{extension}", upload)
+
+    def url(self, key):
+        return self.storage.url(key)
+
+    def derivative_name(self, key, size):
+        folder, filename = os.path.split(key)
+        return f"{folder}/{size}/{os.path.splitext(filename)[0]}.webp"
+
+    def derivative_url(self, key, kind, size):
+        return self.storage.url(self.derivative_name(key, size))
+
+    def generate_derivatives(self, key, kind, force=False):
+        from PIL import Image, ImageOps
+
+        pending = {
+            size: box
+            for size, box in IMAGE_SIZES[kind].items()
+            if force or not self.storage.exists(self.derivative_name(key, size))
+        }
+        if not pending:
+            return []
+
+        with self.storage.open(key, "rb") as original:
+            image = ImageOps.exif_transpose(Image.open(original))
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+        written = []
+        for size, box in pending.items():
+            derivative = image.copy()
+            derivative.thumbnail(box, Image.LANCZOS)
+            buffer = io.BytesIO()
+            derivative.save(buffer, "WEBP", quality=WEBP_QUALITY, method=4)
+
+            name = self.derivative_name(key, size)
+            if self.storage.exists(name):
+                self.storage.delete(name)
+            written.append(self.storage.save(name, ContentFile(buffer.getvalue())))
+        return written
+
+
+class CloudinaryImageStorage(ImageStorage):
+    """
+    Originals on Cloudinary; derivatives are Cloudinary transformations
+    - URLs are transformation URLs built locally (no API call)
+    - generate_derivatives() asks Cloudinary to render them eagerly, so the
+      first visitor doesn't pay for the transformation
+    """
+
+    def save(self, kind, upload):
+        from cloudinary import uploader
+
+        if hasattr(upload, "seek"):
+            upload.seek(0)
+        return uploader.upload_resource(upload, resource_type="image").get_prep_value()
+
+    def resource(self, key):
+        from cloudinary.models import CloudinaryField
+
+        return CloudinaryField().parse_cloudinary_resource(key)
+
+    def transformation(self, kind, size):
+        width, height = IMAGE_SIZES[kind][size]
+        return {"width": width, "height": height, "crop": "limit", "fetch_format": "webp"}
+
+    def url(self, key):
+        return self.resource(key).build_url(secure=True)
+
+    def derivative_url(self, key, kind, size):
+        resource = self.resource(key)
+        return resource.build_url(
+            secure=True, transformation=[self.transformation(kind, size)]
+        )
+
+    def generate_derivatives(self, key, kind, force=False):
+        from cloudinary import uploader
+
+        resource = self.resource(key)
+        uploader.explicit(
+            resource.public_id,
+            type=resource.type,
+            eager=[self.transformation(kind, size) for size in IMAGE_SIZES[kind]],
+        )
+        return list(IMAGE_SIZES[kind])
+
+
+_storages = {}
+_storages_lock = threading.Lock()
+
+
+def _storage(path):
+    with _storages_lock:
+        if path not in _storages:
+            _storages[path] = import_string(path)()
+        return _storages[path]
+
+
+def get_image_storage():
+    """---Backend new uploads go to (settings.LIBRARY_IMAGES["BACKEND"])---"""
+
+    config = getattr(settings, "LIBRARY_IMAGES", {})
+    return _storage(config.get("BACKEND", "catalog.images.LocalImageStorage"))
+
+
+def storage_for(key):
+    """---Backend that wrote a stored key; Cloudinary keys stay readable after a switch---"""
+
+    if CLOUDINARY_KEY_RE.match(key):
+        return _storage("catalog.images.CloudinaryImageStorage")
+    storage = get_image_storage()
+    if isinstance(storage, CloudinaryImageStorage):
+        return _storage("catalog.images.LocalImageStorage")
+    return storage
+
+
+def image_urls(key, kind):
+    """---{"original": url, "thumb": url, ...} for a stored key, or None---"""
+
+    if not key:
+        return None
+    return storage_for(key).urls(key, kind)
+
+
+# --> Derivative generation ------------------------------------------------
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = getattr(settings, "LIBRARY_IMAGES", {}).get("WORKERS", 2)
+            _executor = ThreadPoolExecutor(workers, thread_name_prefix="image-derivatives")
+        return _executor
+
+
+def generate_derivatives(key, kind, force=False):
+    try:
+        return storage_for(key).generate_derivatives(key, kind, force=force)
+    except Exception:
+        # --> Originals still serve; generate_image_derivatives can retry later
+        logger.exception("Could not generate %s derivatives for %s", kind, key)
+        return []
+
+
+def schedule_derivatives(key, kind):
+    """
+    Build derivatives once the upload's transaction commits
+    - LIBRARY_IMAGES["ASYNC"] (default on long-lived servers): on a small
+      worker pool, after the response
+    - otherwise inline at commit, before the response: serverless functions
+      (settings.SERVERLESS) are frozen once they answer, tests, commands
+    """
+
+    config = getattr(settings, "LIBRARY_IMAGES", {})
+
+    def run():
+        if config.get("ASYNC", True):
+            _get_executor().submit(generate_derivatives, key, kind)
+        else:
+            generate_derivatives(key, kind)
+
+    transaction.on_commit(run)
+
+
+# --> Model field ----------------------------------------------------------
+
+
+class LibraryImageField(models.CharField):
+    """
+    Image column holding a storage key
+    - Assign an UploadedFile: the original is stored on save and derivatives
+      are scheduled for after commit
+    - Values read back are plain keys; turn them into URLs with image_urls()
+    """
+
+    description = "An image stored through catalog.images"
+
+    def __init__(self, *args, kind="cover", **kwargs):
+        self.kind = kind
+        kwargs["max_length"] = 255
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        del kwargs["max_length"]
+        kwargs["kind"] = self.kind
+        return name, path, args, kwargs
+
+    def to_python(self, value):
+        if isinstance(value, File) or value is None:
+            return value
+        return super().to_python(value)
+
+    def run_validators(self, value):
+        # --> Size/type validators apply to uploads; stored keys were written by us
+        if isinstance(value, File):
+            for validator in self._validators:
+                validator(value)
+
+    def pre_save(self, model_instance, add):
+        value = getattr(model_instance, self.attname)
+        if isinstance(value, UploadedFile):
+            key = get_image_storage().save(self.kind, value)
+            setattr(model_instance, self.attname, key)
+            schedule_derivatives(key, self.kind)
+            return key
+        return value or None
+
+    def formfield(self, **kwargs):
+        return super(models.CharField, self).formfield(
+            **{"form_class": forms.ImageField, "max_length": None, **kwargs}
+        )
@@ -0,0 +1,384 @@
+import csv
+import json
+import os
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, connection, transaction
+
+from catalog.cache import invalidate
+from catalog.models import Author, Book, Category
+from catalog.search import book_index, uses_postgres_search
+from circulation.popularity import move_categories
+
+
+FORMATS = {".json": "json", ".ndjson": "ndjson", ".jsonl": "ndjson", ".csv": "csv"}
+
+AUTHOR_FIELDS = ("first_name", "last_name", "biography", "birth_date", "death_date")
+CATEGORY_FIELDS = ("name", "description")
+BOOK_FIELDS = (
+    "title",
+    "subtitle",
+    "isbn",
+    "description",
+    "publication_date",
+    "publisher",
+    "total_copies",
+    "available_copies",
+)
+# --> Stock belongs to circulation: existing books keep their copy counts unless asked
+STOCK_FIELDS = ("total_copies", "available_copies")
+
+# --> Only the first few bad rows are kept for the report; the rest are counted
+MAX_REPORTED_ERRORS = 100
+
+REFRESH_SEARCH_VECTOR_SQL = """
+UPDATE catalog_book AS b SET search_vector =
+    setweight(to_tsvector('simple', coalesce(b.title, '') || ' ' || coalesce(b.isbn, '')), 'A')
+    || setweight(to_tsvector('simple', coalesce(b.subtitle, '') || ' ' || coalesce(
+        (SELECT a.first_name || ' ' || a.last_name FROM catalog_author AS a WHERE a.id = b.author_id),
+        ''
+    )), 'B')
+    || setweight(to_tsvector('simple', coalesce(b.description, '')), 'D')
+WHERE b.isbn = ANY(%s)
+"""
+
+
+def detect_format(path):
+    return FORMATS.get(os.path.splitext(path)[1].lower())
+
+
+def iter_json_array(stream, chunk_size=1 << 16):
+    """
+    Yield the items of a top-level JSON array one at a time
+    - Reads chunk_size characters at a time; only the current item is held
+    """
+
+    decoder = json.JSONDecoder()
+    buffer, position, started = "", 0, False
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position < len(buffer):
+            if not started:
+                if buffer[position] != "[":
+                    raise ValueError("Expected a JSON array of records")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                pass  # --> item continues in the next chunk
+            else:
+                yield item
+                continue
+
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            raise ValueError("Truncated or malformed JSON array")
+        buffer, position = buffer[position:] + chunk, 0
+
+
+def iter_records(stream, fmt):
+    """---Yield (line_or_item_number, record) from a JSON, NDJSON or CSV stream---"""
+
+    if fmt == "json":
+        yield from enumerate(iter_json_array(stream), start=1)
+    elif fmt == "ndjson":
+        # --> Lines are parsed by the importer so one bad line is just one bad row
+        for number, line in enumerate(stream, start=1):
+            if line.strip():
+                yield number, line
+    elif fmt == "csv":
+        # --> Header is line 1
+        yield from enumerate(csv.DictReader(stream), start=2)
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+
+def normalize(record):
+    """
+    Return (kind, ref, fields) for one record
+    - Fixture shape: {"model": "catalog.book", "pk": 1, "fields": {...}}
+    - Flat shape: {"model"/"type": "book", "id": 1, ...fields}; default kind is book
+    """
+
+    if "fields" in record:
+        kind, ref, fields = record.get("model", ""), record.get("pk"), record["fields"]
+    else:
+        fields = dict(record)
+        kind = fields.pop("model", None) or fields.pop("type", None) or "book"
+        ref = fields.pop("id", None) or fields.pop("pk", None)
+    kind = kind.rsplit(".", 1)[-1].lower()
+    if kind not in ("author", "category", "book"):
+        raise ValueError(f"Unknown record type: {kind}")
+    return kind, (str(ref) if ref not in (None, "") else None), fields
+
+
+def clean_fields(model, names, fields):
+    """---Field values run through model field cleaning (CSV strings -> dates, ints)---"""
+
+    values = {}
+    for name in names:
+        if name not in fields:
+            continue
+        value = fields[name]
+        if value == "":
+            value = None
+        field = model._meta.get_field(name)
+        if value is None and not field.null:
+            continue  # --> leave it to the default (or to a later error)
+        try:
+            values[name] = field.clean(value, None)
+        except ValidationError as error:
+            raise ValueError(f"{name}: {'; '.join(error.messages)}")
+    return values
+
+
+class CatalogImporter:
+    """
+    Streaming catalog import
+    - Authors are matched by (first_name, last_name), categories by name,
+      books upserted by isbn with INSERT ... ON CONFLICT (isbn) DO UPDATE
+    - Records buffer up to batch_size and are written per batch in one
+      transaction; in-file references (author/category ids) and names are
+      resolved through in-memory maps, so memory is bounded by batch_size
+      plus the number of distinct authors and categories
+    - bulk_create skips signals: search vectors and the popularity counters'
+      category of books that moved are updated per batch, the response cache
+      invalidated once at the end
+    - Authors and categories named on book rows are validated like the rows
+      themselves, so a bad name is a row error and not a failed batch
+    - A batch the database rejects is rolled back and reported as one error
+      covering its records; its new authors are dropped with it and the
+      import carries on with the next batch
+    """
+
+    def __init__(self, batch_size=2000, update_stock=False):
+        self.batch_size = batch_size
+        self.book_update_fields = [
+            name for name in BOOK_FIELDS if update_stock or name not in STOCK_FIELDS
+        ]
+        self.book_update_fields += ["author", "category", "updated_at"]
+        self.book_update_fields.remove("isbn")
+
+        self.author_ids = {
+            (first, last): pk
+            for pk, first, last in Author.objects.values_list("pk", "first_name", "last_name")
+        }
+        self.category_ids = dict(Category.objects.values_list("name", "pk"))
+        self.author_refs, self.category_refs = {}, {}
+
+        self.pending_authors, self.pending_categories, self.pending_books = {}, {}, {}
+        self.batch_numbers = None  # --> (first, last) record number fed since the last flush
+        self.stats = {
+            "records": 0,
+            "authors": 0,
+            "categories": 0,
+            "books": 0,
+            "errors": 0,
+        }
+        self.errors = []
+
+    # --> Feeding records -------------------------------------------------
+
+    def error(self, number, message, count=1):
+        self.stats["errors"] += count
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((number, message))
+
+    def feed(self, number, record):
+        self.stats["records"] += 1
+        first = self.batch_numbers[0] if self.batch_numbers else number
+        self.batch_numbers = (first, number)
+        try:
+            if isinstance(record, str):
+                record = json.loads(record)
+            kind, ref, fields = normalize(record)
+            getattr(self, f"add_{kind}")(ref, fields)
+        except (ValueError, TypeError, KeyError, AttributeError) as error:
+            self.error(number, str(error))
+            return
+        if (
+            len(self.pending_books) >= self.batch_size
+            or len(self.pending_authors) >= self.batch_size
+            or len(self.pending_categories) >= self.batch_size
+        ):
+            self.flush()
+
+    def add_author(self, ref, fields):
+        values = clean_fields(Author, AUTHOR_FIELDS, fields)
+        if not values.get("first_name") or not values.get("last_name"):
+            raise ValueError("author needs first_name and last_name")
+        key = (values["first_name"], values["last_name"])
+        if key not in self.author_ids:
+            self.pending_authors.setdefault(key, values)
+        if ref is not None:
+            self.author_refs[ref] = key
+
+    def add_category(self, ref, fields):
+        values = clean_fields(Category, CATEGORY_FIELDS, fields)
+        if not values.get("name"):
+            raise ValueError("category needs a name")
+        if values["name"] not in self.category_ids:
+            self.pending_categories.setdefault(values["name"], values)
+        if ref is not None:
+            self.category_refs[ref] = values["name"]
+
+    def add_book(self, ref, fields):
+        values = clean_fields(Book, BOOK_FIELDS, fields)
+        if not values.get("isbn") or not values.get("title"):
+            raise ValueError("book needs isbn and title")
+        if "available_copies" not in values and "total_copies" in values:
+            values["available_copies"] = values["total_copies"]
+        values["author"] = self.author_key(fields)
+        values["category"] = self.category_key(fields)
+        self.pending_books[values["isbn"]] = values  # --> last row per isbn wins
+
+    def author_key(self, fields):
+        """---Author of a book row: in-file reference ("author") or "First Last" name---"""
+
+        ref = fields.get("author")
+        if ref not in (None, ""):
+            key = self.author_refs.get(str(ref))
+            if key is None:
+                raise ValueError(f"unknown author reference {ref!r}")
+            return key
+        name = (fields.get("author_name") or "").strip()
+        if not name:
+            return None
+        first, _, last = name.partition(" ")
+        values = clean_fields(
+            Author,
+            ("first_name", "last_name"),
+            {"first_name": first, "last_name": last.strip() or first},
+        )
+        key = (values["first_name"], values["last_name"])
+        if key not in self.author_ids:
+            self.pending_authors.setdefault(key, values)
+        return key
+
+    def category_key(self, fields):
+        ref = fields.get("category")
+        if ref not in (None, ""):
+            name = self.category_refs.get(str(ref))
+            if name is None:
+                raise ValueError(f"unknown category reference {ref!r}")
+            return name
+        name = (fields.get("category_name") or "").strip()
+        if not name:
+            return None
+        name = clean_fields(Category, ("name",), {"name": name})["name"]
+        if name not in self.category_ids:
+            self.pending_categories.setdefault(name, {"name": name})
+        return name
+
+    # --> Writing batches -------------------------------------------------
+
+    def flush_authors(self):
+        created = Author.objects.bulk_create(
+            [Author(**values) for values in self.pending_authors.values()]
+        )
+        for author in created:
+            self.author_ids[(author.first_name, author.last_name)] = author.pk
+        return len(created)
+
+    def flush_categories(self):
+        created = Category.objects.bulk_create(
+            [Category(**values) for values in self.pending_categories.values()]
+        )
+        for category in created:
+            self.category_ids[category.name] = category.pk
+        return len(created)
+
+    def flush_books(self):
+        books = []
+        for values in self.pending_books.values():
+            values = dict(values)  # --> Kept intact in case the batch is rolled back
+            author, category = values.pop("author"), values.pop("category")
+            books.append(
+                Book(
+                    author_id=self.author_ids[author] if author else None,
+                    category_id=self.category_ids[category] if category else None,
+                    **values,
+                )
+            )
+        # --> Books changing category drag their popularity counters along (see below)
+        before = dict(
+            Book.objects.filter(isbn__in=self.pending_books).values_list("isbn", "category_id")
+        )
+        Book.objects.bulk_create(
+            books,
+            update_conflicts=True,
+            unique_fields=["isbn"],
+            update_fields=self.book_update_fields,
+        )
+        moved = [
+            book.isbn
+            for book in books
+            if book.isbn in before and before[book.isbn] != book.category_id
+        ]
+        if moved:
+            move_categories(list(Book.objects.filter(isbn__in=moved).values_list("pk", flat=True)))
+        if uses_postgres_search():
+            with connection.cursor() as cursor:
+                cursor.execute(REFRESH_SEARCH_VECTOR_SQL, [list(self.pending_books)])
+        return len(books)
+
+    def flush(self):
+        """---Write the pending authors, categories and books in one transaction---"""
+
+        if not (self.pending_authors or self.pending_categories or self.pending_books):
+            return
+        known_authors, known_categories = set(self.author_ids), set(self.category_ids)
+        try:
+            with transaction.atomic():
+                authors = self.flush_authors()
+                categories = self.flush_categories()
+                books = self.flush_books()
+        except DatabaseError as error:
+            # --> Rolled back: forget the ids handed out in this batch. Its categories
+            #     stay pending; its new authors are dropped rather than retried (one the
+            #     database refused would fail every later batch): rows naming them add
+            #     them again, in-file references to them become unknown
+            for key in set(self.author_ids) - known_authors:
+                del self.author_ids[key]
+            self.author_refs = {
+                ref: key
+                for ref, key in self.author_refs.items()
+                if key not in self.pending_authors
+            }
+            for name in set(self.category_ids) - known_categories:
+                del self.category_ids[name]
+            # --> A category someone else created meanwhile is used, not inserted again
+            for name, pk in Category.objects.filter(
+                name__in=self.pending_categories
+            ).values_list("name", "pk"):
+                self.category_ids[name] = pk
+                del self.pending_categories[name]
+            first, last = self.batch_numbers or (None, None)
+            self.error(
+                first,
+                f"batch of {len(self.pending_books)} books up to record {last} "
+                f"not written: {error}",
+                count=len(self.pending_books),
+            )
+        else:
+            self.stats["authors"] += authors
+            self.stats["categories"] += categories
+            self.stats["books"] += books
+            self.pending_categories = {}
+        self.pending_authors, self.pending_books = {}, {}
+        self.batch_numbers = None
+
+    def finish(self):
+        self.flush()
+        if not uses_postgres_search():
+            book_index.reset()
+        invalidate(
+            "authors", "authors:details", "categories", "categories:details",
+            "books", "books:details",
+        )
+        return self.stats
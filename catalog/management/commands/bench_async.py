@@ -0,0 +1,85 @@
+import asyncio
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmark import add_query_latency, cold_paths, run_asgi, run_wsgi
+
+
+# --> (WSGI path, ASGI path) pairs: the viewset endpoint and its async twin
+ENDPOINTS = {
+    "book-list": ("/api/v1/books/", "/api/v1/async/books/"),
+    "book-search": ("/api/v1/books/?search=the", "/api/v1/async/books/?search=the"),
+    "book-detail": ("/api/v1/books/{pk}/", "/api/v1/async/books/{pk}/"),
+    "author-list": ("/api/v1/authors/", "/api/v1/async/authors/"),
+    "category-list": ("/api/v1/categories/", "/api/v1/async/categories/"),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare concurrent-request throughput of the WSGI application "
+        "(library_management.wsgi, a fixed pool of worker threads) against the "
+        "async catalog endpoints on the ASGI application (one event loop). "
+        "--latency adds a simulated database round trip to every query."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument(
+            "--concurrency", type=int, default=32, help="Requests in flight at once"
+        )
+        parser.add_argument(
+            "--workers", type=int, default=4, help="WSGI worker threads"
+        )
+        parser.add_argument(
+            "--latency", type=float, default=5.0, help="Extra ms per query (0 to disable)"
+        )
+        parser.add_argument(
+            "--cold",
+            action="store_true",
+            help="Unique query string per request, so every request misses the response cache",
+        )
+        parser.add_argument("--host", default="127.0.0.1")
+
+    def handle(self, *args, **options):
+        from catalog.models import Book
+
+        names = options["endpoints"].split(",")
+        unknown = set(names) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+        book = Book.objects.order_by("pk").first()
+        if book is None:
+            raise CommandError("Load some books first (import_catalog).")
+
+        from library_management.asgi import application as asgi_app
+        from library_management.wsgi import app as wsgi_app
+
+        host, count, cold = options["host"], options["requests"], options["cold"]
+        add_query_latency(options["latency"] / 1000)
+        self.stdout.write(
+            f"{count} requests per run, {options['concurrency']} in flight, "
+            f"{options['workers']} WSGI workers, +{options['latency']:.1f} ms per query"
+            f"{', cold cache' if cold else ''}\n"
+        )
+        self.stdout.write(
+            f"{'endpoint':<14} {'server':<5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}"
+        )
+        for name in names:
+            wsgi_path, asgi_path = (path.format(pk=book.pk) for path in ENDPOINTS[name])
+            wsgi = run_wsgi(
+                wsgi_app, cold_paths(wsgi_path, count, cold), options["workers"], host
+            )
+            asgi = asyncio.run(
+                run_asgi(asgi_app, cold_paths(asgi_path, count, cold), options["concurrency"], host)
+            )
+            for server, result in (("wsgi", wsgi), ("asgi", asgi)):
+                self.report(name, server, result)
+
+    def report(self, name, server, result):
+        flag = "" if result.statuses == {"200"} else f"  statuses={sorted(result.statuses)}"
+        self.stdout.write(
+            f"{name:<14} {server:<5} {result.throughput:>8.0f} "
+            f"{result.percentile(50):>8.1f} {result.percentile(95):>8.1f}{flag}"
+        )
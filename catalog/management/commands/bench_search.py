@@ -0,0 +1,130 @@
+import random
+import time
+from itertools import accumulate
+from statistics import median
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from catalog.models import Book
+from catalog.search import BookSearchFilter, InvertedIndex, tokenize
+
+
+WORDS = (
+    "python django data science history war peace garden ocean river mountain "
+    "night day light dark story life death love machine learning network city "
+    "empire kingdom secret journey world music art economy theory practice "
+    "modern ancient guide handbook introduction advanced principles systems"
+).split()
+FIRST_NAMES = "anna boris carla david elena farid grace hasan irene jamal".split()
+LAST_NAMES = "khan smith rahman garcia ito muller rossi novak silva haque".split()
+
+
+def synthetic_documents(count, seed):
+    rng = random.Random(seed)
+    # --> Zipf-ish vocabulary: a few common words plus a long tail of rare ones
+    vocabulary = WORDS + [f"term{i}" for i in range(max(count // 10, 100))]
+    cum_weights = list(accumulate(1.0 / (rank + 1) for rank in range(len(vocabulary))))
+    for doc_id in range(1, count + 1):
+        yield doc_id, {
+            "title": " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=4)),
+            "subtitle": " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=3)),
+            "isbn": f"978{doc_id:010d}",
+            "author_name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "description": " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=20)),
+        }
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return median(samples)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark book search: inverted index vs. a linear icontains scan over "
+        "synthetic catalogs, or (--db) the live BookSearchFilter vs. icontains."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            default="1000,10000,100000,1000000",
+            help="Comma separated catalog sizes for the in-memory benchmark",
+        )
+        parser.add_argument("--queries", default="python,ocean river,term42,khan")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--db",
+            action="store_true",
+            help="Time queries against the Book table of the configured database",
+        )
+
+    def handle(self, *args, **options):
+        queries = [q.strip() for q in options["queries"].split(",") if q.strip()]
+        if options["db"]:
+            self.bench_database(queries, options["repeat"])
+            return
+
+        sizes = [int(size) for size in options["sizes"].split(",")]
+        self.stdout.write(
+            f"{'books':>10} {'build s':>9} {'index ms':>10} {'scan ms':>10}  query"
+        )
+        for size in sizes:
+            index = InvertedIndex()
+            rows = []
+            start = time.perf_counter()
+            for doc_id, fields in synthetic_documents(size, options["seed"]):
+                index.add(doc_id, fields)
+                rows.append((doc_id, " ".join(v for v in fields.values() if v).lower()))
+            build = time.perf_counter() - start
+
+            for query in queries:
+                tokens = tokenize(query)
+
+                def scan():
+                    return [d for d, text in rows if all(t in text for t in tokens)]
+
+                index_ms = timed(lambda: index.search(query), options["repeat"])
+                scan_ms = timed(scan, max(1, options["repeat"] // 2))
+                self.stdout.write(
+                    f"{size:>10} {build:>9.1f} {index_ms:>10.2f} {scan_ms:>10.2f}  {query}"
+                )
+            del index, rows
+
+    def bench_database(self, queries, repeat):
+        search = BookSearchFilter()
+        total = Book.objects.count()
+        self.stdout.write(f"{total} books in the database")
+        self.stdout.write(f"{'fulltext ms':>12} {'icontains ms':>13}  query")
+        for query in queries:
+
+            def fulltext():
+                qs = search.filter_queryset(
+                    _FakeRequest(query), Book.objects.all(), view=None
+                )
+                return list(qs.values_list("id", flat=True)[:10])
+
+            def icontains():
+                condition = Q()
+                for term in query.split():
+                    condition &= (
+                        Q(title__icontains=term)
+                        | Q(subtitle__icontains=term)
+                        | Q(isbn__icontains=term)
+                    )
+                return list(Book.objects.filter(condition).values_list("id", flat=True)[:10])
+
+            self.stdout.write(
+                f"{timed(fulltext, repeat):>12.2f} {timed(icontains, repeat):>13.2f}  {query}"
+            )
+
+
+class _FakeRequest:
+    def __init__(self, query):
+        self.query_params = {BookSearchFilter.search_param: query}
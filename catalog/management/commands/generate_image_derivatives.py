@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from catalog.images import generate_derivatives
+from catalog.models import Author, Book
+from users.models import Member
+
+
+# --> (model, image field) pairs that carry derivatives
+IMAGE_FIELDS = [
+    (Book, "cover_image"),
+    (Author, "photo"),
+    (Member, "profile_picture"),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the resized WebP derivatives of every stored cover and photo that "
+        "is missing them (after a backfill, a failed background job, or a change "
+        "to catalog.images.IMAGE_SIZES with --force)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force", action="store_true", help="Rebuild derivatives that already exist"
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        images = built = 0
+        for model, name in IMAGE_FIELDS:
+            kind = model._meta.get_field(name).kind
+            keys = (
+                model.objects.exclude(**{f"{name}__isnull": True})
+                .exclude(**{name: ""})
+                .values_list(name, flat=True)
+                .iterator(chunk_size=1000)
+            )
+            for key in keys:
+                images += 1
+                built += len(generate_derivatives(key, kind, force=options["force"]))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Checked {images} images, built {built} derivatives "
+                f"in {time.perf_counter() - start:.2f}s."
+            )
+        )
@@ -0,0 +1,87 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.importers import CatalogImporter, detect_format, iter_records
+
+try:
+    import resource
+except ImportError:  # --> Not available on Windows
+    resource = None
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream authors, categories and books from a JSON array (fixture style), "
+        "NDJSON or CSV file into the catalog, upserting books by ISBN in batches. "
+        "Book rows reference authors/categories by in-file id (author, category) "
+        "or by name (author_name \"First Last\", category_name)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format",
+            choices=["json", "ndjson", "csv"],
+            help="Input format (default: from the file extension)",
+        )
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument(
+            "--update-stock",
+            action="store_true",
+            help="Also overwrite total/available copies of books that already exist",
+        )
+        parser.add_argument(
+            "--progress",
+            type=int,
+            default=100000,
+            help="Report throughput every N records (0 to disable)",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or detect_format(path)
+        if fmt is None:
+            raise CommandError("Cannot tell the format from the extension, pass --format.")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        importer = CatalogImporter(
+            batch_size=options["batch_size"], update_stock=options["update_stock"]
+        )
+        progress = options["progress"]
+        start = time.perf_counter()
+        try:
+            with open(path, encoding="utf-8", newline="" if fmt == "csv" else None) as stream:
+                for number, record in iter_records(stream, fmt):
+                    importer.feed(number, record)
+                    if progress and importer.stats["records"] % progress == 0:
+                        self.report_progress(importer.stats, start)
+            stats = importer.finish()
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+        elapsed = time.perf_counter() - start
+
+        for number, message in importer.errors:
+            self.stderr.write(f"  record {number}: {message}")
+        if stats["errors"] > len(importer.errors):
+            self.stderr.write(f"  ... and {stats['errors'] - len(importer.errors)} more")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Read {stats['records']} records in {elapsed:.2f}s "
+                f"({stats['records'] / elapsed if elapsed else 0:.0f} records/s): "
+                f"{stats['books']} books upserted, {stats['authors']} authors and "
+                f"{stats['categories']} categories created, {stats['errors']} rejected."
+            )
+        )
+        if resource is not None:
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            self.stdout.write(f"Peak memory: {peak:.0f} MB")
+
+    def report_progress(self, stats, start):
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"  {stats['records']} records, {stats['books']} books "
+            f"({stats['records'] / elapsed if elapsed else 0:.0f} records/s)"
+        )
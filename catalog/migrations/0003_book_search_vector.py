@@ -0,0 +1,48 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:34
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+BACKFILL_SQL = """
+UPDATE catalog_book AS b SET search_vector =
+    setweight(to_tsvector('simple', coalesce(b.title, '') || ' ' || coalesce(b.isbn, '')), 'A')
+    || setweight(to_tsvector('simple', coalesce(b.subtitle, '') || ' ' || coalesce(
+        (SELECT a.first_name || ' ' || a.last_name FROM catalog_author AS a WHERE a.id = b.author_id),
+        ''
+    )), 'B')
+    || setweight(to_tsvector('simple', coalesce(b.description, '')), 'D')
+"""
+
+
+def create_search_index(apps, schema_editor):
+    # --> tsvector/GIN only exist on PostgreSQL; other backends use catalog.search.InvertedIndex
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(BACKFILL_SQL)
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS catalog_book_search_vector_gin "
+        "ON catalog_book USING gin (search_vector)"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS catalog_book_search_vector_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0002_alter_author_photo_alter_book_cover_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:55
+
+import catalog.images
+import catalog.validators
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_book_search_vector'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='author',
+            name='photo',
+            field=catalog.images.LibraryImageField(blank=True, kind='photo', null=True, validators=[catalog.validators.validate_file_size], verbose_name='photo'),
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='cover_image',
+            field=catalog.images.LibraryImageField(blank=True, kind='cover', null=True, validators=[catalog.validators.validate_file_size], verbose_name='cover_image'),
+        ),
+    ]
@@ -1,7 +1,8 @@
 from django.db import models
+from django.contrib.postgres.search import SearchVectorField
 from catalog.validators import validate_file_size
 
-from cloudinary.models import CloudinaryField
+from catalog.images import LibraryImageField
 
 
 class Author(models.Model):
@@ -10,8 +11,9 @@ class Author(models.Model):
     biography = models.TextField(blank=True, null=True)
     birth_date = models.DateField(blank=True, null=True)
     death_date = models.DateField(blank=True, null=True)
-    photo = CloudinaryField(
+    photo = LibraryImageField(
         "photo",
+        kind="photo",
         blank=True,
         null=True,
         validators=[validate_file_size],
@@ -46,8 +48,9 @@ class Book(models.Model):
     )
     publication_date = models.DateField(blank=True, null=True)
     publisher = models.CharField(max_length=150, blank=True, null=True)
-    cover_image = CloudinaryField(
+    cover_image = LibraryImageField(
         "cover_image",
+        kind="cover",
         blank=True,
         null=True,
         validators=[validate_file_size],
@@ -60,6 +63,8 @@ class Book(models.Model):
     )
     total_copies = models.PositiveIntegerField(default=1)
     available_copies = models.PositiveIntegerField(default=1)
+    # --> Maintained by catalog.signals, GIN indexed on PostgreSQL
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -72,3 +77,8 @@ class Book(models.Model):
 
     class Meta:
         ordering = ["title"]
+        indexes = [
+            # --> Default list order and the (title, id) keyset cursor
+            models.Index(fields=["title", "id"]),
+            models.Index(fields=["publication_date"]),
+        ]
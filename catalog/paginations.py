@@ -1,4 +1,356 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+import operator
+from functools import reduce
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F, Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.filters import SearchFilter
+from rest_framework.pagination import (
+    BasePagination,
+    Cursor,
+    CursorPagination,
+    PageNumberPagination,
+)
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+# --> Below this many rows an exact COUNT(*) is cheap enough to just run
+EXACT_COUNT_THRESHOLD = 1000
+
+
+def estimate_count(queryset):
+    """
+    Planner row estimate for a queryset instead of an exact COUNT(*)
+    - Unfiltered: pg_class.reltuples of the table
+    - Filtered: the "Plan Rows" figure from EXPLAIN
+    Falls back to count() off PostgreSQL or when the estimate is small/unknown.
+    """
+
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return queryset.count()
+
+    if not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        estimate = row[0] if row else -1
+    else:
+        plan = json.loads(queryset.order_by().explain(format="json"))
+        estimate = int(plan[0]["Plan"]["Plan Rows"])
+
+    if estimate < EXACT_COUNT_THRESHOLD:
+        return queryset.count()
+    return estimate
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        return estimate_count(self.object_list)
+
 
 class DefaultPagination(PageNumberPagination):
     page_size = 10
+    count_query_param = "count"
+
+    def wants_estimate(self, request):
+        return request.query_params.get(self.count_query_param) == "estimate"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_is_estimate = self.wants_estimate(request)
+        self.django_paginator_class = (
+            EstimatedCountPaginator if self.count_is_estimate else Paginator
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count_is_estimate:
+            response.data["count_is_estimate"] = True
+        return response
+
+
+def reverse_ordering(ordering):
+    return tuple(field[1:] if field.startswith("-") else f"-{field}" for field in ordering)
+
+
+def nullable_fields(model, ordering):
+    """---Ordering fields that can be NULL, through any nullable relation on the way---"""
+
+    nullable = set()
+    for field in ordering:
+        name = field.lstrip("-")
+        opts = model._meta
+        try:
+            for part in name.split("__"):
+                model_field = opts.get_field(part)
+                if model_field.null:
+                    nullable.add(name)
+                    break
+                if not model_field.is_relation:
+                    break
+                opts = model_field.related_model._meta
+        except FieldDoesNotExist:
+            nullable.add(name)  # --> Annotations and the like: assume the worst
+    return nullable
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination on the full ordering tuple, e.g. (title, id).
+    The cursor stores the last row's value for every ordering field, so the
+    next page is a plain range scan on the index: page N costs the same as
+    page 1 and ties on the leading field never need an OFFSET.
+    NULLs sort as the largest value (PostgreSQL's default, made explicit so
+    every backend agrees) and are stored in the cursor as JSON null.
+    """
+
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-id",)
+    tiebreak = "id"
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view))
+        fields = {field.lstrip("-") for field in ordering}
+        if self.tiebreak not in fields and "pk" not in fields:
+            descending = ordering[-1].startswith("-")
+            ordering.append(f"-{self.tiebreak}" if descending else self.tiebreak)
+        return tuple(ordering)
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip("-")
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            values.append(None if value is None else str(value))
+        return json.dumps(values)
+
+    def _order_by(self, ordering, nullable):
+        order_by = []
+        for field in ordering:
+            name = field.lstrip("-")
+            if name not in nullable:
+                order_by.append(field)
+            elif field.startswith("-"):
+                order_by.append(F(name).desc(nulls_first=True))
+            else:
+                order_by.append(F(name).asc(nulls_last=True))
+        return order_by
+
+    def _after(self, position, ordering, reverse, nullable=()):
+        """
+        Q for rows strictly after `position` in lexicographic ordering order
+        - nullable: fields that can be NULL; only these get IS NULL branches,
+          so NOT NULL columns keep a plain range condition
+        """
+
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if (
+            not isinstance(values, list)
+            or len(values) != len(ordering)
+            or not all(value is None or isinstance(value, str) for value in values)
+        ):
+            raise NotFound(self.invalid_cursor_message)
+
+        names = [field.lstrip("-") for field in ordering]
+        clauses = []
+        for i, field in enumerate(ordering):
+            name, value = names[i], values[i]
+            descending = field.startswith("-") != reverse
+            if value is None:
+                if not descending:
+                    continue  # --> Nothing sorts after NULL going up
+                after = Q(**{f"{name}__isnull": False})
+            else:
+                after = Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+                if name in nullable and not descending:
+                    after |= Q(**{f"{name}__isnull": True})
+            equal = Q(
+                *[
+                    Q(**{f"{names[j]}__isnull": True})
+                    if values[j] is None
+                    else Q(**{names[j]: values[j]})
+                    for j in range(i)
+                ]
+            )
+            clauses.append(equal & after)
+        if not clauses:
+            return Q(pk__in=[])  # --> Past the last row: an empty page
+        return reduce(operator.or_, clauses)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        nullable = nullable_fields(queryset.model, self.ordering)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, current_position = False, None
+        else:
+            _, reverse, current_position = self.cursor
+
+        ordering = reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*self._order_by(ordering, nullable))
+
+        if current_position is not None:
+            queryset = queryset.filter(
+                self._after(current_position, self.ordering, reverse, nullable)
+            )
+
+        # --> One extra row tells us whether another page follows
+        results = list(queryset[: self.page_size + 1])
+        self.page = results[: self.page_size]
+
+        has_following = len(results) > len(self.page)
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = current_position is not None
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = current_position is not None
+
+        # --> Links point just past the last row / just before the first row
+        if self.page:
+            self.next_position = self._get_position_from_instance(self.page[-1], self.ordering)
+            self.previous_position = self._get_position_from_instance(self.page[0], self.ordering)
+        else:
+            self.next_position = self.previous_position = None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or self.next_position is None:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.next_position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.previous_position is None:
+            # --> Ran off the end of the data: start over from the first page
+            url = remove_query_param(self.base_url, self.cursor_query_param)
+            return replace_query_param(url, LibraryPagination.mode_query_param, "cursor")
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=True, position=self.previous_position)
+        )
+
+
+class LibraryPagination(BasePagination):
+    """
+    Page-number pagination by default, keyset cursors on request
+    - ?page=N (&count=estimate to skip the exact COUNT(*))
+    - ?pagination=cursor, or any ?cursor=..., switches to KeysetPagination
+      ordered by the view's `cursor_ordering`
+    - Cursors with ?search= are refused (400): the keyset ordering would
+      silently replace the search ranking
+    """
+
+    mode_query_param = "pagination"
+    page_number_class = DefaultPagination
+    cursor_class = KeysetPagination
+
+    def __init__(self):
+        self.delegate = self.page_number_class()
+
+    def wants_cursor(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == "cursor"
+            or self.cursor_class.cursor_query_param in request.query_params
+        )
+
+    def searching(self, request, view):
+        """---Whether a search filter of the view ranks this request's results---"""
+
+        return any(
+            issubclass(backend, SearchFilter) and request.query_params.get(backend.search_param)
+            for backend in getattr(view, "filter_backends", ())
+        )
+
+    def get_cursor_paginator(self, view):
+        paginator = self.cursor_class()
+        ordering = getattr(view, "cursor_ordering", None)
+        if ordering:
+            paginator.ordering = ordering
+        return paginator
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.wants_cursor(request):
+            if self.searching(request, view):
+                raise ValidationError(
+                    {
+                        self.mode_query_param: "Cursor pages follow a fixed ordering and would "
+                        "drop the search ranking; page through ?search= results with ?page=."
+                    }
+                )
+            self.delegate = self.get_cursor_paginator(view)
+            page = self.delegate.paginate_queryset(queryset, request, view)
+            self.count = (
+                estimate_count(queryset)
+                if request.query_params.get(DefaultPagination.count_query_param) == "estimate"
+                else None
+            )
+            return page
+        self.delegate = self.page_number_class()
+        self.count = None
+        return self.delegate.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = self.delegate.get_paginated_response(data)
+        if self.count is not None:
+            response.data = {"count": self.count, "count_is_estimate": True, **response.data}
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        return self.delegate.get_paginated_response_schema(schema)
+
+    def to_html(self):
+        return self.delegate.to_html()
+
+    @property
+    def display_page_controls(self):
+        return getattr(self.delegate, "display_page_controls", False)
+
+    def get_schema_operation_parameters(self, view):
+        cursor = self.get_cursor_paginator(view)
+        return (
+            self.page_number_class().get_schema_operation_parameters(view)
+            + cursor.get_schema_operation_parameters(view)
+            + [
+                {
+                    "name": self.mode_query_param,
+                    "required": False,
+                    "in": "query",
+                    "description": "Set to 'cursor' for keyset pagination.",
+                    "schema": {"type": "string", "enum": ["page", "cursor"]},
+                },
+                {
+                    "name": DefaultPagination.count_query_param,
+                    "required": False,
+                    "in": "query",
+                    "description": "Set to 'estimate' to use a planner row estimate.",
+                    "schema": {"type": "string", "enum": ["exact", "estimate"]},
+                },
+            ]
+        )
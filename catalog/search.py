@@ -0,0 +1,234 @@
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import Case, F, FloatField, Value, When
+from rest_framework.filters import SearchFilter
+
+from catalog.models import Book
+
+
+SEARCH_CONFIG = "simple"
+TOKEN_RE = re.compile(r"\w+")
+
+# --> Same weights PostgreSQL's ts_rank gives to the A/B/C/D labels
+WEIGHTS = {"A": 1.0, "B": 0.4, "C": 0.2, "D": 0.1}
+
+# --> Which Book text lands in which weight class
+WEIGHTED_FIELDS = {
+    "A": ("title", "isbn"),
+    "B": ("subtitle", "author_name"),
+    "D": ("description",),
+}
+
+# --> The fallback ranks in SQL with CASE/WHEN, so only the best hits are kept
+MAX_FALLBACK_RESULTS = 500
+
+# --> Fields whose change requires re-indexing a book
+INDEXED_FIELDS = {"title", "isbn", "subtitle", "description", "author", "author_id"}
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+def uses_postgres_search():
+    return connection.vendor == "postgresql"
+
+
+def book_search_vector(author_name):
+    """---tsvector expression for Book rows, the author name passed in as a value---"""
+
+    return (
+        SearchVector("title", "isbn", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("subtitle", Value(author_name or ""), weight="B", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="D", config=SEARCH_CONFIG)
+    )
+
+
+def prefix_search_query(terms):
+    """---Every term must match as a word prefix (search-as-you-type)---"""
+
+    tokens = [token for term in terms for token in tokenize(term)]
+    if not tokens:
+        return None
+    raw = " & ".join(f"{token}:*" for token in tokens)
+    return SearchQuery(raw, search_type="raw", config=SEARCH_CONFIG)
+
+
+class InvertedIndex:
+    """
+    In-process inverted index used when the database has no full-text support
+    (SQLite test runs). Postings map a token to {book_id: score}; a sorted
+    vocabulary lets prefix lookups bisect instead of scanning every term.
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.documents = {}
+        self.vocabulary = []
+        self._vocabulary_dirty = False
+        self.lock = threading.RLock()
+
+    def add(self, doc_id, fields):
+        """fields: {"title": "...", "author_name": "...", ...}"""
+
+        with self.lock:
+            self.remove(doc_id)
+            scores = defaultdict(float)
+            for weight, names in WEIGHTED_FIELDS.items():
+                for name in names:
+                    for token in tokenize(fields.get(name)):
+                        scores[token] += WEIGHTS[weight]
+            for token, score in scores.items():
+                if token not in self.postings:
+                    self._vocabulary_dirty = True
+                self.postings[token][doc_id] = score
+            self.documents[doc_id] = tuple(scores)
+
+    def remove(self, doc_id):
+        with self.lock:
+            for token in self.documents.pop(doc_id, ()):
+                docs = self.postings.get(token)
+                if docs is None:
+                    continue
+                docs.pop(doc_id, None)
+                if not docs:
+                    del self.postings[token]
+                    self._vocabulary_dirty = True
+
+    def _terms_with_prefix(self, prefix):
+        if self._vocabulary_dirty:
+            self.vocabulary = sorted(self.postings)
+            self._vocabulary_dirty = False
+        start = bisect_left(self.vocabulary, prefix)
+        for term in self.vocabulary[start:]:
+            if not term.startswith(prefix):
+                break
+            yield term
+
+    def search(self, query):
+        """---Return {doc_id: score} for documents matching every query token---"""
+
+        tokens = tokenize(query)
+        if not tokens:
+            return {}
+
+        with self.lock:
+            results = None
+            for token in tokens:
+                matches = defaultdict(float)
+                for term in self._terms_with_prefix(token):
+                    for doc_id, score in self.postings[term].items():
+                        matches[doc_id] += score
+                if results is None:
+                    results = matches
+                else:
+                    results = {
+                        doc_id: score + matches[doc_id]
+                        for doc_id, score in results.items()
+                        if doc_id in matches
+                    }
+                if not results:
+                    return {}
+            return dict(results)
+
+    def __len__(self):
+        return len(self.documents)
+
+
+class BookIndex:
+    """---Lazily built InvertedIndex over the Book table, kept fresh by signals---"""
+
+    def __init__(self):
+        self.index = None
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def document(book):
+        return {
+            "title": book.title,
+            "isbn": book.isbn,
+            "subtitle": book.subtitle,
+            "author_name": str(book.author) if book.author else "",
+            "description": book.description,
+        }
+
+    def get(self):
+        with self.lock:
+            if self.index is None:
+                index = InvertedIndex()
+                books = Book.objects.select_related("author").only(
+                    "title",
+                    "isbn",
+                    "subtitle",
+                    "description",
+                    "author__first_name",
+                    "author__last_name",
+                )
+                for book in books.iterator(chunk_size=2000):
+                    index.add(book.pk, self.document(book))
+                self.index = index
+            return self.index
+
+    def update(self, book):
+        if self.index is not None:
+            self.index.add(book.pk, self.document(book))
+
+    def remove(self, book_id):
+        if self.index is not None:
+            self.index.remove(book_id)
+
+    def reset(self):
+        with self.lock:
+            self.index = None
+
+
+book_index = BookIndex()
+
+
+class BookSearchFilter(SearchFilter):
+    """
+    Ranked full-text search for ?search=
+    - PostgreSQL: matches Book.search_vector (GIN indexed), ordered by ts_rank
+    - Other databases: in-process inverted index, same weighting
+    Results come back best match first unless ?ordering= overrides it.
+    """
+
+    search_title = "Search"
+    search_description = "Full-text search over title, subtitle, isbn, author and description."
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        if uses_postgres_search():
+            query = prefix_search_query(terms)
+            if query is None:
+                return queryset.none()
+            return (
+                queryset.filter(search_vector=query)
+                .annotate(search_rank=SearchRank(F("search_vector"), query))
+                .order_by("-search_rank", "title", "id")
+            )
+
+        scores = book_index.get().search(" ".join(terms))
+        if not scores:
+            return queryset.none()
+        if len(scores) > MAX_FALLBACK_RESULTS:
+            best = sorted(scores, key=scores.get, reverse=True)[:MAX_FALLBACK_RESULTS]
+            scores = {pk: scores[pk] for pk in best}
+        return (
+            queryset.filter(pk__in=scores)
+            .annotate(
+                search_rank=Case(
+                    *[When(pk=pk, then=Value(score)) for pk, score in scores.items()],
+                    output_field=FloatField(),
+                )
+            )
+            .order_by("-search_rank", "title", "id")
+        )
@@ -1,11 +1,49 @@
 from rest_framework import serializers
 
+from catalog.images import image_urls
 from catalog.models import Author, Category, Book
 
 
+class StoredImageField(serializers.ImageField):
+    """---Accepts an image upload; reads back as the original's URL---"""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        if not isinstance(value, str):
+            return super().to_representation(value)
+        return self.absolute(image_urls(value, self.kind)["original"])
+
+    @property
+    def kind(self):
+        return self.parent.Meta.model._meta.get_field(self.source).kind
+
+    def absolute(self, url):
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request and url.startswith("/") else url
+
+
+class ImageUrlsField(StoredImageField):
+    """
+    Read-only {"original", "thumb", "small", "medium"} URLs of a stored image
+    - Built from the stored key alone: no storage or network call per row
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(read_only=True, **kwargs)
+
+    def to_representation(self, value):
+        if not value or not isinstance(value, str):
+            return None
+        return {
+            size: self.absolute(url) for size, url in image_urls(value, self.kind).items()
+        }
+
+
 class AuthorSerializer(serializers.ModelSerializer):
     full_name = serializers.SerializerMethodField(method_name="get_full_name")
-    photo = serializers.ImageField()
+    photo = StoredImageField()
+    photo_urls = ImageUrlsField(source="photo")
 
     class Meta:
         model = Author
@@ -18,6 +56,7 @@ class AuthorSerializer(serializers.ModelSerializer):
             "birth_date",
             "death_date",
             "photo",
+            "photo_urls",
         ]
 
     def get_full_name(self, obj):
@@ -33,7 +72,11 @@ class CategorySerializer(serializers.ModelSerializer):
 class BookSerializer(serializers.ModelSerializer):
     author_name = serializers.SerializerMethodField(method_name="get_author_name")
     category_name = serializers.SerializerMethodField(method_name="get_category_name")
-    cover_image = serializers.ImageField()
+    cover_image = StoredImageField()
+    cover_image_urls = ImageUrlsField(source="cover_image")
+
+    # --> Relations read by the method fields; joined once by the viewset
+    select_related_fields = ["author", "category"]
 
     class Meta:
         model = Book
@@ -44,6 +87,7 @@ class BookSerializer(serializers.ModelSerializer):
             "isbn",
             "description",
             "cover_image",
+            "cover_image_urls",
             "category",
             "category_name",
             "publication_date",
@@ -55,8 +99,13 @@ class BookSerializer(serializers.ModelSerializer):
             "availability_status",
         ]
 
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Join the relations this serializer dereferences per row"""
+        return queryset.select_related(*cls.select_related_fields)
+
     def get_author_name(self, obj):
-        return str(obj.author)
+        return str(obj.author) if obj.author else None
 
     def get_category_name(self, obj):
-        return obj.category.name
+        return obj.category.name if obj.category else None
@@ -0,0 +1,61 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from catalog.cache import invalidate, invalidate_books
+from catalog.models import Author, Book, Category
+from catalog.search import (
+    INDEXED_FIELDS,
+    book_index,
+    book_search_vector,
+    uses_postgres_search,
+)
+
+
+@receiver(post_save, sender=Book)
+def index_book(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not INDEXED_FIELDS.intersection(update_fields):
+        return  # --> e.g. only available_copies changed
+
+    if uses_postgres_search():
+        author_name = str(instance.author) if instance.author_id else ""
+        Book.objects.filter(pk=instance.pk).update(
+            search_vector=book_search_vector(author_name)
+        )
+    else:
+        book_index.update(instance)
+
+
+@receiver(post_delete, sender=Book)
+def unindex_book(sender, instance, **kwargs):
+    book_index.remove(instance.pk)
+
+
+@receiver(post_save, sender=Author)
+def reindex_author_books(sender, instance, created, **kwargs):
+    if created:
+        return
+
+    if uses_postgres_search():
+        Book.objects.filter(author=instance).update(
+            search_vector=book_search_vector(str(instance))
+        )
+    elif book_index.index is not None:
+        for book in Book.objects.filter(author=instance).select_related("author"):
+            book_index.update(book)
+
+
+@receiver([post_save, post_delete], sender=Book)
+def invalidate_book_responses(sender, instance, **kwargs):
+    invalidate_books([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Author)
+def invalidate_author_responses(sender, instance, **kwargs):
+    # --> Books embed author_name, so every book response goes too
+    invalidate("authors", "authors:details", "books", "books:details")
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_responses(sender, instance, **kwargs):
+    # --> Books embed category_name
+    invalidate("categories", "categories:details", "books", "books:details")
@@ -1,3 +1,504 @@
-from django.test import TestCase
+import tempfile
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import DataError, IntegrityError
+from django.test import TestCase, override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from catalog import images
+from catalog.cache import get_cache, response_timeout
+from catalog.importers import CatalogImporter
+from catalog.models import Author, Book, Category
+from catalog.paginations import KeysetPagination
+from catalog.search import InvertedIndex, book_index, uses_postgres_search
+from catalog.views import AuthorViewSet, BookViewSet
+from circulation.models import BookPopularity, DailyBorrowCount
+
+
+class KeysetPaginationTests(TestCase):
+    """---Walking cursors over a nullable ordering field, both ways---"""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name="Ann", last_name="Lee")
+        category = Category.objects.create(name="Fiction")
+        published = [date(2001, 1, 1), None, date(1999, 5, 5), None, date(2001, 1, 1), None]
+        cls.books = [
+            Book.objects.create(
+                title=f"Book {i}",
+                isbn=f"isbn-{i}",
+                author=author,
+                category=category,
+                publication_date=day,
+            )
+            for i, day in enumerate(published)
+        ]
+
+    def paginate(self, url, ordering):
+        paginator = KeysetPagination()
+        paginator.ordering = ordering
+        paginator.page_size = 2
+        page = paginator.paginate_queryset(
+            Book.objects.all(), Request(APIRequestFactory().get(url))
+        )
+        return [book.pk for book in page], paginator
+
+    def walk(self, ordering):
+        """---Pages forward to the end via next links, then back via previous links---"""
+
+        forward, url = [], "/api/v1/books/"
+        while url:
+            page, paginator = self.paginate(url, ordering)
+            forward.append(page)
+            url = paginator.get_next_link()
+        backward, url = [], paginator.get_previous_link()
+        while url:
+            page, paginator = self.paginate(url, ordering)
+            backward.insert(0, page)
+            url = paginator.get_previous_link() if paginator.has_previous else None
+        return forward, backward
+
+    def expected(self, descending):
+        # --> NULL sorts as the largest value
+        def key(book):
+            return (book.publication_date is None, book.publication_date or date.min, book.pk)
+
+        ordered = sorted(self.books, key=key, reverse=descending)
+        ids = [book.pk for book in ordered]
+        return [ids[i : i + 2] for i in range(0, len(ids), 2)]
+
+    def test_ascending_with_nulls(self):
+        forward, backward = self.walk(("publication_date", "id"))
+
+        self.assertEqual(forward, self.expected(descending=False))
+        self.assertEqual(backward, forward[:-1])
+
+    def test_descending_with_nulls(self):
+        forward, backward = self.walk(("-publication_date", "-id"))
+
+        self.assertEqual(forward, self.expected(descending=True))
+        self.assertEqual(backward, forward[:-1])
+
+    def test_cursor_position_keeps_nulls(self):
+        page, paginator = self.paginate("/api/v1/books/", ("-publication_date", "-id"))
+
+        self.assertEqual(page, [self.books[5].pk, self.books[3].pk])
+        self.assertEqual(paginator.next_position, f'[null, "{self.books[3].pk}"]')
+
+
+class ResponseTimeoutTests(TestCase):
+    """---Availability-bearing responses expire early when every worker has its own cache---"""
+
+    @override_settings(CATALOG_CACHE_LOCAL_TTL=7)
+    def test_process_local_cache(self):
+        self.assertEqual(response_timeout(BookViewSet()), 7)
+        self.assertIs(response_timeout(AuthorViewSet()), DEFAULT_TIMEOUT)
+
+    def test_shared_cache(self):
+        with tempfile.TemporaryDirectory() as location:
+            shared = {
+                "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+                "catalog": {
+                    "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                    "LOCATION": location,
+                },
+            }
+            with override_settings(CACHES=shared):
+                self.assertNotIn("LocMem", type(get_cache()).__name__)
+                self.assertIs(response_timeout(BookViewSet()), DEFAULT_TIMEOUT)
+
+
+@mock.patch("catalog.conditional.time.time", return_value=1_700_000_000.0)
+class ConditionalGetTests(TestCase):
+    """---ETags of book responses follow the author and category names they embed---"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = Author.objects.create(first_name="Ann", last_name="Lee")
+        cls.category = Category.objects.create(name="Fiction")
+        cls.book = Book.objects.create(
+            title="Dune", isbn="9780441013593", author=cls.author, category=cls.category
+        )
+
+    def get(self, url, etag=None):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.client.get(url, **headers)
+
+    def rename(self, instance, **fields):
+        for name, value in fields.items():
+            setattr(instance, name, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.save()
+
+    def test_detail_etag_follows_author(self, _):
+        url = f"/api/v1/books/{self.book.pk}/"
+        etag = self.get(url)["ETag"]
+        self.assertEqual(self.get(url, etag).status_code, 304)
+
+        self.rename(self.author, last_name="Leeward")
+
+        response = self.get(url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertIn("Leeward", response.json()["author_name"])
+
+    def test_list_etag_follows_category_without_queries(self, _):
+        url = "/api/v1/books/"
+        etag = self.get(url)["ETag"]
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(url, etag).status_code, 304)
+
+        self.rename(self.category, name="Science Fiction")
+
+        response = self.get(url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["category_name"], "Science Fiction")
+
+    def test_list_etag_rolls_over_on_process_local_cache(self, clock):
+        url = "/api/v1/books/"
+        etag = self.get(url)["ETag"]
+
+        clock.return_value += 3600
+
+        self.assertEqual(self.get(url, etag).status_code, 200)
+
+
+class CatalogImporterTests(TestCase):
+    """---Batch side effects the bulk upserts skip signals for, and rejected batches---"""
+
+    def run_import(self, records, batch_size=2000):
+        importer = CatalogImporter(batch_size=batch_size)
+        for number, record in enumerate(records, start=1):
+            importer.feed(number, record)
+        return importer, importer.finish()
+
+    def test_category_change_moves_popularity_counters(self):
+        fiction = Category.objects.create(name="Fiction")
+        book = Book.objects.create(title="Dune", isbn="9780441013593", category=fiction)
+        BookPopularity.objects.create(book=book, category=fiction, borrow_count=4)
+        DailyBorrowCount.objects.create(book=book, category=fiction, day=date(2025, 1, 1))
+
+        self.run_import([{"isbn": book.isbn, "title": "Dune", "category_name": "Sci-Fi"}])
+
+        moved = Category.objects.get(name="Sci-Fi")
+        self.assertEqual(BookPopularity.objects.get(book=book).category, moved)
+        self.assertEqual(DailyBorrowCount.objects.get(book=book).category, moved)
+
+    def test_rejected_batch_is_reported_and_import_continues(self):
+        records = [
+            {"isbn": f"isbn-{i}", "title": f"Book {i}", "author_name": "Ann Lee"}
+            for i in range(1, 6)
+        ]
+        flush_books = CatalogImporter.flush_books
+        calls = []
+
+        def fail_first_batch(importer):
+            calls.append(len(importer.pending_books))
+            if len(calls) == 1:
+                raise IntegrityError("rejected")
+            return flush_books(importer)
+
+        with mock.patch.object(CatalogImporter, "flush_books", fail_first_batch):
+            importer, stats = self.run_import(records, batch_size=2)
+
+        self.assertEqual((stats["books"], stats["errors"], stats["authors"]), (3, 2, 1))
+        self.assertEqual(importer.errors[0][0], 1)
+        self.assertIn("batch of 2 books up to record 2 not written", importer.errors[0][1])
+        self.assertEqual(
+            sorted(Book.objects.values_list("isbn", flat=True)), ["isbn-3", "isbn-4", "isbn-5"]
+        )
+        # --> The author of the rolled-back batch was created with the next one
+        self.assertEqual(Book.objects.get(isbn="isbn-3").author.last_name, "Lee")
+
+    def test_overlong_author_or_category_name_is_a_row_error(self):
+        records = [
+            {"isbn": "isbn-1", "title": "Book 1", "author_name": "A" * 51 + " Lee"},
+            {"isbn": "isbn-2", "title": "Book 2", "category_name": "C" * 101},
+            {"isbn": "isbn-3", "title": "Book 3", "author_name": "Ann Lee"},
+        ]
+
+        importer, stats = self.run_import(records)
+
+        self.assertEqual((stats["books"], stats["authors"], stats["errors"]), (1, 1, 2))
+        self.assertEqual([number for number, _ in importer.errors], [1, 2])
+        self.assertIn("first_name: Ensure this value has at most 50", importer.errors[0][1])
+        self.assertIn("name: Ensure this value has at most 100", importer.errors[1][1])
+
+    def test_authors_of_a_rolled_back_batch_are_dropped(self):
+        records = [
+            {"model": "author", "id": 7, "first_name": "Refused", "last_name": "Author"},
+            {"isbn": "isbn-1", "title": "Book 1", "author": 7},
+            {"isbn": "isbn-2", "title": "Book 2", "author_name": "Ann Lee"},
+            {"isbn": "isbn-3", "title": "Book 3", "author": 7},
+            {"isbn": "isbn-4", "title": "Book 4", "author_name": "Ann Lee"},
+            {"isbn": "isbn-5", "title": "Book 5", "author_name": "Ann Lee"},
+        ]
+        flush_authors = CatalogImporter.flush_authors
+
+        def refuse_author(importer):
+            # --> As PostgreSQL would refuse a value SQLite lets through
+            if ("Refused", "Author") in importer.pending_authors:
+                raise DataError("value too long")
+            return flush_authors(importer)
+
+        with mock.patch.object(CatalogImporter, "flush_authors", refuse_author):
+            importer, stats = self.run_import(records, batch_size=2)
+
+        self.assertEqual((stats["books"], stats["authors"], stats["errors"]), (2, 1, 3))
+        self.assertIn("batch of 2 books up to record 3 not written", importer.errors[0][1])
+        self.assertEqual(importer.errors[1], (4, "unknown author reference 7"))
+        self.assertEqual(
+            list(Book.objects.order_by("isbn").values_list("isbn", "author__last_name")),
+            [("isbn-4", "Lee"), ("isbn-5", "Lee")],
+        )
+
+
+class DerivativeSchedulingTests(TestCase):
+    """---Where WebP derivatives are built: background pool, or inline before the response---"""
+
+    def schedule(self):
+        with mock.patch.object(images, "generate_derivatives") as generate, mock.patch.object(
+            images, "_get_executor"
+        ) as executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                images.schedule_derivatives("covers/dune.jpg", "cover")
+        return generate, executor
+
+    @override_settings(LIBRARY_IMAGES={"ASYNC": False})
+    def test_inline_when_not_async(self):
+        generate, executor = self.schedule()
+
+        generate.assert_called_once_with("covers/dune.jpg", "cover")
+        executor.assert_not_called()
+
+    @override_settings(LIBRARY_IMAGES={"ASYNC": True})
+    def test_background_pool_when_async(self):
+        generate, executor = self.schedule()
+
+        executor.return_value.submit.assert_called_once_with(generate, "covers/dune.jpg", "cover")
+
+
+class BookQueryCountTests(TestCase):
+    """---Book reads cost a fixed number of queries however many books they return---"""
+
+    BOOKS = 12
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.books = []
+        for i in range(cls.BOOKS):
+            book = Book.objects.create(
+                title=f"Book {i}",
+                isbn=f"isbn-{i}",
+                author=Author.objects.create(first_name="Ann", last_name=f"Lee {i}"),
+                category=Category.objects.create(name=f"Category {i}"),
+                total_copies=2,
+                available_copies=i % 2,
+            )
+            BookPopularity.objects.create(book=book, category=book.category, borrow_count=i + 1)
+            cls.books.append(book)
+
+    def setUp(self):
+        get_cache().clear()
+
+    def assert_queries(self, count, url, rows=None):
+        """---GET url in `count` queries; rows: how many books the payload lists---"""
+
+        with self.assertNumQueries(count):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        books = data.get("results", [data]) if isinstance(data, dict) else data
+        if rows is not None:
+            self.assertEqual(len(books), rows)
+        self.assertTrue(all(book["author_name"] and book["category_name"] for book in books))
+
+    def test_list(self):
+        # --> COUNT(*) and one page joined to author and category
+        self.assert_queries(2, "/api/v1/books/", 10)
+
+    def test_retrieve(self):
+        # --> Validators for the ETag, then the book joined to author and category
+        self.assert_queries(2, f"/api/v1/books/{self.books[0].pk}/")
+
+    def test_available(self):
+        # --> The in-stock books joined to author and category; the list ETag needs none
+        self.assert_queries(1, "/api/v1/books/available/", self.BOOKS // 2)
+
+    def test_popular(self):
+        # --> The ranking off the counters, then the ranked books in bulk
+        self.assert_queries(2, "/api/v1/books/popular/", 10)
+
+
+class BookSearchTests(TestCase):
+    """---?search= ranks by field weight, matches word prefixes, ANDs terms, follows edits---"""
+
+    @classmethod
+    def setUpTestData(cls):
+        herbert = Author.objects.create(first_name="Frank", last_name="Herbert")
+        lovecraft = Author.objects.create(first_name="Howard", last_name="Lovecraft")
+        cls.dune = Book.objects.create(title="Dune", isbn="isbn-1", author=herbert)
+        cls.children = Book.objects.create(title="Children of Dune", isbn="isbn-2", author=herbert)
+        cls.west = Book.objects.create(title="Herbert West", isbn="isbn-3", author=lovecraft)
+        cls.pastiche = Book.objects.create(
+            title="Spice Routes", isbn="isbn-4", description="A Herbert pastiche"
+        )
+
+    def setUp(self):
+        # --> The fallback index is per process and outlives each test's rollback
+        book_index.reset()
+        self.addCleanup(book_index.reset)
+        get_cache().clear()
+
+    def search(self, query):
+        response = self.client.get("/api/v1/books/", {"search": query})
+        self.assertEqual(response.status_code, 200)
+        return [book["title"] for book in response.json()["results"]]
+
+    def save(self, instance, **fields):
+        for name, value in fields.items():
+            setattr(instance, name, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.save()
+
+    def test_title_ranks_above_author_above_description(self):
+        self.assertEqual(
+            self.search("herbert"), ["Herbert West", "Children of Dune", "Dune", "Spice Routes"]
+        )
+
+    def test_prefix_matching(self):
+        self.assertEqual(self.search("dun"), ["Children of Dune", "Dune"])  # --> Tie: by title
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.search("dune child"), ["Children of Dune"])
+        self.assertEqual(self.search("herb west"), ["Herbert West"])
+        self.assertEqual(self.search("dune lovecraft"), [])
+
+    def test_book_edit_is_reindexed(self):
+        self.assertEqual(self.search("routes"), ["Spice Routes"])
+
+        self.save(self.pastiche, title="Spice Roads")
+
+        self.assertEqual(self.search("routes"), [])
+        self.assertEqual(self.search("roads"), ["Spice Roads"])
+
+    def test_author_edit_reindexes_their_books(self):
+        self.assertEqual(self.search("lovecraft"), ["Herbert West"])
+
+        self.save(self.west.author, last_name="Phillips")
+
+        self.assertEqual(self.search("lovecraft"), [])
+        self.assertEqual(self.search("phillips"), ["Herbert West"])
+
+    def test_fallback_index_outside_postgresql(self):
+        if uses_postgres_search():
+            self.skipTest("PostgreSQL searches Book.search_vector")
+        self.search("dune")
+
+        self.assertEqual(len(book_index.index), 4)
+        self.dune.delete()
+        self.assertEqual(len(book_index.index), 3)
+
+    def test_cursor_pagination_refused_with_search(self):
+        response = self.client.get("/api/v1/books/", {"search": "dune", "pagination": "cursor"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("pagination", response.json())
+        response = self.client.get("/api/v1/books/", {"pagination": "cursor"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_inverted_index(self):
+        index = InvertedIndex()
+        index.add(1, {"title": "Dune", "author_name": "Frank Herbert"})
+        index.add(2, {"title": "Dunes of Mars", "description": "frank account"})
+
+        self.assertEqual(index.search("dun"), {1: 1.0, 2: 1.0})
+        self.assertEqual(index.search("dun frank"), {1: 1.4, 2: 1.1})
+        self.assertEqual(index.search("dune mars"), {2: 2.0})
+
+        index.add(1, {"title": "Arrakis"})
+
+        self.assertEqual(index.search("dun"), {2: 1.0})
+
+
+class AsyncCatalogViewTests(TestCase):
+    """---async/ endpoints answer like the viewsets and share the response cache---"""
+
+    @classmethod
+    def setUpTestData(cls):
+        fiction = Category.objects.create(name="Fiction")
+        Category.objects.create(name="Poetry")
+        cls.books = [
+            Book.objects.create(
+                title=f"Dune {i}" if i % 3 else f"Emma {i}",
+                isbn=f"isbn-{i:02d}",
+                author=Author.objects.create(first_name="Ann", last_name=f"Lee {i}"),
+                category=fiction,
+            )
+            for i in range(12)
+        ]
+        cls.paths = [
+            "books/",
+            "books/?page=2",
+            "books/?search=dune",
+            "books/?ordering=-title",
+            f"books/{cls.books[0].pk}/",
+            "authors/",
+            "categories/",
+        ]
+
+    def setUp(self):
+        get_cache().clear()
+        book_index.reset()
+
+    def aget(self, path):
+        return async_to_sync(self.async_client.get)(f"/api/v1/async/{path}")
+
+    def test_payloads_match_the_viewsets(self):
+        for path in self.paths:
+            with self.subTest(path=path):
+                response = self.aget(path)
+                expected = self.client.get(f"/api/v1/{path}")
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    response.content.decode().replace("/api/v1/async/", "/api/v1/"),
+                    expected.content.decode(),
+                )
+
+    def test_missing_book_and_page(self):
+        for path in (f"books/{self.books[-1].pk + 1}/", "books/?page=3", "books/?page=x"):
+            with self.subTest(path=path):
+                self.assertEqual(self.aget(path).status_code, 404)
+        response = async_to_sync(self.async_client.post)("/api/v1/async/books/")
+        self.assertEqual(response.status_code, 405)
+
+    def test_second_request_is_a_cache_hit(self):
+        for path in self.paths:
+            with self.subTest(path=path):
+                first = self.aget(path)
+                with self.assertNumQueries(0):
+                    second = self.aget(path)
+
+                self.assertEqual((first["X-Cache"], second["X-Cache"]), ("MISS", "HIT"))
+                self.assertEqual(second.content, first.content)
+
+    def test_edits_invalidate_cached_responses(self):
+        book = self.books[0]
+        self.aget("books/")
+        self.aget(f"books/{book.pk}/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book.title = "Arrakis"  # --> Sorts first, so it is on page 1
+            book.save()
+
+        for path in ("books/", f"books/{book.pk}/"):
+            with self.subTest(path=path):
+                response = self.aget(path)
+                self.assertEqual(response["X-Cache"], "MISS")
+                self.assertIn("Arrakis", response.content.decode())
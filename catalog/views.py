@@ -1,12 +1,15 @@
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from django.db.models import Count, Q
 from rest_framework.viewsets import ModelViewSet
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
 
+from catalog.cache import cached_response
+from catalog.conditional import ConditionalWriteMixin, conditional_response
 from catalog.filters import BookFilter
-from catalog.paginations import DefaultPagination
+from catalog.paginations import LibraryPagination
+from catalog.search import BookSearchFilter
 from catalog.models import Author, Category, Book
 from catalog.serializers import (
     AuthorSerializer,
@@ -15,27 +18,40 @@ from catalog.serializers import (
 )
 
 from circulation.permissions import IsLibrarianOrReadOnly
+from circulation.popularity import WINDOWS, top_books
 
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 
 
-class AuthorViewSet(ModelViewSet):
+class AuthorViewSet(ConditionalWriteMixin, ModelViewSet):
     """
     Manage authors in the library system with CRUD operations
     - Full access for librarians, read-only for users
     - Standard CRUD operations: Create, Read, Update, Delete
+    - Reads are served from the catalog response cache
+    - Conditional requests: ETag/Last-Modified, If-None-Match, If-Match
     """
 
     queryset = Author.objects.all()
     serializer_class = AuthorSerializer
 
     permission_classes = [IsLibrarianOrReadOnly]
+    cache_namespace = "authors"
 
     @swagger_auto_schema(operation_summary="Retrieve a list of authors")
+    @conditional_response
+    @cached_response
     def list(self, request, *args, **kwargs):
         """Retrieve all the Authors"""
         return super().list(request, *args, **kwargs)
 
+    @swagger_auto_schema(operation_summary="Retrieve an author")
+    @conditional_response
+    @cached_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     @swagger_auto_schema(
         operation_summary="Create an author by admin",
         operation_description="This allow an admin to create an author",
@@ -47,23 +63,34 @@ class AuthorViewSet(ModelViewSet):
         return super().create(request, *args, **kwargs)
 
 
-class CategoryViewSet(ModelViewSet):
+class CategoryViewSet(ConditionalWriteMixin, ModelViewSet):
     """
     Manage categories in the library system with CRUD operations
     - Full access for librarians, read-only for users
     - Standard CRUD operations: Create, Read, Update, Delete
+    - Reads are served from the catalog response cache
+    - Conditional requests: ETag/Last-Modified, If-None-Match, If-Match
     """
 
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
     permission_classes = [IsLibrarianOrReadOnly]
+    cache_namespace = "categories"
 
     @swagger_auto_schema(operation_summary="Retrieve a list of categories")
+    @conditional_response
+    @cached_response
     def list(self, request, *args, **kwargs):
         """Retrieve all the Categories"""
         return super().list(request, *args, **kwargs)
 
+    @swagger_auto_schema(operation_summary="Retrieve a category")
+    @conditional_response
+    @cached_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     @swagger_auto_schema(
         operation_summary="Create a category by admin",
         operation_description="This allow an admin to create a category",
@@ -75,45 +102,94 @@ class CategoryViewSet(ModelViewSet):
         return super().create(request, *args, **kwargs)
 
 
-class BookViewSet(ModelViewSet):
+class BookViewSet(ConditionalWriteMixin, ModelViewSet):
     """
     Manage books in the library system with CRUD operations
-     - Search: title, subtitle, isbn
+     - Search: ranked full-text over title, subtitle, isbn, author, description
      - Filter: category, author, publication_year, available_copies
      - Order: created_at, updated_at, title
-     - Custom endpoints: popular/ (top 10 borrowed), available/ (in stock)
+     - Pagination: ?page=N, or keyset cursors with ?pagination=cursor
+     - Reads are served from the catalog response cache
+     - Conditional requests: ETag/Last-Modified, If-None-Match, If-Match
+     - Custom endpoints: popular/ (top 10 borrowed, ?window=7d|30d|all, ?category=),
+       available/ (in stock)
     """
 
-    queryset = Book.objects.all()
     serializer_class = BookSerializer
 
     permission_classes = [IsLibrarianOrReadOnly]
-    pagination_class = DefaultPagination
+    pagination_class = LibraryPagination
+    cursor_ordering = ("title", "id")
+    cache_namespace = "books"
+    cache_live = True  # --> available_copies changes with every borrow and return
+    validator_relations = ("author", "category")  # --> Payload embeds their names
 
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, BookSearchFilter, OrderingFilter]
     filterset_class = BookFilter
-    search_fields = ["title", "subtitle", "isbn"]
     ordering_fields = ["created_at", "updated_at", "title"]
 
+    def get_queryset(self):
+        # --> Every action shares the joins declared by the serializer
+        books = Book.objects.defer("search_vector")
+        return self.get_serializer_class().setup_eager_loading(books)
+
+    @swagger_auto_schema(
+        operation_summary="Top 10 most borrowed books",
+        manual_parameters=[
+            openapi.Parameter(
+                "window",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_STRING,
+                enum=list(WINDOWS),
+                description="Time window (default: all)",
+            ),
+            openapi.Parameter(
+                "category",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                description="Only books in this category",
+            ),
+        ],
+    )
     @action(detail=False, methods=["get"])
+    @cached_response
     def popular(self, request):
-        books = Book.objects.annotate(borrow_count=Count("borrow_records")).order_by(
-            "-borrow_count"
-        )[:10]
-        serializer = self.get_serializer(books, many=True)
+        """Answered from the precomputed popularity counters, not from loans"""
+        window = request.query_params.get("window", "all")
+        if window not in WINDOWS:
+            raise ValidationError({"window": f"Must be one of: {', '.join(WINDOWS)}."})
+
+        category = request.query_params.get("category")
+        if category is not None and not category.isdigit():
+            raise ValidationError({"category": "Must be a category id."})
+
+        ranking = top_books(window, int(category) if category else None)
+        books = self.get_queryset().in_bulk([book_id for book_id, _ in ranking])
+        ordered = [books[book_id] for book_id, _ in ranking if book_id in books]
+        serializer = self.get_serializer(ordered, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=["get"])
+    @conditional_response
+    @cached_response
     def available(self, request):
-        books = Book.objects.filter(available_copies__gt=0).order_by("id")
+        books = self.get_queryset().filter(available_copies__gt=0).order_by("id")
         serializer = self.get_serializer(books, many=True)
         return Response(serializer.data)
 
     @swagger_auto_schema(operation_summary="Retrieve a list of books")
+    @conditional_response
+    @cached_response
     def list(self, request, *args, **kwargs):
         """Retrieve all the Books"""
         return super().list(request, *args, **kwargs)
 
+    @swagger_auto_schema(operation_summary="Retrieve a book")
+    @conditional_response
+    @cached_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     @swagger_auto_schema(
         operation_summary="Create a book by admin",
         operation_description="This allow an admin to create a book",
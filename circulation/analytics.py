@@ -0,0 +1,345 @@
+"""
+Circulation rollups behind the librarian reports
+- CirculationRollup keeps loans, returns, overdue returns, fines assessed
+  (settled at return) and fines paid per dimension value, per day and per
+  month
+- Dimensions: all, book, category, author and member cohort (the month the
+  member joined, as YYYYMM); every event counts once in each of them
+- Circulation events add to the day and month rows as they happen
+  (record_loans, record_returns, record_fine_payment) with the same two
+  statements as the popularity counters; rebuild() recomputes a date range
+  from BorrowRecord and Fine to backfill and repair drift
+- report() and totals() read nothing but these rows: whole months come from
+  the month rows and only the partial months at either end from the day
+  rows, so a multi-year query reads about twelve rows per year and value
+"""
+
+import calendar
+import operator
+from collections import defaultdict
+from datetime import timedelta
+from functools import reduce
+
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import (
+    Cast,
+    Coalesce,
+    ExtractMonth,
+    ExtractYear,
+    NullIf,
+    TruncDate,
+    TruncMonth,
+    TruncYear,
+)
+
+from catalog.models import Author, Book, Category
+from circulation.models import BorrowRecord, CirculationRollup, Fine
+
+
+METRICS = ("loans", "returns", "overdue_returns", "fines_assessed", "fines_paid")
+DIMENSIONS = [dimension for dimension, _ in CirculationRollup.DIMENSIONS]
+PERIODS = {"day": None, "month": TruncMonth, "year": TruncYear}
+ORDERS = (*METRICS, "overdue_rate")
+
+DAY = CirculationRollup.DAY
+MONTH = CirculationRollup.MONTH
+
+
+def cohort(membership_date):
+    return membership_date.year * 100 + membership_date.month
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def _buckets(book, member):
+    """---(dimension, key) of every row one event on this book/member counts in---"""
+
+    return [
+        (CirculationRollup.ALL, 0),
+        (CirculationRollup.BOOK, book.pk),
+        (CirculationRollup.CATEGORY, book.category_id or 0),
+        (CirculationRollup.AUTHOR, book.author_id or 0),
+        (CirculationRollup.COHORT, cohort(member.membership_date)),
+    ]
+
+
+def _add(deltas):
+    """
+    Add {(dimension, key, day): {metric: amount}} to the day and month rows
+    - INSERT ... ON CONFLICT DO NOTHING makes sure every row exists (at 0)
+    - one UPDATE adds each row's amounts with a CASE per metric
+    """
+
+    if not deltas:
+        return
+    rows = defaultdict(lambda: defaultdict(int))
+    for (dimension, key, day), amounts in deltas.items():
+        for grain, start in ((DAY, day), (MONTH, month_start(day))):
+            for metric, amount in amounts.items():
+                rows[(grain, dimension, key, start)][metric] += amount
+
+    updates = {}
+    for metric in METRICS:
+        whens = [
+            When(grain=grain, dimension=dimension, key=key, day=day, then=Value(amounts[metric]))
+            for (grain, dimension, key, day), amounts in rows.items()
+            if amounts.get(metric)
+        ]
+        if whens:
+            field = CirculationRollup._meta.get_field(metric)
+            updates[metric] = F(metric) + Case(*whens, default=Value(0), output_field=field)
+    match = reduce(
+        operator.or_,
+        [
+            Q(grain=grain, dimension=dimension, key=key, day=day)
+            for grain, dimension, key, day in rows
+        ],
+    )
+    # --> Callers are already inside the circulation transaction; no savepoint needed
+    with transaction.atomic(savepoint=False):
+        CirculationRollup.objects.bulk_create(
+            [
+                CirculationRollup(grain=grain, dimension=dimension, key=key, day=day)
+                for grain, dimension, key, day in rows
+            ],
+            ignore_conflicts=True,
+        )
+        CirculationRollup.objects.filter(match).update(**updates)
+
+
+def record_loans(loans, day):
+    """---New loans: [(book, member), ...] borrowed on day---"""
+
+    deltas = defaultdict(lambda: defaultdict(int))
+    for book, member in loans:
+        for dimension, key in _buckets(book, member):
+            deltas[(dimension, key, day)]["loans"] += 1
+    _add(deltas)
+
+
+def record_returns(loans, day, fines=None):
+    """
+    Closed loans (book and member loaded) returned on day
+    fines: {loan_id: amount} settled at return
+    """
+
+    fines = fines or {}
+    deltas = defaultdict(lambda: defaultdict(int))
+    for loan in loans:
+        overdue = day > loan.due_date
+        fine = fines.get(loan.pk, 0)
+        for dimension, key in _buckets(loan.book, loan.member):
+            amounts = deltas[(dimension, key, day)]
+            amounts["returns"] += 1
+            amounts["overdue_returns"] += overdue
+            amounts["fines_assessed"] += fine
+    _add(deltas)
+
+
+def record_fine_payment(loan, amount, day):
+    """---A fine on loan (book and member loaded) paid on day---"""
+
+    _add(
+        {
+            (dimension, key, day): {"fines_paid": amount}
+            for dimension, key in _buckets(loan.book, loan.member)
+        }
+    )
+
+
+# --> Rebuild --------------------------------------------------------------
+
+
+def _bucket_expressions(prefix=""):
+    membership = f"{prefix}member__membership_date"
+    return {
+        CirculationRollup.ALL: Value(0),
+        CirculationRollup.BOOK: F(f"{prefix}book_id"),
+        CirculationRollup.CATEGORY: Coalesce(f"{prefix}book__category_id", 0),
+        CirculationRollup.AUTHOR: Coalesce(f"{prefix}book__author_id", 0),
+        CirculationRollup.COHORT: ExtractYear(membership) * 100 + ExtractMonth(membership),
+    }
+
+
+def _write(rows, batch_size):
+    written, batch = 0, []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            CirculationRollup.objects.bulk_create(batch)
+            written += len(batch)
+            batch = []
+    CirculationRollup.objects.bulk_create(batch)
+    return written + len(batch)
+
+
+def rebuild(since=None, batch_size=5000):
+    """
+    Recompute the rollup rows from BorrowRecord and Fine
+    - since=None: every day; since=date: the days from then on and the
+      months from its month on (month rows are summed from day rows)
+    - Loans count on borrow_date, returns and assessed fines on return_date,
+      paid fines on the day of paid_at
+    - One dimension at a time, so memory is bounded by its rows
+    Returns the number of rows written.
+    """
+
+    loans = BorrowRecord.objects.order_by()
+    returns = BorrowRecord.objects.order_by().filter(is_returned=True).exclude(return_date=None)
+    paid = Fine.objects.order_by().filter(paid=True).exclude(paid_at=None)
+    days = CirculationRollup.objects.order_by().filter(grain=DAY)
+    if since is not None:
+        loans = loans.filter(borrow_date__gte=since)
+        returns = returns.filter(return_date__gte=since)
+        paid = paid.filter(paid_at__date__gte=since)
+        days = days.filter(day__gte=month_start(since))
+
+    written = 0
+    with transaction.atomic():
+        stale = CirculationRollup.objects.all()
+        if since is not None:
+            stale = stale.filter(
+                Q(grain=DAY, day__gte=since) | Q(grain=MONTH, day__gte=month_start(since))
+            )
+        stale.delete()
+
+        loan_buckets = _bucket_expressions()
+        fine_buckets = _bucket_expressions("borrow_record__")
+        for dimension in DIMENSIONS:
+            totals = defaultdict(dict)
+            sources = (
+                loans.values(rollup_day=F("borrow_date"), bucket=loan_buckets[dimension]).annotate(
+                    loans=Count("id")
+                ),
+                returns.values(
+                    rollup_day=F("return_date"), bucket=loan_buckets[dimension]
+                ).annotate(
+                    returns=Count("id"),
+                    overdue_returns=Count("id", filter=Q(return_date__gt=F("due_date"))),
+                    fines_assessed=Sum("fine__amount"),
+                ),
+                paid.values(
+                    rollup_day=TruncDate("paid_at"), bucket=fine_buckets[dimension]
+                ).annotate(fines_paid=Sum("amount")),
+            )
+            for rows in sources:
+                for row in rows.iterator(chunk_size=batch_size):
+                    amounts = totals[(row.pop("bucket"), row.pop("rollup_day"))]
+                    amounts.update((metric, value) for metric, value in row.items() if value)
+            written += _write(
+                (
+                    CirculationRollup(grain=DAY, dimension=dimension, key=key, day=day, **amounts)
+                    for (key, day), amounts in totals.items()
+                ),
+                batch_size,
+            )
+            del totals
+
+            months = (
+                days.filter(dimension=dimension)
+                .values("key", month=TruncMonth("day"))
+                .annotate(**_sums())
+            )
+            written += _write(
+                (
+                    CirculationRollup(
+                        grain=MONTH,
+                        dimension=dimension,
+                        key=row.pop("key"),
+                        day=row.pop("month"),
+                        **row,
+                    )
+                    for row in months.iterator(chunk_size=batch_size)
+                ),
+                batch_size,
+            )
+    return written
+
+
+# --> Reports --------------------------------------------------------------
+
+
+def _sums():
+    return {metric: Sum(metric) for metric in METRICS}
+
+
+def _span(start, end):
+    """
+    Q for the rows covering [start, end]: month rows for the whole months
+    inside it, day rows for the partial months at either end
+    """
+
+    first = start if start.day == 1 else (month_start(start) + timedelta(days=32)).replace(day=1)
+    last_day = calendar.monthrange(end.year, end.month)[1]
+    last = end if end.day == last_day else month_start(end) - timedelta(days=1)
+    if first > last:
+        return Q(grain=DAY, day__gte=start, day__lte=end)
+
+    span = Q(grain=MONTH, day__gte=first, day__lte=month_start(last))
+    if start < first:
+        span |= Q(grain=DAY, day__gte=start, day__lt=first)
+    if last < end:
+        span |= Q(grain=DAY, day__gt=last, day__lte=end)
+    return span
+
+
+def _rows(dimension, start, end, by_day=False):
+    span = Q(grain=DAY, day__gte=start, day__lte=end) if by_day else _span(start, end)
+    return CirculationRollup.objects.filter(span, dimension=dimension)
+
+
+def _finish(row):
+    returns = row["returns"] or 0
+    row["overdue_rate"] = round(row["overdue_returns"] / returns, 4) if returns else None
+    return row
+
+
+def report(dimension, start, end, period="month", key=None):
+    """---[{period, key, loans, returns, ..., overdue_rate}] per period and key---"""
+
+    truncate = PERIODS[period]
+    rows = _rows(dimension, start, end, by_day=truncate is None)
+    if key is not None:
+        rows = rows.filter(key=key)
+    rows = rows.annotate(period=truncate("day") if truncate else F("day"))
+    rows = rows.values("period", "key").annotate(**_sums()).order_by("period", "key")
+    return [_finish(row) for row in rows]
+
+
+def totals(dimension, start, end, order="loans", limit=20):
+    """---Totals per key over [start, end], best `order` first---"""
+
+    rows = _rows(dimension, start, end).values("key").annotate(**_sums())
+    if order == "overdue_rate":
+        rows = rows.annotate(
+            rate=Cast("overdue_returns", FloatField()) / NullIf(Cast("returns", FloatField()), 0.0)
+        )
+        rows = rows.order_by(F("rate").desc(nulls_last=True), "key")
+    else:
+        rows = rows.order_by(f"-{order}", "key")
+    results = []
+    for row in rows[:limit]:
+        row.pop("rate", None)
+        results.append(_finish(row))
+    return results
+
+
+def labels(dimension, keys):
+    """---{key: display name} for report rows (one primary-key lookup)---"""
+
+    keys = set(keys)
+    if dimension == CirculationRollup.BOOK:
+        names = dict(Book.objects.filter(pk__in=keys).values_list("pk", "title"))
+    elif dimension == CirculationRollup.CATEGORY:
+        names = dict(Category.objects.filter(pk__in=keys).values_list("pk", "name"))
+    elif dimension == CirculationRollup.AUTHOR:
+        authors = Author.objects.filter(pk__in=keys).only("first_name", "last_name")
+        names = {author.pk: str(author) for author in authors}
+    elif dimension == CirculationRollup.COHORT:
+        names = {key: f"{key // 100}-{key % 100:02d}" for key in keys}
+    else:
+        names = {0: "All loans"}
+    return {key: names.get(key, "(none)" if key == 0 else "(deleted)") for key in keys}
@@ -0,0 +1,109 @@
+"""
+Hold notifications for the ASGI application
+- GET /async/holds/ready/ answers with the member's ready holds as soon as
+  there is one (long-poll, up to ?timeout= seconds), or streams them as
+  server-sent events when the client sends Accept: text/event-stream
+- A waiting client is a parked coroutine polling one cache key
+  (circulation.holds.wait_for_ready), not a worker thread or a query loop
+- ?since= / Last-Event-ID carry the ready_at of the last hold seen, so a
+  reconnecting client only hears about newer ones
+"""
+
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+
+from catalog.async_views import _json
+from circulation.holds import holds_config, wait_for_ready
+from users.authentication import CachedJWTAuthentication
+
+
+async def _member_id(request):
+    """---(member id, None) for a member's JWT, else (None, error response)---"""
+
+    try:
+        # --> A user-cache miss reads the database, so authenticate off the event loop
+        authenticated = await sync_to_async(CachedJWTAuthentication().authenticate)(
+            Request(request)
+        )
+    except APIException as error:
+        return None, _json({"detail": error.detail}, error.status_code)
+    if authenticated is None:
+        return None, _json({"detail": "Authentication credentials were not provided."}, 401)
+    member = getattr(authenticated[0], "member_profile", None)
+    if authenticated[0].is_staff or member is None:
+        return None, _json({"detail": "Only members have holds."}, 403)
+    return member.pk, None
+
+
+def _since(value):
+    if not value:
+        return None
+    since = parse_datetime(value)
+    if since is None or since.tzinfo is None:
+        raise ValueError(value)
+    return since
+
+
+def _event(holds):
+    """---One SSE event per ready hold; the id is the cursor to resume from---"""
+
+    return "".join(
+        f"id: {hold['ready_at']}\nevent: hold-ready\ndata: {json.dumps(hold)}\n\n"
+        for hold in holds
+    )
+
+
+async def _stream(member_id, since, config):
+    yield "retry: 5000\n\n"
+    loop_for = config["STREAM_TIMEOUT"]
+    while loop_for > 0:
+        wait = min(config["HEARTBEAT"], loop_for)
+        holds = await wait_for_ready(member_id, since, timeout=wait)
+        if holds:
+            since = _since(holds[-1]["ready_at"])
+            yield _event(holds)
+        else:
+            loop_for -= wait
+            yield ": keep-alive\n\n"  # --> Keeps proxies from closing an idle stream
+
+
+@require_GET
+async def holds_ready(request):
+    member_id, error = await _member_id(request)
+    if error is not None:
+        return error
+
+    config = holds_config()
+    try:
+        since = _since(request.GET.get("since") or request.headers.get("Last-Event-ID"))
+    except ValueError:
+        return _json({"since": ["Must be an ISO 8601 datetime with a UTC offset."]}, 400)
+
+    if "text/event-stream" in request.headers.get("Accept", ""):
+        response = StreamingHttpResponse(
+            _stream(member_id, since, config), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # --> Let nginx pass events through unbuffered
+        return response
+
+    timeout = request.GET.get("timeout", str(config["WAIT_TIMEOUT"]))
+    if not timeout.isdigit() or int(timeout) > config["WAIT_TIMEOUT"]:
+        return _json(
+            {"timeout": [f"Must be a whole number from 0 to {config['WAIT_TIMEOUT']}."]}, 400
+        )
+    holds = await wait_for_ready(member_id, since, timeout=int(timeout))
+    response = _json(
+        {
+            "holds": holds,
+            "cursor": holds[-1]["ready_at"] if holds else (since.isoformat() if since else None),
+        }
+    )
+    response["Cache-Control"] = "private, no-cache"
+    return response
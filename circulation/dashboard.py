@@ -0,0 +1,116 @@
+"""
+Member dashboard: everything the member app shows on opening, in one response
+- One aggregate over the member's loans (conditional COUNTs and SUM of unpaid
+  fines) and one query for the current loans with their books
+- Cached in the catalog cache per member, keyed on a per-member generation
+  bumped by every circulation event (borrow, return, bulk desk actions) and
+  on a "fines" generation bumped by the accrual run
+- The date is part of the key, so due-soon/overdue flags roll over at midnight
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from catalog.cache import get_cache, invalidate, live_timeout, versioned_key
+from catalog.images import image_urls
+from circulation.models import BorrowRecord
+
+
+DUE_SOON_DAYS = 3
+MAX_DUE_SOON_DAYS = 60
+
+
+def _generation_names(member_id):
+    return [f"members:{member_id}", "fines"]
+
+
+def invalidate_dashboards(member_ids):
+    """---Circulation event for these members: drop their cached dashboards---"""
+
+    invalidate(*[f"members:{pk}" for pk in set(member_ids)])
+
+
+def summarize(member, today, days):
+    """---Counts and unpaid fine total for one member, in a single aggregate---"""
+
+    outstanding = Q(is_returned=False)
+    return BorrowRecord.objects.filter(member=member).aggregate(
+        on_loan=Count("pk", filter=outstanding),
+        due_soon=Count(
+            "pk",
+            filter=outstanding & Q(due_date__gte=today, due_date__lte=today + timedelta(days=days)),
+        ),
+        overdue=Count("pk", filter=outstanding & Q(due_date__lt=today)),
+        borrowed_total=Count("pk"),
+        unpaid_fines=Sum("fine__amount", filter=Q(fine__paid=False), default=Decimal("0")),
+    )
+
+
+def current_loans(member, today, days, absolute=str):
+    """---Unreturned loans, soonest due first, with the book's title and cover URLs---"""
+
+    loans = (
+        BorrowRecord.objects.filter(member=member, is_returned=False)
+        .select_related("book", "fine")
+        .only(
+            "id",
+            "borrow_date",
+            "due_date",
+            "book__id",
+            "book__title",
+            "book__cover_image",
+            "fine__amount",
+        )
+        .order_by("due_date", "id")
+    )
+    rows = []
+    for loan in loans:
+        days_left = (loan.due_date - today).days
+        covers = image_urls(loan.book.cover_image, "cover")
+        rows.append(
+            {
+                "id": loan.id,
+                "book": {
+                    "id": loan.book.id,
+                    "title": loan.book.title,
+                    "cover_image_urls": (
+                        {size: absolute(url) for size, url in covers.items()} if covers else None
+                    ),
+                },
+                "borrow_date": loan.borrow_date,
+                "due_date": loan.due_date,
+                "days_left": days_left,
+                "overdue": days_left < 0,
+                "due_soon": 0 <= days_left <= days,
+                "fine_amount": loan.fine_amount,
+            }
+        )
+    return rows
+
+
+def build_dashboard(member, days=DUE_SOON_DAYS, absolute=str):
+    today = timezone.now().date()
+    return {
+        "member": member.pk,
+        "as_of": today,
+        "due_within_days": days,
+        "summary": summarize(member, today, days),
+        "loans": current_loans(member, today, days, absolute),
+    }
+
+
+def get_dashboard(member, days=DUE_SOON_DAYS, absolute=str):
+    """---(data, hit): the cached dashboard, built and stored on a miss---"""
+
+    today = timezone.now().date()
+    key = versioned_key("dashboard", _generation_names(member.pk), member.pk, days, today)
+    cache = get_cache()
+    data = cache.get(key)
+    if data is not None:
+        return data, True
+    data = build_dashboard(member, days, absolute)
+    cache.set(key, data, timeout=live_timeout())
+    return data, False
@@ -0,0 +1,145 @@
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from catalog.cache import invalidate
+from circulation.models import BorrowRecord, Fine
+
+
+CENTS = Decimal("0.01")
+
+# --> Largest amount Fine.amount can store (999.99); no fine grows past it, cap or not
+_field = Fine._meta.get_field("amount")
+MAX_FINE = Decimal(10) ** (_field.max_digits - _field.decimal_places) - CENTS
+
+
+def money(value, name):
+    """---value as a non-negative Decimal; ValueError naming the setting otherwise---"""
+
+    try:
+        amount = Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError(f"Fine {name} must be an amount such as 10.00, not {value!r}.") from None
+    if not amount.is_finite() or amount < 0:
+        raise ValueError(f"Fine {name} must be zero or more, not {value!r}.")
+    return amount
+
+
+def fine_policy(rate=None, cap=None):
+    """---(per-day rate, cap) from settings.LIBRARY_FINES unless overridden---"""
+
+    config = getattr(settings, "LIBRARY_FINES", {})
+    rate = money(rate if rate is not None else config.get("PER_DAY", "10.00"), "rate")
+    cap = cap if cap is not None else config.get("CAP")
+    return rate, (money(cap, "cap") if cap is not None else None)
+
+
+def fine_amount(due_date, as_of, rate, cap=None):
+    if as_of <= due_date:
+        return Decimal("0")
+    amount = (as_of - due_date).days * rate
+    ceiling = MAX_FINE if cap is None else min(cap, MAX_FINE)
+    return min(amount, ceiling).quantize(CENTS)
+
+
+def fine_for(borrow, return_date):
+    rate, cap = fine_policy()
+    return fine_amount(borrow.due_date, return_date, rate, cap)
+
+
+def overdue_loans(as_of):
+    """---Unreturned loans past due on as_of whose fine is not paid, in pk order---"""
+
+    return (
+        BorrowRecord.objects.filter(is_returned=False, due_date__lt=as_of)
+        .exclude(fine__paid=True)
+        .order_by("pk")
+    )
+
+
+def accrue_fines(as_of=None, rate=None, cap=None, batch_size=5000):
+    """
+    Bring the Fine of every overdue, unreturned loan up to date
+    - Walks overdue loans in primary-key batches (keyset, no OFFSET)
+    - Each batch is one SELECT (LEFT JOIN to the current fine) plus one
+      INSERT ... ON CONFLICT (borrow_record) DO UPDATE for changed amounts
+    - Paid fines are never touched
+    Returns {"scanned": loans looked at, "upserted": fines written}.
+    """
+
+    as_of = as_of or timezone.now().date()
+    rate, cap = fine_policy(rate, cap)
+
+    overdue = overdue_loans(as_of)
+
+    scanned = upserted = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            overdue.filter(pk__gt=last_pk).values_list("pk", "due_date", "fine__amount")[
+                :batch_size
+            ]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+        scanned += len(batch)
+
+        fines = []
+        for pk, due_date, current in batch:
+            amount = fine_amount(due_date, as_of, rate, cap)
+            if amount != current:
+                fines.append(Fine(borrow_record_id=pk, amount=amount))
+        if fines:
+            with transaction.atomic():
+                Fine.objects.bulk_create(
+                    fines,
+                    update_conflicts=True,
+                    unique_fields=["borrow_record"],
+                    update_fields=["amount"],
+                )
+            upserted += len(fines)
+
+    if upserted:
+        invalidate("fines")  # --> Member dashboards show the unpaid total
+    return {"scanned": scanned, "upserted": upserted}
+
+
+def settle_fine(borrow, amount):
+    """
+    Final fine at return time: usually a single lookup of the row the
+    accrual run already wrote; paid fines are left as they are
+    """
+
+    if not amount:
+        return
+    fine, created = Fine.objects.get_or_create(
+        borrow_record=borrow, defaults={"amount": amount}
+    )
+    if not created and not fine.paid and fine.amount != amount:
+        Fine.objects.filter(pk=fine.pk).update(amount=amount)
+
+
+def settle_fines(amounts):
+    """---Bulk version of settle_fine: {borrow_record_id: amount}---"""
+
+    amounts = {pk: amount for pk, amount in amounts.items() if amount}
+    if not amounts:
+        return
+    paid = set(
+        Fine.objects.filter(borrow_record_id__in=amounts, paid=True).values_list(
+            "borrow_record_id", flat=True
+        )
+    )
+    Fine.objects.bulk_create(
+        [
+            Fine(borrow_record_id=pk, amount=amount)
+            for pk, amount in amounts.items()
+            if pk not in paid
+        ],
+        update_conflicts=True,
+        unique_fields=["borrow_record"],
+        update_fields=["amount"],
+    )
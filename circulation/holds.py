@@ -0,0 +1,152 @@
+"""
+FIFO hold queues
+- A member without a copy on the shelf joins the book's queue (WAITING);
+  queues are ordered by created_at, id and read through a partial index
+  over waiting holds only
+- allocate() hands copies coming back to the head of each queue inside the
+  returning transaction: the hold turns READY with a pickup window
+  (LIBRARY_HOLDS["PICKUP_DAYS"]) and the copy never reaches the shelf
+- Every hold that turns ready bumps the member's "holds:<id>" generation on
+  commit; wait_for_ready() watches that generation (one cache read per
+  poll) and only queries the database when it moves, plus a slow recheck
+  for generations bumped in another process's local cache
+- Copy bookkeeping (returns, pickups, expiry) lives in circulation.services
+"""
+
+import asyncio
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value, Window
+from django.db.models.functions import Coalesce, RowNumber
+
+from catalog.cache import agenerations, invalidate
+from circulation.dashboard import invalidate_dashboards
+from circulation.models import Hold
+
+
+def holds_config():
+    config = getattr(settings, "LIBRARY_HOLDS", {})
+    return {
+        "PICKUP_DAYS": config.get("PICKUP_DAYS", 3),
+        "WAIT_TIMEOUT": config.get("WAIT_TIMEOUT", 30),
+        "STREAM_TIMEOUT": config.get("STREAM_TIMEOUT", 300),
+        "HEARTBEAT": config.get("HEARTBEAT", 15),
+        "POLL_INTERVAL": config.get("POLL_INTERVAL", 1.0),
+        "RECHECK_INTERVAL": config.get("RECHECK_INTERVAL", 10),
+    }
+
+
+def notify(member_ids):
+    """---Holds of these members changed: wake their waiting clients, drop their dashboards---"""
+
+    member_ids = set(member_ids)
+    invalidate(*[f"holds:{pk}" for pk in member_ids])
+    invalidate_dashboards(member_ids)
+
+
+def with_positions(holds):
+    """---Annotate queue_ahead: waiting holds in front of each one on the same book---"""
+
+    ahead = (
+        Hold.objects.filter(book=OuterRef("book"), status=Hold.WAITING)
+        .filter(
+            Q(created_at__lt=OuterRef("created_at"))
+            | Q(created_at=OuterRef("created_at"), id__lt=OuterRef("id"))
+        )
+        .order_by()
+        .values("book")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    return holds.annotate(
+        queue_ahead=Coalesce(Subquery(ahead), Value(0)),
+    )
+
+
+def allocate(copies, now):
+    """
+    Give copies coming back to the front of their books' queues
+    - copies: {book_id: count}; the callers hold the book rows locked (the
+      restocking UPDATE), so queues can't move underneath
+    - One SELECT for the first `count` waiting holds of every book, one
+      UPDATE turning them ready
+    Returns {book_id: copies given to holds}.
+    """
+
+    wanted = {pk: count for pk, count in copies.items() if count > 0}
+    if not wanted:
+        return {}
+    heads = (
+        Hold.objects.filter(book_id__in=wanted, status=Hold.WAITING)
+        .annotate(
+            place=Window(
+                RowNumber(),
+                partition_by=F("book_id"),
+                order_by=[F("created_at").asc(), F("id").asc()],
+            )
+        )
+        .filter(place__lte=max(wanted.values()))
+        .values_list("pk", "book_id", "member_id", "place")
+    )
+    chosen, members, allocated = [], set(), {}
+    for pk, book_id, member_id, place in heads:
+        if place <= wanted[book_id]:
+            chosen.append(pk)
+            members.add(member_id)
+            allocated[book_id] = allocated.get(book_id, 0) + 1
+    if chosen:
+        Hold.objects.filter(pk__in=chosen).update(
+            status=Hold.READY,
+            ready_at=now,
+            expires_at=now + timedelta(days=holds_config()["PICKUP_DAYS"]),
+        )
+        notify(members)
+    return allocated
+
+
+def ready_payload(hold):
+    return {
+        "id": hold.pk,
+        "book": {"id": hold.book_id, "title": hold.book.title},
+        "ready_at": hold.ready_at.isoformat(),
+        "expires_at": hold.expires_at.isoformat(),
+    }
+
+
+async def ready_holds(member_id, since=None):
+    """---Ready holds of a member that turned ready after since, oldest first---"""
+
+    holds = Hold.objects.filter(member_id=member_id, status=Hold.READY)
+    if since is not None:
+        holds = holds.filter(ready_at__gt=since)
+    holds = (
+        holds.select_related("book")
+        .only("id", "book__title", "ready_at", "expires_at")
+        .order_by("ready_at", "id")
+    )
+    return [ready_payload(hold) async for hold in holds]
+
+
+async def wait_for_ready(member_id, since=None, timeout=30):
+    """
+    Ready holds newer than since, waiting up to timeout seconds for one
+    - Returns as soon as there is at least one, [] on timeout
+    """
+
+    config = holds_config()
+    deadline = time.monotonic() + timeout
+    names = [f"holds:{member_id}"]
+    generation, checked = None, None
+    while True:
+        current = await agenerations(names)
+        now = time.monotonic()
+        if current != generation or now - checked >= config["RECHECK_INTERVAL"]:
+            generation, checked = current, now
+            holds = await ready_holds(member_id, since)
+            if holds:
+                return holds
+        if now >= deadline:
+            return []
+        await asyncio.sleep(min(config["POLL_INTERVAL"], deadline - now))
@@ -0,0 +1,48 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from circulation.fines import accrue_fines, fine_policy
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute fines for every overdue, unreturned loan in set-based batches "
+        "and upsert them into circulation.Fine. Schedule it daily (cron, etc.)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--as-of",
+            type=date.fromisoformat,
+            help="Accrue up to this date (YYYY-MM-DD, default: today)",
+        )
+        parser.add_argument("--rate", help="Fine per day late (default: LIBRARY_FINES)")
+        parser.add_argument("--cap", help="Maximum fine per loan (default: LIBRARY_FINES)")
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        try:
+            rate, cap = fine_policy(options["rate"], options["cap"])
+        except ValueError as error:
+            raise CommandError(error)
+        start = time.perf_counter()
+        stats = accrue_fines(
+            as_of=options["as_of"],
+            rate=rate,
+            cap=cap,
+            batch_size=options["batch_size"],
+        )
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Scanned {stats['scanned']} overdue loans, upserted "
+                f"{stats['upserted']} fines in {elapsed:.2f}s "
+                f"({stats['scanned'] / elapsed if elapsed else 0:.0f} loans/s)."
+            )
+        )
@@ -0,0 +1,149 @@
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connections
+
+from catalog.models import Book
+from circulation.models import BorrowRecord
+from circulation.services import (
+    AlreadyReturned,
+    BookUnavailable,
+    checkout,
+    return_loan,
+)
+from users.models import Member, User
+
+
+def with_retry(fn, *args):
+    # --> SQLite serializes writers; retry "database is locked" like a busy desk would
+    for attempt in range(50):
+        try:
+            return fn(*args)
+        except OperationalError:
+            time.sleep(0.01 * (attempt + 1))
+    raise CommandError("Gave up after repeated lock timeouts.")
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer one book with concurrent checkouts and returns from many "
+        "threads, verify available_copies never drifts, and report throughput. "
+        "Creates a throwaway book/member and removes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=16)
+        parser.add_argument("--copies", type=int, default=200)
+        parser.add_argument(
+            "--attempts",
+            type=int,
+            default=25,
+            help="Checkout attempts per worker (defaults oversubscribe the copies)",
+        )
+
+    def handle(self, *args, **options):
+        workers, copies = options["workers"], options["copies"]
+        tag = uuid.uuid4().hex[:10]
+        user = User.objects.create_user(f"bench-{tag}@example.com", password=None)
+        member = Member.objects.get_or_create(user=user)[0]
+        book = Book.objects.create(
+            title=f"Contention benchmark {tag}",
+            isbn=f"bench-{tag}",
+            total_copies=copies,
+            available_copies=copies,
+        )
+
+        try:
+            borrowed, refused, elapsed = self.run_checkouts(
+                member, book, workers, options["attempts"]
+            )
+            book.refresh_from_db()
+            self.report("checkout", borrowed + refused, elapsed)
+            self.verify(
+                borrowed == min(copies, workers * options["attempts"]),
+                f"{borrowed} loans for {copies} copies",
+            )
+            self.verify(
+                book.available_copies == copies - borrowed,
+                f"available_copies={book.available_copies}, expected {copies - borrowed}",
+            )
+
+            returned, rejected, elapsed = self.run_returns(book, workers)
+            book.refresh_from_db()
+            self.report("return", returned + rejected, elapsed)
+            self.verify(returned == borrowed, f"{returned} returns for {borrowed} loans")
+            self.verify(
+                book.available_copies == copies,
+                f"available_copies={book.available_copies}, expected {copies}",
+            )
+            self.stdout.write(self.style.SUCCESS("No lost updates, no over-lending."))
+        finally:
+            book.delete()
+            user.delete()
+
+    def run_checkouts(self, member, book, workers, attempts):
+        counts = {"borrowed": 0, "refused": 0}
+        lock = threading.Lock()
+
+        def work():
+            try:
+                for _ in range(attempts):
+                    try:
+                        with_retry(checkout, member, book)
+                        outcome = "borrowed"
+                    except BookUnavailable:
+                        outcome = "refused"
+                    with lock:
+                        counts[outcome] += 1
+            finally:
+                connections.close_all()
+
+        elapsed = self.run_threads(work, workers)
+        return counts["borrowed"], counts["refused"], elapsed
+
+    def run_returns(self, book, workers):
+        # --> Every loan is returned by two workers at once; only one may win
+        loans = list(BorrowRecord.objects.filter(book=book))
+        counts = {"returned": 0, "rejected": 0}
+        lock = threading.Lock()
+
+        def work(index):
+            try:
+                for loan in loans[index // 2 :: max(workers // 2, 1)]:
+                    try:
+                        with_retry(return_loan, loan)
+                        outcome = "returned"
+                    except AlreadyReturned:
+                        outcome = "rejected"
+                    with lock:
+                        counts[outcome] += 1
+            finally:
+                connections.close_all()
+
+        elapsed = self.run_threads(work, max(workers // 2, 1) * 2, pass_index=True)
+        return counts["returned"], counts["rejected"], elapsed
+
+    def run_threads(self, target, count, pass_index=False):
+        close_old_connections()
+        threads = [
+            threading.Thread(target=target, args=(i,) if pass_index else ())
+            for i in range(count)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start
+
+    def report(self, label, operations, elapsed):
+        self.stdout.write(
+            f"{label:>8}: {operations} requests in {elapsed:.2f}s "
+            f"({operations / elapsed:.0f} ops/s)"
+        )
+
+    def verify(self, condition, message):
+        if not condition:
+            raise CommandError(f"Consistency check failed: {message}")
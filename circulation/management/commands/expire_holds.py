@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from circulation.services import expire_holds
+
+
+class Command(BaseCommand):
+    help = (
+        "Expire ready holds whose pickup window has passed and hand their copies "
+        "to the next member in line (or back to the shelf). Also serves queues of "
+        "books that have copies on the shelf. Schedule it hourly (cron, etc.)."
+    )
+
+    def handle(self, *args, **options):
+        stats = expire_holds()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Expired {stats['expired']} holds, readied {stats['readied']}, "
+                f"restocked {stats['restocked']} copies."
+            )
+        )
@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from circulation.analytics import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the daily circulation rollups behind /reports/ from BorrowRecord "
+        "and Fine. Run once with --full after deploying, then periodically (e.g. "
+        "nightly) to repair drift from writes that skip the services."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=2,
+            help="Rebuild the rows of the last N days (default: 2)",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Rebuild every day from scratch",
+        )
+
+    def handle(self, *args, **options):
+        if options["full"]:
+            written = rebuild()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt all circulation rollups ({written} rows)."))
+            return
+
+        if options["days"] < 1:
+            raise CommandError("--days must be at least 1")
+        since = timezone.now().date() - timedelta(days=options["days"] - 1)
+        written = rebuild(since=since)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt circulation rollups since {since} ({written} rows)."))
@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from circulation.popularity import rollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Roll BorrowRecord rows up into the daily popularity buckets. "
+        "Run periodically (e.g. nightly) to backfill and repair the counters."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=2,
+            help="Rebuild the buckets of the last N days (default: 2)",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Rebuild every bucket and the all-time counters from scratch",
+        )
+
+    def handle(self, *args, **options):
+        if options["full"]:
+            rollup()
+            self.stdout.write(self.style.SUCCESS("Rebuilt all popularity data."))
+            return
+
+        if options["days"] < 1:
+            raise CommandError("--days must be at least 1")
+        since = timezone.now().date() - timedelta(days=options["days"] - 1)
+        rollup(since=since)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt daily buckets since {since}."))
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_popularity(apps, schema_editor):
+    BorrowRecord = apps.get_model("circulation", "BorrowRecord")
+    BookPopularity = apps.get_model("circulation", "BookPopularity")
+    DailyBorrowCount = apps.get_model("circulation", "DailyBorrowCount")
+
+    loans = BorrowRecord.objects.order_by()
+    DailyBorrowCount.objects.bulk_create(
+        (
+            DailyBorrowCount(
+                book_id=row["book_id"],
+                category_id=row["book__category_id"],
+                day=row["borrow_date"],
+                borrow_count=row["total"],
+            )
+            for row in loans.values("book_id", "book__category_id", "borrow_date")
+            .annotate(total=Count("id"))
+            .iterator()
+        ),
+        batch_size=5000,
+    )
+    BookPopularity.objects.bulk_create(
+        (
+            BookPopularity(
+                book_id=row["book_id"],
+                category_id=row["book__category_id"],
+                borrow_count=row["total"],
+            )
+            for row in loans.values("book_id", "book__category_id")
+            .annotate(total=Count("id"))
+            .iterator()
+        ),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_book_search_vector'),
+        ('circulation', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookPopularity',
+            fields=[
+                ('book', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity', serialize=False, to='catalog.book')),
+                ('borrow_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='catalog.category')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-borrow_count'], name='circulation_borrow__e79b3f_idx'), models.Index(fields=['category', '-borrow_count'], name='circulation_categor_209d14_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyBorrowCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('borrow_count', models.PositiveIntegerField(default=0)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_borrow_counts', to='catalog.book')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='catalog.category')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'book'], name='circulation_day_4b98bd_idx'), models.Index(fields=['category', 'day'], name='circulation_categor_adaedd_idx')],
+                'constraints': [models.UniqueConstraint(fields=('book', 'day'), name='unique_book_day')],
+            },
+        ),
+        migrations.RunPython(backfill_popularity, migrations.RunPython.noop),
+    ]
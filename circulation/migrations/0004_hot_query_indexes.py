@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('circulation', '0003_popularity'),
+        ('users', '0003_image_storage_keys'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='borrowrecord',
+            index=models.Index(fields=['member', '-borrow_date', '-id'], name='circulation_member__ecee18_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='borrowrecord',
+            index=models.Index(fields=['-borrow_date', '-id'], name='circulation_borrow__744a72_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='borrowrecord',
+            index=models.Index(condition=models.Q(('is_returned', False)), fields=['due_date'], name='loan_outstanding_due_idx'),
+        ),
+        # --> The plain member index goes only after the composite one exists
+        migrations.AlterField(
+            model_name='borrowrecord',
+            name='member',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='borrowed_books', to='users.member'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('circulation', '0004_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CirculationRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grain', models.CharField(choices=[('day', 'Day'), ('month', 'Month')], max_length=5)),
+                ('dimension', models.CharField(choices=[('all', 'All loans'), ('book', 'Book'), ('category', 'Category'), ('author', 'Author'), ('cohort', 'Member cohort (membership month, YYYYMM)')], max_length=8)),
+                ('key', models.PositiveIntegerField(default=0)),
+                ('day', models.DateField()),
+                ('loans', models.PositiveIntegerField(default=0)),
+                ('returns', models.PositiveIntegerField(default=0)),
+                ('overdue_returns', models.PositiveIntegerField(default=0)),
+                ('fines_assessed', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('fines_paid', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['grain', 'dimension', 'day', 'key'], name='circulation_grain_d142b2_idx')],
+                'constraints': [models.UniqueConstraint(fields=('grain', 'dimension', 'key', 'day'), name='unique_circulation_bucket')],
+            },
+        ),
+    ]
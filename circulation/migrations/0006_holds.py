@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_hot_query_indexes'),
+        ('circulation', '0005_circulation_rollups'),
+        ('users', '0003_image_storage_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Hold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('waiting', 'Waiting for a copy'), ('ready', 'Copy set aside for pickup'), ('fulfilled', 'Borrowed'), ('expired', 'Not picked up in time'), ('cancelled', 'Cancelled')], default='waiting', max_length=9)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('ready_at', models.DateTimeField(blank=True, null=True)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='catalog.book')),
+                ('member', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='users.member')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['member', '-created_at'], name='circulation_member__aa173b_idx'), models.Index(condition=models.Q(('status', 'waiting')), fields=['book', 'created_at', 'id'], name='hold_queue_idx'), models.Index(condition=models.Q(('status', 'ready')), fields=['expires_at'], name='hold_pickup_expiry_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['waiting', 'ready'])), fields=('member', 'book'), name='unique_active_hold')],
+            },
+        ),
+    ]
@@ -1,6 +1,6 @@
 from django.db import models
 from users.models import Member
-from catalog.models import Book
+from catalog.models import Book, Category
 
 from datetime import timedelta, time, datetime
 from django.utils import timezone
@@ -15,6 +15,7 @@ class BorrowRecord(models.Model):
         Member,
         on_delete=models.CASCADE,
         related_name="borrowed_books",
+        db_index=False,  # --> Covered by the (member, -borrow_date, -id) index
     )
     book = models.ForeignKey(
         Book,
@@ -28,6 +29,7 @@ class BorrowRecord(models.Model):
 
     @property
     def fine_amount(self):
+        # --> No query when the queryset used select_related("fine")
         return self.fine.amount if hasattr(self, "fine") else 0.00
 
     def __str__(self):
@@ -35,6 +37,17 @@ class BorrowRecord(models.Model):
 
     class Meta:
         ordering = ["-borrow_date"]
+        indexes = [
+            # --> A member's loans, newest first; also serves the member FK
+            models.Index(fields=["member", "-borrow_date", "-id"]),
+            models.Index(fields=["-borrow_date", "-id"]),
+            # --> Outstanding loans by due date (overdue scans, fine accrual)
+            models.Index(
+                fields=["due_date"],
+                condition=models.Q(is_returned=False),
+                name="loan_outstanding_due_idx",
+            ),
+        ]
 
 
 class Fine(models.Model):
@@ -49,3 +62,171 @@ class Fine(models.Model):
 
     def __str__(self):
         return f"Fine for {self.borrow_record} - {'Paid' if self.paid else 'Unpaid'}"
+
+
+class BookPopularity(models.Model):
+    """---All-time borrow counter per book, bumped on every new BorrowRecord---"""
+
+    book = models.OneToOneField(
+        Book,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="popularity",
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    borrow_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.book} - {self.borrow_count} borrows"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-borrow_count"]),
+            models.Index(fields=["category", "-borrow_count"]),
+        ]
+
+
+class DailyBorrowCount(models.Model):
+    """---Per-book, per-day borrow buckets used for windowed rankings---"""
+
+    book = models.ForeignKey(
+        Book,
+        on_delete=models.CASCADE,
+        related_name="daily_borrow_counts",
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    day = models.DateField()
+    borrow_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.book} - {self.day}: {self.borrow_count}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["book", "day"], name="unique_book_day"),
+        ]
+        indexes = [
+            models.Index(fields=["day", "book"]),
+            models.Index(fields=["category", "day"]),
+        ]
+
+
+class CirculationRollup(models.Model):
+    """---Circulation totals for one dimension value over a day or a month, see circulation.analytics---"""
+
+    DAY = "day"
+    MONTH = "month"
+    GRAINS = [(DAY, "Day"), (MONTH, "Month")]
+
+    ALL = "all"
+    BOOK = "book"
+    CATEGORY = "category"
+    AUTHOR = "author"
+    COHORT = "cohort"
+    DIMENSIONS = [
+        (ALL, "All loans"),
+        (BOOK, "Book"),
+        (CATEGORY, "Category"),
+        (AUTHOR, "Author"),
+        (COHORT, "Member cohort (membership month, YYYYMM)"),
+    ]
+
+    grain = models.CharField(max_length=5, choices=GRAINS)
+    dimension = models.CharField(max_length=8, choices=DIMENSIONS)
+    # --> Book/category/author id or cohort; 0 for "all" and for books without one
+    key = models.PositiveIntegerField(default=0)
+    day = models.DateField()  # --> First day of the bucket
+    loans = models.PositiveIntegerField(default=0)
+    returns = models.PositiveIntegerField(default=0)
+    overdue_returns = models.PositiveIntegerField(default=0)
+    fines_assessed = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    fines_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.dimension}:{self.key} {self.grain} {self.day}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["grain", "dimension", "key", "day"], name="unique_circulation_bucket"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["grain", "dimension", "day", "key"]),
+        ]
+
+
+class Hold(models.Model):
+    """---A member's place in a book's FIFO hold queue, see circulation.holds---"""
+
+    WAITING = "waiting"
+    READY = "ready"
+    FULFILLED = "fulfilled"
+    EXPIRED = "expired"
+    CANCELLED = "cancelled"
+    STATUSES = [
+        (WAITING, "Waiting for a copy"),
+        (READY, "Copy set aside for pickup"),
+        (FULFILLED, "Borrowed"),
+        (EXPIRED, "Not picked up in time"),
+        (CANCELLED, "Cancelled"),
+    ]
+    ACTIVE = (WAITING, READY)
+
+    member = models.ForeignKey(
+        Member,
+        on_delete=models.CASCADE,
+        related_name="holds",
+        db_index=False,  # --> Covered by the (member, -created_at) index
+    )
+    book = models.ForeignKey(
+        Book,
+        on_delete=models.CASCADE,
+        related_name="holds",
+    )
+    status = models.CharField(max_length=9, choices=STATUSES, default=WAITING)
+    created_at = models.DateTimeField(auto_now_add=True)
+    ready_at = models.DateTimeField(blank=True, null=True)
+    expires_at = models.DateTimeField(blank=True, null=True)  # --> End of the pickup window
+    closed_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.member} holds {self.book} ({self.status})"
+
+    class Meta:
+        constraints = [
+            # --> One open hold per member and book
+            models.UniqueConstraint(
+                fields=["member", "book"],
+                condition=models.Q(status__in=["waiting", "ready"]),
+                name="unique_active_hold",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["member", "-created_at"]),
+            # --> Head of each book's queue
+            models.Index(
+                fields=["book", "created_at", "id"],
+                condition=models.Q(status="waiting"),
+                name="hold_queue_idx",
+            ),
+            # --> Ready holds by end of pickup window (expiry run)
+            models.Index(
+                fields=["expires_at"],
+                condition=models.Q(status="ready"),
+                name="hold_pickup_expiry_idx",
+            ),
+        ]
@@ -22,4 +22,6 @@ class IsOwnerOrLibrarian(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.user.is_staff:
             return True
-        return obj.member.user == request.user
+        # --> Compare ids: request.user's member is already loaded with the token
+        member = getattr(request.user, "member_profile", None)
+        return member is not None and obj.member_id == member.pk
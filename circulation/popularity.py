@@ -0,0 +1,162 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, Sum, Value, When
+from django.utils import timezone
+
+from catalog.models import Book
+from circulation.models import BookPopularity, BorrowRecord, DailyBorrowCount
+
+
+# --> Accepted values of ?window= on /books/popular/ (days, None = all time)
+WINDOWS = {"7d": 7, "30d": 30, "all": None}
+
+
+def _bump(model, rows, scope):
+    """
+    Add counts to counter rows in two statements
+    - INSERT ... ON CONFLICT DO NOTHING makes sure every row exists (at 0)
+    - one UPDATE adds each row's amount with a CASE, atomic in the database
+    """
+
+    model.objects.bulk_create(
+        [model(**lookup, **defaults, borrow_count=0) for lookup, defaults, _ in rows],
+        ignore_conflicts=True,
+    )
+    increments = Case(
+        *[When(**lookup, then=Value(amount)) for lookup, _, amount in rows],
+        default=Value(0),
+    )
+    model.objects.filter(**scope).update(borrow_count=F("borrow_count") + increments)
+
+
+def record_borrows(counts, day):
+    """
+    Add new loans to the all-time and daily counters
+    counts: {(book_id, category_id): number_of_new_loans}
+    """
+
+    if not counts:
+        return
+    book_ids = [book_id for book_id, _ in counts]
+    with transaction.atomic():
+        _bump(
+            BookPopularity,
+            [
+                ({"book_id": book_id}, {"category_id": category_id}, amount)
+                for (book_id, category_id), amount in counts.items()
+            ],
+            scope={"book_id__in": book_ids},
+        )
+        _bump(
+            DailyBorrowCount,
+            [
+                ({"book_id": book_id, "day": day}, {"category_id": category_id}, amount)
+                for (book_id, category_id), amount in counts.items()
+            ],
+            scope={"book_id__in": book_ids, "day": day},
+        )
+
+
+def move_categories(book_ids):
+    """
+    Point these books' counters at the books' current category, one UPDATE
+    per table; for bulk writes that skip the move_popularity_category signal
+    """
+
+    if not book_ids:
+        return
+    category = Subquery(Book.objects.filter(pk=OuterRef("book_id")).values("category_id")[:1])
+    BookPopularity.objects.filter(book_id__in=book_ids).update(category=category)
+    DailyBorrowCount.objects.filter(book_id__in=book_ids).update(category=category)
+
+
+def top_books(window="all", category_id=None, limit=10):
+    """
+    Return [(book_id, borrow_count), ...] best first
+    - window "all": read straight off the BookPopularity counters
+    - otherwise: sum the DailyBorrowCount buckets inside the window
+    """
+
+    days = WINDOWS[window]
+    if days is None:
+        rows = BookPopularity.objects.filter(borrow_count__gt=0)
+        if category_id is not None:
+            rows = rows.filter(category_id=category_id)
+        rows = rows.order_by("-borrow_count", "book_id").values_list(
+            "book_id", "borrow_count"
+        )
+        return list(rows[:limit])
+
+    since = timezone.now().date() - timedelta(days=days - 1)
+    rows = DailyBorrowCount.objects.filter(day__gte=since)
+    if category_id is not None:
+        rows = rows.filter(category_id=category_id)
+    rows = (
+        rows.values("book_id")
+        .annotate(total=Sum("borrow_count"))
+        .order_by("-total", "book_id")
+        .values_list("book_id", "total")
+    )
+    return list(rows[:limit])
+
+
+def rollup(since=None, batch_size=5000):
+    """
+    Rebuild the popularity tables from BorrowRecord
+    - since=None: full rebuild of the all-time counters and every daily bucket
+    - since=date: only rebuild daily buckets from that day on
+    Used to backfill and to repair drift from paths that skip signals.
+    """
+
+    loans = BorrowRecord.objects.all()
+    if since is not None:
+        loans = loans.filter(borrow_date__gte=since)
+
+    buckets = (
+        loans.order_by()
+        .values("book_id", "book__category_id", "borrow_date")
+        .annotate(total=Count("id"))
+    )
+
+    with transaction.atomic():
+        stale = DailyBorrowCount.objects.all()
+        if since is not None:
+            stale = stale.filter(day__gte=since)
+        stale.delete()
+
+        batch = []
+        for row in buckets.iterator(chunk_size=batch_size):
+            batch.append(
+                DailyBorrowCount(
+                    book_id=row["book_id"],
+                    category_id=row["book__category_id"],
+                    day=row["borrow_date"],
+                    borrow_count=row["total"],
+                )
+            )
+            if len(batch) >= batch_size:
+                DailyBorrowCount.objects.bulk_create(batch)
+                batch = []
+        DailyBorrowCount.objects.bulk_create(batch)
+
+        if since is None:
+            BookPopularity.objects.all().delete()
+            totals = (
+                BorrowRecord.objects.order_by()
+                .values("book_id", "book__category_id")
+                .annotate(total=Count("id"))
+            )
+            batch = []
+            for row in totals.iterator(chunk_size=batch_size):
+                batch.append(
+                    BookPopularity(
+                        book_id=row["book_id"],
+                        category_id=row["book__category_id"],
+                        borrow_count=row["total"],
+                    )
+                )
+                if len(batch) >= batch_size:
+                    BookPopularity.objects.bulk_create(batch)
+                    batch = []
+            BookPopularity.objects.bulk_create(batch)
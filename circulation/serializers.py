@@ -1,6 +1,15 @@
 from rest_framework import serializers
 
-from circulation.models import BorrowRecord
+from circulation.models import BorrowRecord, Hold
+from users.models import Member
+from circulation.services import (
+    AlreadyOnHold,
+    AlreadyOnLoan,
+    BookAvailable,
+    BookUnavailable,
+    checkout,
+    place_hold,
+)
 
 from datetime import timedelta, date
 from django.utils import timezone
@@ -8,13 +17,20 @@ from django.utils import timezone
 
 class BorrowRecordSerializer(serializers.ModelSerializer):
     fine_amount = serializers.SerializerMethodField()
+    book_title = serializers.CharField(source="book.title", read_only=True)
+    member_name = serializers.SerializerMethodField(method_name="get_member_name")
+
+    # --> Relations read per row; joined once by the viewset
+    select_related_fields = ["book", "member__user", "fine"]
 
     class Meta:
         model = BorrowRecord
         fields = [
             "id",
             "member",
+            "member_name",
             "book",
+            "book_title",
             "borrow_date",
             "due_date",
             "fine_amount",
@@ -31,19 +47,35 @@ class BorrowRecordSerializer(serializers.ModelSerializer):
             "return_date",
         ]
 
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Join the book, member's user and fine this serializer reads per row"""
+        return queryset.select_related(*cls.select_related_fields).defer(
+            "book__search_vector", "book__description"
+        )
+
     def get_fine_amount(self, obj):
-        if hasattr(obj, "fine") and obj.fine:
-            return obj.fine.amount
-        return 0.0
+        return obj.fine_amount
+
+    def get_member_name(self, obj):
+        user = obj.member.user
+        return f"{user.first_name} {user.last_name}".strip() or user.email
 
     def validate(self, data):
         book = data.get("book")
-        if book and book.available_copies < 1:
+        if book and book.available_copies < 1 and not self._holds_ready_copy(book):
             raise serializers.ValidationError(
                 "This book is not available for borrowing."
             )
         return data
 
+    def _holds_ready_copy(self, book):
+        member = getattr(self.context["request"].user, "member_profile", None)
+        return bool(
+            member
+            and Hold.objects.filter(member=member, book=book, status=Hold.READY).exists()
+        )
+
     def create(self, validated_data):
         request = self.context.get("request")
         user = request.user
@@ -52,17 +84,102 @@ class BorrowRecordSerializer(serializers.ModelSerializer):
         if not member:
             raise serializers.ValidationError("Only members can borrow books.")
 
-        book = validated_data.get("book")
-        if book.available_copies < 1:
+        # --> Decrease available copies and create the record atomically
+        try:
+            return checkout(member, validated_data.get("book"))
+        except BookUnavailable:
             raise serializers.ValidationError("This book is not available.")
 
-        # --> Decrease available copies
-        book.available_copies -= 1
-        book.save()
 
-        # --> Create record
-        borrow_record = BorrowRecord.objects.create(
-            member=member,
-            book=book,
+class BulkBorrowSerializer(serializers.Serializer):
+    books = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=50,
+    )
+    member = serializers.PrimaryKeyRelatedField(
+        queryset=Member.objects.all(),
+        required=False,
+        help_text="Librarians only: the member checking the books out",
+    )
+
+    def validate(self, data):
+        user = self.context["request"].user
+        if user.is_staff:
+            if "member" not in data:
+                raise serializers.ValidationError(
+                    {"member": "Librarians must say which member is borrowing."}
+                )
+        else:
+            member = getattr(user, "member_profile", None)
+            if not member:
+                raise serializers.ValidationError("Only members can borrow books.")
+            if data.get("member", member) != member:
+                raise serializers.ValidationError(
+                    {"member": "Members can only borrow for themselves."}
+                )
+            data["member"] = member
+        return data
+
+
+class BulkReturnSerializer(serializers.Serializer):
+    records = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=50,
+    )
+
+
+class HoldSerializer(serializers.ModelSerializer):
+    book_title = serializers.CharField(source="book.title", read_only=True)
+    position = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Hold
+        fields = [
+            "id",
+            "member",
+            "book",
+            "book_title",
+            "status",
+            "position",
+            "created_at",
+            "ready_at",
+            "expires_at",
+        ]
+        read_only_fields = [
+            "id",
+            "member",
+            "status",
+            "created_at",
+            "ready_at",
+            "expires_at",
+        ]
+
+    def get_position(self, obj):
+        """---Place in the queue (1 = next copy back) while waiting, else None---"""
+        if obj.status != Hold.WAITING:
+            return None
+        return getattr(obj, "queue_ahead", 0) + 1
+
+    def create(self, validated_data):
+        member = getattr(self.context["request"].user, "member_profile", None)
+        if not member:
+            raise serializers.ValidationError("Only members can place holds.")
+
+        try:
+            hold = place_hold(member, validated_data["book"])
+        except BookAvailable:
+            raise serializers.ValidationError(
+                {"book": "A copy is on the shelf: borrow it instead."}
+            )
+        except AlreadyOnLoan:
+            raise serializers.ValidationError({"book": "You already have this book on loan."})
+        except AlreadyOnHold:
+            raise serializers.ValidationError({"book": "You already hold this book."})
+
+        # --> The newest hold: every other waiting hold on the book is ahead of it
+        hold.queue_ahead = (
+            Hold.objects.filter(book=hold.book, status=Hold.WAITING).exclude(pk=hold.pk).count()
         )
-        return borrow_record
+        return hold
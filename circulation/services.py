@@ -0,0 +1,382 @@
+from collections import Counter
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from catalog.cache import invalidate_books
+from catalog.models import Book
+from circulation import analytics, holds
+from circulation.dashboard import invalidate_dashboards
+from circulation.fines import fine_for, settle_fine, settle_fines
+from circulation.models import BorrowRecord, Hold
+from circulation.popularity import record_borrows
+
+
+# --> Per-item outcomes reported by the bulk endpoints
+BORROWED = "borrowed"
+RETURNED = "returned"
+UNAVAILABLE = "unavailable"
+ALREADY_RETURNED = "already_returned"
+NOT_FOUND = "not_found"
+
+
+class BookUnavailable(Exception):
+    pass
+
+
+class AlreadyReturned(Exception):
+    pass
+
+
+class BookAvailable(Exception):
+    pass
+
+
+class AlreadyOnLoan(Exception):
+    pass
+
+
+class AlreadyOnHold(Exception):
+    pass
+
+
+class HoldClosed(Exception):
+    pass
+
+
+def take_copy(book_id):
+    """---Conditionally decrement available_copies; False if none was left---"""
+
+    return bool(
+        Book.objects.filter(pk=book_id, available_copies__gt=0).update(
+            available_copies=F("available_copies") - 1,
+            updated_at=timezone.now(),
+        )
+    )
+
+
+def claim_hold(member_id, book_id, now):
+    """---Fulfil the member's ready hold on the book, whose copy is already set aside---"""
+
+    return bool(
+        Hold.objects.filter(member_id=member_id, book_id=book_id, status=Hold.READY).update(
+            status=Hold.FULFILLED,
+            closed_at=now,
+        )
+    )
+
+
+def checkout(member, book):
+    """
+    Lend one copy of `book` to `member`
+    - A ready hold of the member's is picked up first: its copy is already
+      off the shelf
+    - Otherwise the decrement is a single conditional UPDATE, so two desks
+      can never both take the last copy and no other column is rewritten
+    - Raises BookUnavailable when no copy is left
+    """
+
+    with transaction.atomic():
+        if not claim_hold(member.pk, book.pk, timezone.now()) and not take_copy(book.pk):
+            raise BookUnavailable(book.pk)
+        return BorrowRecord.objects.create(member=member, book=book)
+
+
+def return_loan(borrow):
+    """
+    Close a loan and put the copy back on the shelf
+    - Only the request that flips is_returned gets to increment the book
+    - The copy goes to the head of the book's hold queue if anyone waits
+    - Settles the Fine for overdue loans (see circulation.fines)
+    - Raises AlreadyReturned if the loan was already closed
+    """
+
+    today = timezone.now().date()
+    with transaction.atomic():
+        closed = BorrowRecord.objects.filter(pk=borrow.pk, is_returned=False).update(
+            is_returned=True,
+            return_date=today,
+        )
+        if not closed:
+            raise AlreadyReturned(borrow.pk)
+
+        release_copies({borrow.book_id: 1}, timezone.now())
+        invalidate_dashboards([borrow.member_id])
+
+        borrow.is_returned = True
+        borrow.return_date = today
+
+        fine_amount = fine_for(borrow, today)
+        settle_fine(borrow, fine_amount)
+        analytics.record_returns([borrow], today, {borrow.pk: fine_amount})
+        return fine_amount
+
+
+def _shift_copies(deltas, now):
+    """---One UPDATE adding deltas[book_id] to each book's available_copies---"""
+
+    if not deltas:
+        return
+    Book.objects.filter(pk__in=deltas).update(
+        available_copies=F("available_copies")
+        + Case(*[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()]),
+        updated_at=now,
+    )
+    invalidate_books(deltas)
+
+
+def release_copies(copies, now):
+    """
+    Copies coming back from loans or lapsed holds: {book_id: count}
+    - The restocking UPDATE locks the book rows before the queues are read,
+      so a hold placed at the same time either saw the copy on the shelf or
+      is in the queue allocate() reads
+    - Copies handed to waiting holds are taken off the shelf again in a
+      second UPDATE, which only runs when someone was waiting
+    Returns {book_id: copies given to holds}.
+    """
+
+    _shift_copies(copies, now)
+    allocated = holds.allocate(copies, now)
+    _shift_copies({pk: -count for pk, count in allocated.items()}, now)
+    return allocated
+
+
+def bulk_checkout(member, book_ids):
+    """
+    Lend a stack of books to one member in a single transaction
+    - Book rows are locked once (SELECT ... FOR UPDATE), copies handed out in
+      request order, then one UPDATE and one bulk INSERT
+    - Books the member has a ready hold on are lent from the copy set aside
+    - Returns [{"book": id, "status": ..., "id": record_id}] in request order
+    """
+
+    now = timezone.now()
+    with transaction.atomic():
+        books = {
+            book.pk: book
+            for book in Book.objects.select_for_update()
+            .filter(pk__in=set(book_ids))
+            .only("id", "category_id", "author_id", "available_copies")
+        }
+
+        ready = set(
+            Hold.objects.filter(member=member, book_id__in=books, status=Hold.READY).values_list(
+                "book_id", flat=True
+            )
+        )
+
+        remaining = {pk: book.available_copies for pk, book in books.items()}
+        results, records, taken, claimed = [], [], Counter(), []
+        for book_id in book_ids:
+            if book_id not in books:
+                results.append({"book": book_id, "status": NOT_FOUND})
+            elif book_id in ready:
+                ready.discard(book_id)
+                claimed.append(book_id)
+                records.append(BorrowRecord(member=member, book=books[book_id]))
+                results.append({"book": book_id, "status": BORROWED})
+            elif remaining[book_id] < 1:
+                results.append({"book": book_id, "status": UNAVAILABLE})
+            else:
+                remaining[book_id] -= 1
+                taken[book_id] += 1
+                records.append(BorrowRecord(member=member, book=books[book_id]))
+                results.append({"book": book_id, "status": BORROWED})
+
+        _shift_copies({pk: -count for pk, count in taken.items()}, now)
+        if claimed:
+            Hold.objects.filter(member=member, book_id__in=claimed, status=Hold.READY).update(
+                status=Hold.FULFILLED,
+                closed_at=now,
+            )
+        records = BorrowRecord.objects.bulk_create(records)
+        if records:
+            invalidate_dashboards([member.pk])
+
+        # --> bulk_create skips post_save, so feed the popularity counters here
+        borrowed = taken + Counter(claimed)
+        record_borrows(
+            {(pk, books[pk].category_id): count for pk, count in borrowed.items()},
+            now.date(),
+        )
+        analytics.record_loans([(record.book, member) for record in records], now.date())
+
+    created = iter(records)
+    for result in results:
+        if result["status"] == BORROWED:
+            result["id"] = next(created).pk
+    return results
+
+
+def bulk_return(records, record_ids):
+    """
+    Return a stack of loans in a single transaction
+    - records: queryset the caller may touch (e.g. scoped to one member)
+    - One UPDATE closes the loans, one UPDATE restocks the books and one
+      upsert settles the fines for overdue loans
+    - Returns [{"id": record_id, "status": ..., "fine_amount": ...}]
+    """
+
+    today = timezone.now().date()
+    with transaction.atomic():
+        # --> Only the loan rows are locked; book and member are read for the rollups
+        loans = {
+            loan.pk: loan
+            for loan in records.select_related(None)
+            .select_related("book", "member")
+            .select_for_update(of=("self",))
+            .filter(pk__in=set(record_ids))
+            .only(
+                "id",
+                "due_date",
+                "is_returned",
+                "book__category_id",
+                "book__author_id",
+                "member__membership_date",
+            )
+        }
+
+        results, closing = [], {}
+        for record_id in record_ids:
+            loan = loans.get(record_id)
+            if loan is None:
+                results.append({"id": record_id, "status": NOT_FOUND})
+            elif loan.is_returned or record_id in closing:
+                results.append({"id": record_id, "status": ALREADY_RETURNED})
+            else:
+                closing[record_id] = loan
+                results.append({"id": record_id, "status": RETURNED})
+
+        if closing:
+            BorrowRecord.objects.filter(pk__in=closing, is_returned=False).update(
+                is_returned=True,
+                return_date=today,
+            )
+            release_copies(Counter(loan.book_id for loan in closing.values()), timezone.now())
+            invalidate_dashboards(loan.member_id for loan in closing.values())
+
+        fines = {}
+        for loan in closing.values():
+            amount = fine_for(loan, today)
+            if amount:
+                fines[loan.pk] = amount
+        settle_fines(fines)
+        analytics.record_returns(closing.values(), today, fines)
+
+    for result in results:
+        if result["status"] == RETURNED:
+            result["fine_amount"] = fines.get(result["id"], Decimal("0"))
+    return results
+
+
+def place_hold(member, book):
+    """
+    Put `member` at the back of `book`'s hold queue
+    - Only for books with no copy on the shelf; the book row is locked, so a
+      copy being returned at the same time is either seen here or given to
+      this hold by the return
+    - Raises BookAvailable, AlreadyOnLoan or AlreadyOnHold
+    """
+
+    with transaction.atomic():
+        available = (
+            Book.objects.select_for_update()
+            .filter(pk=book.pk)
+            .values_list("available_copies", flat=True)
+            .get()
+        )
+        if available > 0:
+            raise BookAvailable(book.pk)
+        if BorrowRecord.objects.filter(member=member, book=book, is_returned=False).exists():
+            raise AlreadyOnLoan(book.pk)
+        try:
+            with transaction.atomic():
+                return Hold.objects.create(member=member, book=book)
+        except IntegrityError:
+            raise AlreadyOnHold(book.pk)
+
+
+def cancel_hold(hold):
+    """
+    Withdraw a waiting or ready hold
+    - A copy set aside for it goes to the next member in line, or back on
+      the shelf
+    - Queue changes always lock the book row first (like returns), then the
+      hold, so they can't deadlock with each other
+    - Raises HoldClosed if the hold was already fulfilled, expired or cancelled
+    """
+
+    now = timezone.now()
+    with transaction.atomic():
+        Book.objects.select_for_update().filter(pk=hold.book_id).values_list("pk").get()
+        status = (
+            Hold.objects.select_for_update()
+            .filter(pk=hold.pk)
+            .values_list("status", flat=True)
+            .get()
+        )
+        if status not in Hold.ACTIVE:
+            raise HoldClosed(hold.pk)
+        Hold.objects.filter(pk=hold.pk).update(status=Hold.CANCELLED, closed_at=now)
+        if status == Hold.READY:
+            release_copies({hold.book_id: 1}, now)
+        holds.notify([hold.member_id])
+    hold.status, hold.closed_at = Hold.CANCELLED, now
+    return hold
+
+
+def expire_holds(now=None):
+    """
+    Close ready holds whose pickup window has passed and pass their copies on
+    - Each copy goes to the next waiting member of its book, or back on the
+      shelf
+    - Also serves queues of books that have copies on the shelf anyway
+      (e.g. a librarian added copies while members were waiting)
+    - Book rows are locked before holds, in primary-key order
+    Returns {"expired": holds expired, "readied": holds that became ready,
+    "restocked": copies put back on the shelf}.
+    """
+
+    now = now or timezone.now()
+    with transaction.atomic():
+        lapsed = Hold.objects.filter(status=Hold.READY, expires_at__lt=now)
+        waiting = Hold.objects.filter(status=Hold.WAITING, book__available_copies__gt=0)
+        book_ids = set(lapsed.values_list("book_id", flat=True))
+        book_ids.update(waiting.values_list("book_id", flat=True))
+        if not book_ids:
+            return {"expired": 0, "readied": 0, "restocked": 0}
+
+        shelf = dict(
+            Book.objects.select_for_update()
+            .filter(pk__in=book_ids)
+            .order_by("pk")
+            .values_list("pk", "available_copies")
+        )
+        expired = list(
+            lapsed.filter(book_id__in=shelf)
+            .select_for_update()
+            .order_by("pk")
+            .values_list("pk", "book_id", "member_id")
+        )
+        Hold.objects.filter(pk__in=[pk for pk, _, _ in expired]).update(
+            status=Hold.EXPIRED,
+            closed_at=now,
+        )
+        freed = Counter(book_id for _, book_id, _ in expired)
+
+        allocated = holds.allocate(
+            {pk: freed[pk] + max(copies, 0) for pk, copies in shelf.items()},
+            now,
+        )
+        deltas = {pk: freed[pk] - allocated.get(pk, 0) for pk in shelf}
+        _shift_copies({pk: delta for pk, delta in deltas.items() if delta}, now)
+        holds.notify(member_id for _, _, member_id in expired)
+
+    return {
+        "expired": len(expired),
+        "readied": sum(allocated.values()),
+        "restocked": sum(max(delta, 0) for delta in deltas.values()),
+    }
@@ -0,0 +1,61 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from catalog.cache import invalidate_books
+from django.utils import timezone
+
+from catalog.models import Book
+from circulation import analytics
+from circulation.dashboard import invalidate_dashboards
+from circulation.models import BookPopularity, BorrowRecord, DailyBorrowCount, Fine
+from circulation.popularity import record_borrows
+
+
+@receiver(post_save, sender=BorrowRecord)
+def count_borrow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record_borrows(
+            {(instance.book_id, instance.book.category_id): 1}, instance.borrow_date
+        )
+        analytics.record_loans([(instance.book, instance.member)], instance.borrow_date)
+
+
+@receiver(post_save, sender=Book)
+def move_popularity_category(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and "category" not in update_fields:
+        return
+    # --> Keep the denormalized category used by ?category= in step with the book
+    BookPopularity.objects.filter(book=instance).update(category=instance.category_id)
+    DailyBorrowCount.objects.filter(book=instance).update(category=instance.category_id)
+
+
+@receiver([post_save, post_delete], sender=BorrowRecord)
+def invalidate_availability(sender, instance, **kwargs):
+    # --> Loans change available_copies and the popular/ ranking
+    invalidate_books([instance.book_id])
+
+
+@receiver([post_save, post_delete], sender=BorrowRecord)
+def invalidate_dashboard(sender, instance, **kwargs):
+    invalidate_dashboards([instance.member_id])
+
+
+@receiver(pre_save, sender=Fine)
+def remember_paid(sender, instance, raw=False, **kwargs):
+    # --> Only an existing fine can turn paid; new ones are assessed at return
+    instance._was_paid = bool(
+        instance.pk
+        and not raw
+        and Fine.objects.filter(pk=instance.pk, paid=True).exists()
+    )
+    if instance.paid and not instance.paid_at:
+        instance.paid_at = timezone.now()  # --> The day it counts as paid in the rollups
+
+
+@receiver(post_save, sender=Fine)
+def count_payment(sender, instance, created, raw=False, **kwargs):
+    if raw or created or not instance.paid or getattr(instance, "_was_paid", True):
+        return
+    loan = BorrowRecord.objects.select_related("book", "member").get(pk=instance.borrow_record_id)
+    analytics.record_fine_payment(loan, instance.amount, timezone.localdate(instance.paid_at))
+    invalidate_dashboards([loan.member_id])
@@ -1,3 +1,787 @@
-from django.test import TestCase
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.test import APIClient
+
+from catalog.models import Author, Book, Category
+from catalog.cache import get_cache
+from circulation import analytics
+from circulation.fines import MAX_FINE, accrue_fines
+from circulation.models import (
+    BookPopularity,
+    BorrowRecord,
+    CirculationRollup,
+    DailyBorrowCount,
+    Fine,
+    Hold,
+)
+from circulation.popularity import record_borrows
+from circulation.services import (
+    AlreadyReturned,
+    BookAvailable,
+    BookUnavailable,
+    cancel_hold,
+    checkout,
+    expire_holds,
+    place_hold,
+    return_loan,
+)
+from users.authentication import user_cache
+from users.models import User
+from users.serializers import TokenObtainPairSerializer
+
+
+def make_book(**fields):
+    author = Author.objects.create(first_name="Ann", last_name="Lee")
+    category = Category.objects.create(name="Fiction")
+    return Book.objects.create(
+        title="Dune", isbn="9780441013593", author=author, category=category, **fields
+    )
+
+
+def jwt(user):
+    return {"HTTP_AUTHORIZATION": f"JWT {TokenObtainPairSerializer.get_token(user).access_token}"}
+
+
+def run_together(target, arguments):
+    """---target(argument) per thread, all released at once; returns results or exceptions---"""
+
+    barrier = threading.Barrier(len(arguments))
+    outcomes = [None] * len(arguments)
+
+    def worker(index, argument):
+        try:
+            barrier.wait()
+            outcomes[index] = target(argument)
+        except Exception as error:
+            outcomes[index] = error
+        finally:
+            connections.close_all()
+
+    threads = [
+        threading.Thread(target=worker, args=(index, argument))
+        for index, argument in enumerate(arguments)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+
+class BulkBorrowTests(TestCase):
+    """---bulk-borrow/: copies handed out in request order, ready holds first, counters once---"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.book = make_book(total_copies=2, available_copies=2)
+        cls.held = Book.objects.create(
+            title="Emma", isbn="9780141439587", total_copies=1, available_copies=0
+        )
+        cls.librarian = User.objects.create_user("desk@example.com", "pw", is_staff=True)
+        cls.member_user = User.objects.create_user("reader@example.com", "pw")
+        cls.member = cls.member_user.member_profile
+        cls.other = User.objects.create_user("other@example.com", "pw").member_profile
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def bulk_borrow(self, user, books, member=None):
+        self.client.force_authenticate(user)
+        payload = {"books": books} if member is None else {"books": books, "member": member.pk}
+        return self.client.post("/api/v1/borrow-records/bulk-borrow/", payload, format="json")
+
+    def statuses(self, response):
+        self.assertEqual(response.status_code, 200, response.data)
+        return [result["status"] for result in response.data["results"]]
+
+    def test_member_cannot_borrow_for_someone_else(self):
+        response = self.bulk_borrow(self.member_user, [self.book.pk], member=self.other)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("member", response.data)
+        self.assertFalse(BorrowRecord.objects.exists())
+
+    def test_librarian_must_name_the_member(self):
+        self.assertEqual(self.bulk_borrow(self.librarian, [self.book.pk]).status_code, 400)
+
+        response = self.bulk_borrow(self.librarian, [self.book.pk], member=self.other)
+
+        self.assertEqual(self.statuses(response), ["borrowed"])
+        self.assertEqual(BorrowRecord.objects.get().member, self.other)
+
+    def test_duplicates_run_out_of_copies(self):
+        response = self.bulk_borrow(self.member_user, [self.book.pk] * 3 + [999999])
+
+        self.assertEqual(
+            self.statuses(response), ["borrowed", "borrowed", "unavailable", "not_found"]
+        )
+        self.assertEqual(response.data["borrowed"], 2)
+        ids = [result.get("id") for result in response.data["results"]]
+        self.assertEqual(set(ids[:2]), set(BorrowRecord.objects.values_list("pk", flat=True)))
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 0)
+
+    def test_ready_hold_is_claimed_instead_of_a_shelf_copy(self):
+        hold = Hold.objects.create(member=self.member, book=self.held, status=Hold.READY)
+
+        response = self.bulk_borrow(self.member_user, [self.held.pk, self.held.pk])
+
+        self.assertEqual(self.statuses(response), ["borrowed", "unavailable"])
+        hold.refresh_from_db()
+        self.assertEqual(hold.status, Hold.FULFILLED)
+        self.held.refresh_from_db()
+        self.assertEqual(self.held.available_copies, 0)
+        # --> Someone else's ready hold is no copy for this member
+        Hold.objects.create(member=self.other, book=self.book, status=Hold.READY)
+        self.book.available_copies = 0
+        self.book.save(update_fields=["available_copies"])
+        response = self.bulk_borrow(self.member_user, [self.book.pk])
+        self.assertEqual(self.statuses(response), ["unavailable"])
+
+    def test_counters_move_once_per_loan(self):
+        Hold.objects.create(member=self.member, book=self.held, status=Hold.READY)
+
+        self.bulk_borrow(self.member_user, [self.book.pk, self.book.pk, self.held.pk])
+
+        self.assertEqual(
+            dict(BookPopularity.objects.values_list("book_id", "borrow_count")),
+            {self.book.pk: 2, self.held.pk: 1},
+        )
+        self.assertEqual(
+            dict(DailyBorrowCount.objects.values_list("book_id", "borrow_count")),
+            {self.book.pk: 2, self.held.pk: 1},
+        )
+        rollups = CirculationRollup.objects.filter(grain=CirculationRollup.DAY)
+        self.assertEqual(rollups.get(dimension="all").loans, 3)
+        self.assertEqual(rollups.get(dimension="book", key=self.book.pk).loans, 2)
+
+
+class BulkReturnTests(TestCase):
+    """---bulk-return/ through the viewset queryset (select_related by the serializer)---"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.book = make_book(total_copies=3, available_copies=1)
+        cls.librarian = User.objects.create_user("desk@example.com", "pw", is_staff=True)
+        cls.member_user = User.objects.create_user("reader@example.com", "pw")
+        cls.member = cls.member_user.member_profile
+
+    def setUp(self):
+        self.client = APIClient()
+        self.loans = [
+            BorrowRecord.objects.create(member=self.member, book=self.book) for _ in range(2)
+        ]
+
+    def bulk_return(self, user, records):
+        self.client.force_authenticate(user)
+        return self.client.post(
+            "/api/v1/borrow-records/bulk-return/", {"records": records}, format="json"
+        )
+
+    def test_librarian_returns_a_stack(self):
+        response = self.bulk_return(self.librarian, [loan.pk for loan in self.loans] + [999999])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["returned"], 2)
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["returned", "returned", "not_found"],
+        )
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 3)
+        self.assertFalse(BorrowRecord.objects.filter(is_returned=False).exists())
+
+    def test_member_returns_own_loans_once(self):
+        other = User.objects.create_user("other@example.com", "pw").member_profile
+        foreign = BorrowRecord.objects.create(member=other, book=self.book)
+        records = [self.loans[0].pk, self.loans[0].pk, foreign.pk]
+
+        response = self.bulk_return(self.member_user, records)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["returned", "already_returned", "not_found"],
+        )
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 2)
+        foreign.refresh_from_db()
+        self.assertFalse(foreign.is_returned)
+
+
+class BorrowRecordListQueryTests(TestCase):
+    """---GET borrow-records/ costs the same handful of queries at 1k records as at 1---"""
+
+    # --> Token user (user cache miss), COUNT(*), page joined to book, member, user and fine
+    QUERIES = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        author = Author.objects.create(first_name="Ann", last_name="Lee")
+        category = Category.objects.create(name="Fiction")
+        books = Book.objects.bulk_create(
+            Book(title=f"Book {i}", isbn=f"isbn-{i}", author=author, category=category)
+            for i in range(20)
+        )
+        cls.librarian = User.objects.create_user("desk@example.com", "pw", is_staff=True)
+        cls.member_user = User.objects.create_user("reader@example.com", "pw")
+        other = User.objects.create_user("other@example.com", "pw").member_profile
+        members = [cls.member_user.member_profile, other]
+        records = BorrowRecord.objects.bulk_create(
+            BorrowRecord(member=members[i % 2], book=books[i % len(books)]) for i in range(1000)
+        )
+        Fine.objects.bulk_create(
+            Fine(borrow_record=record, amount="1.50") for record in records[::7]
+        )
+
+    def setUp(self):
+        user_cache.clear()
+
+    def assert_list_budget(self, user, expected_count):
+        headers = jwt(user)
+        with self.assertNumQueries(self.QUERIES):
+            response = self.client.get("/api/v1/borrow-records/", **headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], expected_count)
+        self.assertTrue(all("fine_amount" in row for row in response.data["results"]))
+
+    def test_librarian(self):
+        self.assert_list_budget(self.librarian, 1000)
+
+    def test_member(self):
+        self.assert_list_budget(self.member_user, 500)
+
+    def test_list_is_a_page_not_the_whole_table(self):
+        response = self.client.get("/api/v1/borrow-records/", **jwt(self.librarian))
+
+        self.assertEqual(set(response.data), {"count", "next", "previous", "results"})
+        self.assertEqual(len(response.data["results"]), 10)
+
+
+class ContentionTests(TransactionTestCase):
+    """---checkout/return_loan from many threads at once: the conditional UPDATEs decide---"""
+
+    THREADS = 8
+
+    def setUp(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("threads need a shared test database (PostgreSQL or SQLite TEST NAME)")
+
+    def test_last_copy_goes_to_one_member(self):
+        book = make_book(total_copies=1, available_copies=1)
+        members = [
+            User.objects.create_user(f"reader{i}@example.com", "pw").member_profile
+            for i in range(self.THREADS)
+        ]
+
+        outcomes = run_together(lambda member: checkout(member, book), members)
+
+        self.assertEqual(sum(isinstance(o, BorrowRecord) for o in outcomes), 1, outcomes)
+        self.assertEqual(sum(isinstance(o, BookUnavailable) for o in outcomes), self.THREADS - 1)
+        self.assertEqual(BorrowRecord.objects.count(), 1)
+        book.refresh_from_db()
+        self.assertEqual(book.available_copies, 0)
+
+    def test_double_return_restocks_once(self):
+        book = make_book(total_copies=2, available_copies=1)
+        member = User.objects.create_user("reader@example.com", "pw").member_profile
+        loan = BorrowRecord.objects.create(member=member, book=book)
+        # --> Every desk loaded the loan before any of them returned it
+        copies = [BorrowRecord.objects.get(pk=loan.pk) for _ in range(self.THREADS)]
+
+        outcomes = run_together(return_loan, copies)
+
+        self.assertEqual(sum(isinstance(o, AlreadyReturned) for o in outcomes), self.THREADS - 1)
+        self.assertEqual(sum(not isinstance(o, Exception) for o in outcomes), 1, outcomes)
+        book.refresh_from_db()
+        self.assertEqual(book.available_copies, 2)
+
+
+class CirculationRollupTests(TestCase):
+    """---Rollups kept by circulation events agree with rebuild() and with the loans---"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.book = make_book(total_copies=5, available_copies=5)
+        cls.other_book = Book.objects.create(
+            title="Emma",
+            isbn="9780141439587",
+            author=Author.objects.create(first_name="Jane", last_name="Austen"),
+            category=Category.objects.create(name="Classics"),
+            total_copies=5,
+            available_copies=5,
+        )
+        cls.members = [
+            User.objects.create_user(f"reader{i}@example.com", "pw").member_profile
+            for i in range(2)
+        ]
+
+    def snapshot(self):
+        fields = ("grain", "dimension", "key", "day", *analytics.METRICS)
+        return sorted(CirculationRollup.objects.values_list(*fields))
+
+    def test_events_match_rebuild(self):
+        late = BorrowRecord.objects.create(member=self.members[0], book=self.book)
+        on_time = BorrowRecord.objects.create(member=self.members[1], book=self.other_book)
+        BorrowRecord.objects.create(member=self.members[1], book=self.book)
+        BorrowRecord.objects.filter(pk=late.pk).update(due_date=date.today() - timedelta(days=10))
+        late.refresh_from_db()
+
+        self.assertGreater(return_loan(late), 0)
+        return_loan(on_time)
+        fine = Fine.objects.get(borrow_record=late)
+        fine.paid = True
+        fine.save()
+
+        incremental = self.snapshot()
+        analytics.rebuild()
+
+        self.assertEqual(self.snapshot(), incremental)
+        overall = CirculationRollup.objects.get(grain=CirculationRollup.DAY, dimension="all")
+        self.assertEqual((overall.loans, overall.returns, overall.overdue_returns), (3, 2, 1))
+        self.assertEqual(overall.fines_assessed, fine.amount)
+        self.assertEqual(overall.fines_paid, fine.amount)
+
+    def test_reports_cover_partial_months_from_day_rows(self):
+        days = [
+            date(2025, 1, 10),
+            date(2025, 1, 20),
+            date(2025, 2, 5),
+            date(2025, 2, 28),
+            date(2025, 3, 10),
+            date(2025, 3, 11),
+        ]
+        for i, day in enumerate(days):
+            loan = BorrowRecord.objects.create(
+                member=self.members[i % 2], book=self.book if i % 3 else self.other_book
+            )
+            BorrowRecord.objects.filter(pk=loan.pk).update(borrow_date=day)
+        analytics.rebuild()
+        start, end = date(2025, 1, 15), date(2025, 3, 10)
+
+        by_month = analytics.report("all", start, end, period="month")
+        totals = analytics.totals("category", start, end)
+
+        self.assertEqual([row["loans"] for row in by_month], [1, 2, 1])
+        self.assertEqual(
+            {row["key"]: row["loans"] for row in totals},
+            {self.book.category_id: 3, self.other_book.category_id: 1},
+        )
+        by_day = analytics.report("all", start, end, period="day")
+        self.assertEqual(sum(row["loans"] for row in by_day), 4)
+
+
+@override_settings(LIBRARY_FINES={"PER_DAY": "10.00", "CAP": "500.00"})
+class FineAccrualTests(TestCase):
+    """---accrue_fines upserts unpaid fines up to the cap, skips paid ones, and can rerun---"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.book = make_book(total_copies=9, available_copies=9)
+        cls.member = User.objects.create_user("reader@example.com", "pw").member_profile
+        cls.today = date.today()
+
+    def loan(self, days_late, **fields):
+        loan = BorrowRecord.objects.create(member=self.member, book=self.book, **fields)
+        BorrowRecord.objects.filter(pk=loan.pk).update(
+            due_date=self.today - timedelta(days=days_late)
+        )
+        return loan
+
+    def amounts(self):
+        return dict(Fine.objects.values_list("borrow_record_id", "amount"))
+
+    def test_upserts_new_and_stale_fines(self):
+        new = self.loan(3)
+        stale = self.loan(2)
+        Fine.objects.create(borrow_record=stale, amount="10.00")
+        self.loan(-1)  # --> Not due yet
+        self.loan(5, is_returned=True, return_date=self.today)
+
+        stats = accrue_fines(as_of=self.today)
+
+        self.assertEqual(stats, {"scanned": 2, "upserted": 2})
+        self.assertEqual(self.amounts(), {new.pk: Decimal("30.00"), stale.pk: Decimal("20.00")})
+
+    def test_paid_fines_are_left_alone(self):
+        paid = self.loan(8)
+        Fine.objects.create(borrow_record=paid, amount="50.00", paid=True)
+
+        self.assertEqual(accrue_fines(as_of=self.today), {"scanned": 0, "upserted": 0})
+        self.assertEqual(self.amounts(), {paid.pk: Decimal("50.00")})
+
+    def test_capped(self):
+        loan = self.loan(200)
+
+        accrue_fines(as_of=self.today)
+        self.assertEqual(self.amounts(), {loan.pk: Decimal("500.00")})
+
+        accrue_fines(as_of=self.today, cap="5000")
+        self.assertEqual(self.amounts(), {loan.pk: MAX_FINE})
+
+    @override_settings(LIBRARY_FINES={"PER_DAY": "10.00", "CAP": None})
+    def test_uncapped_stops_at_what_the_column_holds(self):
+        loans = [self.loan(3), self.loan(365)]
+
+        accrue_fines(as_of=self.today, batch_size=1)
+
+        self.assertEqual(MAX_FINE, Decimal("999.99"))
+        self.assertEqual(self.amounts(), {loans[0].pk: Decimal("30.00"), loans[1].pk: MAX_FINE})
+
+    def test_rerun_writes_nothing(self):
+        for days_late in (1, 4, 90):
+            self.loan(days_late)
+        first = accrue_fines(as_of=self.today, batch_size=2)
+        amounts = self.amounts()
+
+        with self.assertNumQueries(3):  # --> Two keyset batches and the empty end, no writes
+            again = accrue_fines(as_of=self.today, batch_size=2)
+
+        self.assertEqual((first["upserted"], again), (3, {"scanned": 3, "upserted": 0}))
+        self.assertEqual(self.amounts(), amounts)
+        # --> A day later every fine below the cap moves
+        self.assertEqual(accrue_fines(as_of=self.today + timedelta(days=1))["upserted"], 2)
+
+    def test_command_refuses_bad_amounts(self):
+        for option, value in (("--rate", "ten"), ("--cap", "-5"), ("--rate", "NaN")):
+            with self.subTest(option=option, value=value):
+                with self.assertRaisesMessage(CommandError, value):
+                    call_command("accrue_fines", option, value, stdout=StringIO())
+        self.assertFalse(Fine.objects.exists())
+
+    def test_command_reports_the_run(self):
+        self.loan(3)
+        output = StringIO()
+
+        call_command("accrue_fines", "--rate", "1.50", stdout=output)
+
+        self.assertIn("Scanned 1 overdue loans, upserted 1 fines", output.getvalue())
+        self.assertEqual(Fine.objects.get().amount, Decimal("4.50"))
+
+
+class HoldQueueTests(TestCase):
+    """---Returned copies go to the head of the queue; lapsed pickups pass them on---"""
+
+    def setUp(self):
+        self.book = make_book(total_copies=1, available_copies=1)
+        self.reader, self.first, self.second = [
+            User.objects.create_user(f"{name}@example.com", "pw").member_profile
+            for name in ("reader", "first", "second")
+        ]
+        self.loan = checkout(self.reader, self.book)
+        self.holds = [place_hold(member, self.book) for member in (self.first, self.second)]
+
+    def statuses(self):
+        return [Hold.objects.get(pk=hold.pk).status for hold in self.holds]
+
+    def shelf(self):
+        self.book.refresh_from_db()
+        return self.book.available_copies
+
+    def test_return_sets_the_copy_aside_for_the_first_in_line(self):
+        return_loan(self.loan)
+
+        self.assertEqual(self.statuses(), [Hold.READY, Hold.WAITING])
+        self.assertEqual(self.shelf(), 0)
+        self.assertIsNotNone(Hold.objects.get(pk=self.holds[0].pk).expires_at)
+        with self.assertRaises(BookUnavailable):
+            checkout(self.second, self.book)
+
+        checkout(self.first, self.book)
+
+        self.assertEqual(self.statuses(), [Hold.FULFILLED, Hold.WAITING])
+        self.assertEqual(self.shelf(), 0)
+
+    def test_lapsed_pickup_passes_the_copy_on_then_restocks(self):
+        return_loan(self.loan)
+        expires_at = Hold.objects.get(pk=self.holds[0].pk).expires_at
+
+        self.assertEqual(expire_holds(expires_at)["expired"], 0)
+        result = expire_holds(expires_at + timedelta(seconds=1))
+
+        self.assertEqual((result["expired"], result["readied"]), (1, 1))
+        self.assertEqual(self.statuses(), [Hold.EXPIRED, Hold.READY])
+        self.assertEqual(self.shelf(), 0)
+
+        result = expire_holds(timezone.now() + timedelta(days=30))
+
+        self.assertEqual((result["expired"], result["readied"], result["restocked"]), (1, 0, 1))
+        self.assertEqual(self.statuses(), [Hold.EXPIRED, Hold.EXPIRED])
+        self.assertEqual(self.shelf(), 1)
+
+    def test_cancelled_ready_hold_goes_to_the_next_member(self):
+        return_loan(self.loan)
+
+        cancel_hold(self.holds[0])
+
+        self.assertEqual(self.statuses(), [Hold.CANCELLED, Hold.READY])
+        self.assertEqual(self.shelf(), 0)
+
+    def test_no_hold_while_a_copy_is_on_the_shelf(self):
+        return_loan(self.loan)
+        cancel_hold(self.holds[0])
+        cancel_hold(self.holds[1])
+
+        self.assertEqual(self.shelf(), 1)
+        with self.assertRaises(BookAvailable):
+            place_hold(self.first, self.book)
+
+
+class MemberDashboardTests(TestCase):
+    """---members/me/dashboard/ counts, its cache, and what invalidates it---"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.book = make_book(total_copies=9, available_copies=9)
+        cls.user, cls.other = [
+            User.objects.create_user(f"{name}@example.com", "pw") for name in ("reader", "other")
+        ]
+        member = cls.user.member_profile
+        cls.today = date.today()
+        cls.loans = {}
+        for name, due_in in (("soon", 2), ("later", 10), ("late", -5), ("paid", -1), ("back", -9)):
+            loan = BorrowRecord.objects.create(member=member, book=cls.book)
+            BorrowRecord.objects.filter(pk=loan.pk).update(
+                due_date=cls.today + timedelta(days=due_in), is_returned=name == "back"
+            )
+            cls.loans[name] = loan
+        Fine.objects.create(borrow_record=cls.loans["late"], amount="50.00")
+        Fine.objects.create(borrow_record=cls.loans["paid"], amount="10.00", paid=True)
+        Fine.objects.create(borrow_record=cls.loans["back"], amount="7.50")
+        foreign = BorrowRecord.objects.create(member=cls.other.member_profile, book=cls.book)
+        BorrowRecord.objects.filter(pk=foreign.pk).update(due_date=cls.today - timedelta(days=3))
+
+    def setUp(self):
+        get_cache().clear()
+        user_cache.clear()
+
+    def dashboard(self, query=""):
+        return self.client.get(f"/api/v1/members/me/dashboard/{query}", **jwt(self.user))
+
+    def summary(self, response):
+        summary = response.json()["summary"]
+        return {name: summary[name] for name in ("on_loan", "due_soon", "overdue")}
+
+    def test_counts(self):
+        response = self.dashboard()
+
+        data = response.json()
+        self.assertEqual(
+            data["summary"],
+            {
+                "on_loan": 4,
+                "due_soon": 1,
+                "overdue": 2,
+                "borrowed_total": 5,
+                "unpaid_fines": 57.5,
+            },
+        )
+        self.assertEqual(
+            [(loan["id"], loan["overdue"], loan["due_soon"]) for loan in data["loans"]],
+            [
+                (self.loans["late"].pk, True, False),
+                (self.loans["paid"].pk, True, False),
+                (self.loans["soon"].pk, False, True),
+                (self.loans["later"].pk, False, False),
+            ],
+        )
+        self.assertEqual(self.summary(self.dashboard("?days=10"))["due_soon"], 2)
+        self.assertEqual(self.dashboard("?days=61").status_code, 400)
+
+    def test_second_request_is_a_cache_hit(self):
+        first = self.dashboard()
+        with self.assertNumQueries(0):  # --> Token user and dashboard both cached
+            second = self.dashboard()
+
+        self.assertEqual((first["X-Cache"], second["X-Cache"]), ("MISS", "HIT"))
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(self.dashboard("?days=10")["X-Cache"], "MISS")
+
+    def test_borrow_and_return_invalidate(self):
+        self.dashboard()
+        with self.captureOnCommitCallbacks(execute=True):
+            checkout(self.other.member_profile, self.book)
+        self.assertEqual(self.dashboard()["X-Cache"], "HIT")  # --> Someone else's loan
+
+        with self.captureOnCommitCallbacks(execute=True):
+            loan = checkout(self.user.member_profile, self.book)
+        response = self.dashboard()
+        self.assertEqual((response["X-Cache"], self.summary(response)["on_loan"]), ("MISS", 5))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            return_loan(loan)
+        response = self.dashboard()
+        self.assertEqual((response["X-Cache"], self.summary(response)["on_loan"]), ("MISS", 4))
+
+    def test_accrual_invalidates(self):
+        self.dashboard()
+        with self.captureOnCommitCallbacks(execute=True):
+            accrue_fines(as_of=self.today)
+
+        response = self.dashboard()
+
+        # --> Only the other member's fine was written, but accrual drops every dashboard
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["summary"]["unpaid_fines"], 57.5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            accrue_fines(as_of=self.today + timedelta(days=1))
+
+        response = self.dashboard()
+        # --> late: 6 days at 10.00
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()["summary"]["unpaid_fines"], 67.5)
+
+
+@override_settings(
+    LIBRARY_HOLDS={"STREAM_TIMEOUT": 1, "HEARTBEAT": 1, "POLL_INTERVAL": 0.01, "WAIT_TIMEOUT": 5}
+)
+class AsyncHoldsReadyTests(TestCase):
+    """---async/holds/ready/ lists what the hold list shows as ready, by long-poll or SSE---"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.member = [
+            User.objects.create_user(f"{name}@example.com", "pw") for name in ("reader", "first")
+        ]
+        cls.librarian = User.objects.create_user("desk@example.com", "pw", is_staff=True)
+
+    def setUp(self):
+        get_cache().clear()
+        book = make_book(total_copies=1, available_copies=1)
+        loan = checkout(self.reader.member_profile, book)
+        self.hold = place_hold(self.member.member_profile, book)
+        with self.captureOnCommitCallbacks(execute=True):
+            return_loan(loan)
+        self.hold.refresh_from_db()
+
+    def aget(self, query="", user=None, **headers):
+        if user is not None:
+            token = TokenObtainPairSerializer.get_token(user).access_token
+            headers["Authorization"] = f"JWT {token}"
+
+        async def get():
+            response = await self.async_client.get(
+                f"/api/v1/async/holds/ready/{query}", headers=headers
+            )
+            if response.streaming:  # --> Read the event stream until the server closes it
+                events = [chunk.decode() async for chunk in response.streaming_content]
+                return response, "".join(events)
+            return response
+
+        return async_to_sync(get)()
+
+    def test_long_poll_answers_with_the_ready_holds(self):
+        response = self.aget("?timeout=0", self.member)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Cache-Control"], "private, no-cache")
+        listed = self.client.get("/api/v1/holds/", **jwt(self.member)).json()["results"]
+        ready = [hold for hold in listed if hold["status"] == Hold.READY]
+        data = response.json()
+        self.assertEqual(
+            [
+                (h["id"], h["book"]["id"], h["book"]["title"], parse_datetime(h["ready_at"]))
+                for h in data["holds"]
+            ],
+            [(h["id"], h["book"], h["book_title"], parse_datetime(h["ready_at"])) for h in ready],
+        )
+        self.assertEqual(data["cursor"], data["holds"][-1]["ready_at"])
+
+    def test_since_skips_holds_already_seen(self):
+        cursor = self.aget("?timeout=0", self.member).json()["cursor"]
+
+        data = self.aget(f"?timeout=0&since={cursor.replace('+', '%2B')}", self.member).json()
+
+        self.assertEqual(data, {"holds": [], "cursor": cursor})
+
+    def test_refused(self):
+        cases = [
+            ("?timeout=0", None, 401),
+            ("?timeout=0", self.librarian, 403),
+            ("?timeout=6", self.member, 400),
+            ("?timeout=soon", self.member, 400),
+            ("?since=yesterday", self.member, 400),
+        ]
+        for query, user, status in cases:
+            with self.subTest(query=query, user=user):
+                self.assertEqual(self.aget(query, user).status_code, status)
+
+    def test_event_stream(self):
+        response, stream = self.aget("", self.member, Accept="text/event-stream")
+
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = stream.split("\n\n")
+        self.assertEqual(events[0], "retry: 5000")
+        self.assertTrue(events[1].startswith(f"id: {self.hold.ready_at.isoformat()}\n"))
+        self.assertIn("event: hold-ready", events[1])
+        self.assertEqual(events[2], ": keep-alive")
+
+
+class PopularBooksTests(TestCase):
+    """---books/popular/: windows over the daily buckets, ?category= on the counters---"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fiction = Category.objects.create(name="Fiction")
+        cls.science = Category.objects.create(name="Science")
+        cls.recent, cls.steady, cls.old = [
+            Book.objects.create(title=title, isbn=f"isbn-{title}", category=category)
+            for title, category in (
+                ("Recent", cls.science),
+                ("Steady", cls.fiction),
+                ("Old", cls.fiction),
+            )
+        ]
+        today = date.today()
+        for days_ago, counts in (
+            (0, {cls.recent: 3, cls.steady: 1}),
+            (20, {cls.steady: 5}),
+            (60, {cls.old: 10}),
+        ):
+            record_borrows(
+                {(book.pk, book.category_id): count for book, count in counts.items()},
+                today - timedelta(days=days_ago),
+            )
+
+    def setUp(self):
+        get_cache().clear()
+
+    def popular(self, **params):
+        response = self.client.get("/api/v1/books/popular/", params)
+        self.assertEqual(response.status_code, 200)
+        return [book["title"] for book in response.json()]
+
+    def test_windows(self):
+        self.assertEqual(self.popular(window="7d"), ["Recent", "Steady"])
+        self.assertEqual(self.popular(window="30d"), ["Steady", "Recent"])
+        self.assertEqual(self.popular(window="all"), ["Old", "Steady", "Recent"])
+        self.assertEqual(self.popular(), self.popular(window="all"))
+
+    def test_category(self):
+        self.assertEqual(self.popular(category=self.fiction.pk), ["Old", "Steady"])
+        self.assertEqual(self.popular(window="7d", category=self.fiction.pk), ["Steady"])
+
+    def test_category_follows_a_moved_book(self):
+        self.recent.category = self.fiction
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recent.save()
+
+        self.assertEqual(self.popular(category=self.fiction.pk), ["Old", "Steady", "Recent"])
+        self.assertEqual(self.popular(window="7d", category=self.science.pk), [])
+
+    def test_bad_parameters(self):
+        for params in ({"window": "1y"}, {"category": "fiction"}):
+            response = self.client.get("/api/v1/books/popular/", params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn(next(iter(params)), response.json())
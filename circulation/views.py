@@ -2,12 +2,32 @@ from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
-from django.utils import timezone
 
+from catalog.paginations import LibraryPagination
+from circulation.dashboard import DUE_SOON_DAYS, MAX_DUE_SOON_DAYS, get_dashboard
+from circulation.holds import with_positions
 from circulation.permissions import IsLibrarian, IsMember
-from circulation.models import BorrowRecord
-from circulation.serializers import BorrowRecordSerializer
+from circulation.models import BorrowRecord, Hold
+from circulation.serializers import (
+    BorrowRecordSerializer,
+    BulkBorrowSerializer,
+    BulkReturnSerializer,
+    HoldSerializer,
+)
+from circulation.services import (
+    AlreadyReturned,
+    BORROWED,
+    HoldClosed,
+    RETURNED,
+    bulk_checkout,
+    bulk_return,
+    cancel_hold,
+    return_loan,
+)
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 
 
@@ -17,17 +37,28 @@ class BorrowRecordViewSet(ModelViewSet):
     - Librarians: Full access to all records
     - Members: Access only to their own borrow records
     - Custom endpoint: return/ (mark book as returned, calculate fines)
+    - Desk endpoints: bulk-borrow/, bulk-return/ (many books in one request)
+    - Pagination: ?page=N, or keyset cursors with ?pagination=cursor; the list
+      is a {count, next, previous, results} page, no longer a bare array
     """
 
     def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return BorrowRecord.objects.none()
+
         user = self.request.user
-        if user.is_staff:
-            return BorrowRecord.objects.all()
-        return BorrowRecord.objects.filter(member=user.member_profile)
+        records = BorrowRecord.objects.all()
+        if not user.is_staff:
+            # --> member_profile arrives with the authenticated user, no lookup here
+            member = getattr(user, "member_profile", None)
+            records = records.filter(member=member) if member else records.none()
+        return self.get_serializer_class().setup_eager_loading(records)
 
     serializer_class = BorrowRecordSerializer
 
     permission_classes = [IsMember | IsLibrarian]
+    pagination_class = LibraryPagination
+    cursor_ordering = ("-borrow_date", "-id")
 
     @swagger_auto_schema(operation_summary="Retrieve a list of borrow records")
     def list(self, request, *args, **kwargs):
@@ -67,35 +98,16 @@ class BorrowRecordViewSet(ModelViewSet):
             # Retrieve the BorrowRecord instance (borrow)
             borrow = self.get_object()
 
-            # Check if already returned
-            if borrow.is_returned:
+            # Close the loan, put the copy back and assess any fine in one
+            # transaction; a concurrent second return is rejected
+            try:
+                fine_amount = return_loan(borrow)
+            except AlreadyReturned:
                 return Response(
                     {"message": "Book is already returned."},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            # Set return_date and mark returned
-            borrow.return_date = timezone.now().date()
-            borrow.is_returned = True
-            borrow.save()
-
-            # Increase the available copies of the book
-            book = borrow.book
-            book.available_copies += 1
-            book.save()
-
-            # Fine calculation if returned late
-            fine_amount = 0
-            if borrow.return_date > borrow.due_date:
-                days_late = (borrow.return_date - borrow.due_date).days
-                fine_amount = days_late * 10  # e.g., 10 taka per day late
-
-                # Create Fine record
-                Fine.objects.create(
-                    borrow_record=borrow,
-                    amount=fine_amount,
-                )
-
             # Return success response with details
             return Response(
                 {
@@ -115,3 +127,146 @@ class BorrowRecordViewSet(ModelViewSet):
                 {"error": "Borrow record not found."},
                 status=status.HTTP_404_NOT_FOUND,
             )
+
+    @swagger_auto_schema(
+        operation_summary="Borrow several books at once",
+        operation_description="Check out a stack of books in one transaction; "
+        "each book gets its own status (borrowed, unavailable, not_found)",
+        request_body=BulkBorrowSerializer,
+        responses={200: "Per-book results", 400: "Bad Request"},
+    )
+    @action(detail=False, methods=["post"], url_path="bulk-borrow")
+    def bulk_borrow_books(self, request):
+        serializer = BulkBorrowSerializer(data=request.data, context={"request": request})
+        serializer.is_valid(raise_exception=True)
+
+        results = bulk_checkout(
+            serializer.validated_data["member"],
+            serializer.validated_data["books"],
+        )
+        return Response(
+            {
+                "borrowed": sum(r["status"] == BORROWED for r in results),
+                "results": results,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+    @swagger_auto_schema(
+        operation_summary="Return several books at once",
+        operation_description="Return a stack of borrow records in one transaction; "
+        "each record gets its own status (returned, already_returned, not_found)",
+        request_body=BulkReturnSerializer,
+        responses={200: "Per-record results", 400: "Bad Request"},
+    )
+    @action(detail=False, methods=["post"], url_path="bulk-return")
+    def bulk_return_books(self, request):
+        serializer = BulkReturnSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = bulk_return(self.get_queryset(), serializer.validated_data["records"])
+        return Response(
+            {
+                "returned": sum(r["status"] == RETURNED for r in results),
+                "results": results,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class MemberDashboardView(APIView):
+    """
+    The signed-in member's dashboard in one request
+    - Current loans with book titles and cover URLs, soonest due first
+    - Counts: on loan, due within ?days=N (default 3), overdue; unpaid fines
+    - Cached per member until their next borrow/return (X-Cache: HIT/MISS)
+    """
+
+    permission_classes = [IsMember]
+
+    @swagger_auto_schema(
+        operation_summary="Member dashboard: current loans, due soon, overdue, fines",
+        manual_parameters=[
+            openapi.Parameter(
+                "days",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_INTEGER,
+                description=f"Due-soon window in days (default {DUE_SOON_DAYS})",
+            ),
+        ],
+    )
+    def get(self, request):
+        member = getattr(request.user, "member_profile", None)
+        if member is None:
+            raise NotFound("No member profile for this account.")
+
+        days = request.query_params.get("days", str(DUE_SOON_DAYS))
+        if not days.isdigit() or int(days) > MAX_DUE_SOON_DAYS:
+            raise ValidationError({"days": f"Must be a whole number from 0 to {MAX_DUE_SOON_DAYS}."})
+
+        data, hit = get_dashboard(member, int(days), request.build_absolute_uri)
+        response = Response(data)
+        response["X-Cache"] = "HIT" if hit else "MISS"
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+
+class HoldViewSet(ModelViewSet):
+    """
+    FIFO hold queues for books with no copy on the shelf
+    - Members: place (POST {"book": id}), list and cancel their own holds
+    - Librarians: every hold, filtered with ?status= and ?book=
+    - A returned copy goes straight to the head of the queue: the hold turns
+      "ready" until expires_at; borrowing the book picks it up
+    - DELETE cancels (the hold is kept, with status "cancelled")
+    - Wait for "ready" with GET /async/holds/ready/ (long-poll or SSE)
+    """
+
+    serializer_class = HoldSerializer
+    permission_classes = [IsMember | IsLibrarian]
+    pagination_class = LibraryPagination
+    cursor_ordering = ("-created_at", "-id")
+    http_method_names = ["get", "post", "delete", "head", "options"]
+
+    def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return Hold.objects.none()
+
+        user = self.request.user
+        holds = Hold.objects.select_related("book").defer(
+            "book__search_vector", "book__description"
+        )
+        if user.is_staff:
+            status_filter = self.request.query_params.get("status")
+            if status_filter:
+                holds = holds.filter(status=status_filter)
+            book = self.request.query_params.get("book")
+            if book:
+                if not book.isdigit():
+                    raise ValidationError({"book": "Must be a book id."})
+                holds = holds.filter(book_id=book)
+        else:
+            member = getattr(user, "member_profile", None)
+            holds = holds.filter(member=member) if member else holds.none()
+        return with_positions(holds).order_by("-created_at", "-id")
+
+    def get_permissions(self):
+        if self.action == "create":
+            return [IsMember()]
+        return super().get_permissions()
+
+    @swagger_auto_schema(
+        operation_summary="Cancel a hold",
+        operation_description="Withdraw a waiting or ready hold; a copy set aside "
+        "for it goes to the next member in line",
+        responses={204: "Cancelled", 400: "Hold already closed", 404: "Not Found"},
+    )
+    def destroy(self, request, *args, **kwargs):
+        try:
+            cancel_hold(self.get_object())
+        except HoldClosed:
+            return Response(
+                {"message": "This hold is no longer active."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'library_management.settings')
+# --> Lets settings default DB_CONN_MAX_AGE to 0: connections opened for async
+#     requests are not closed between them
+os.environ.setdefault('LIBRARY_ASGI', 'True')
 
 application = get_asgi_application()
@@ -0,0 +1,160 @@
+"""
+Precomputed OpenAPI schema and docs pages
+- The schema is generated once per code version into API_SCHEMA["DIR"]
+  (manage.py generate_openapi at deploy, or lazily on the first docs hit)
+- Each process keeps the JSON and the rendered /swagger/ and /redoc/ pages
+  in memory, so docs traffic does no introspection
+- The UIs load /openapi.<version>.json, which never changes and is cached
+  for a year; the pages revalidate with an ETag of the version
+"""
+
+import hashlib
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson
+from drf_yasg.generators import OpenAPISchemaGenerator
+from drf_yasg.renderers import ReDocRenderer, SwaggerUIRenderer
+
+
+API_INFO = openapi.Info(
+    title="Library-Management-System --> API",
+    default_version="v1",
+    description="API documentation for Library-Management-System.",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="snazmulhossains24@gmail.com"),
+    license=openapi.License(name="BSD License"),
+)
+
+# --> Source folders whose code shapes the schema (used when no version is configured)
+SOURCE_DIRS = ("api", "catalog", "circulation", "users", "library_management")
+
+_lock = threading.Lock()
+_version = None
+_schema = {}  # --> version -> JSON bytes
+_pages = {}  # --> (version, ui) -> HTML
+
+
+def _config():
+    return getattr(settings, "API_SCHEMA", {})
+
+
+def code_version():
+    """
+    Version the artifact is keyed by
+    - API_SCHEMA["VERSION"] when set (e.g. the deploy's git commit)
+    - otherwise a hash of the project's Python sources and drf_yasg's version
+    """
+
+    global _version
+    if _version is None:
+        version = _config().get("VERSION")
+        if not version:
+            import drf_yasg
+
+            digest = hashlib.sha256(drf_yasg.__version__.encode())
+            for folder in SOURCE_DIRS:
+                for path in sorted((Path(settings.BASE_DIR) / folder).rglob("*.py")):
+                    digest.update(str(path.relative_to(settings.BASE_DIR)).encode())
+                    digest.update(path.read_bytes())
+            version = digest.hexdigest()
+        _version = version[:12]
+    return _version
+
+
+def artifact_path(version=None):
+    folder = Path(_config().get("DIR", Path(settings.BASE_DIR) / "schema"))
+    return folder / f"openapi-{version or code_version()}.json"
+
+
+def build_schema():
+    """---Introspect every endpoint; host and scheme are left to the client---"""
+
+    generator = OpenAPISchemaGenerator(API_INFO)
+    return OpenAPICodecJson(validators=[]).encode(generator.get_schema(None, public=True))
+
+
+def write_schema(force=False):
+    """
+    Write the artifact for the current version, removing older ones
+    Returns (path, written) where written is False when it already existed.
+    """
+
+    path = artifact_path()
+    if path.exists() and not force:
+        return path, False
+    data = build_schema()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_suffix(".tmp")
+    temporary.write_bytes(data)
+    temporary.replace(path)  # --> Readers never see a half-written file
+    for stale in path.parent.glob("openapi-*.json"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    with _lock:
+        _schema[code_version()] = data
+    return path, True
+
+
+def get_schema():
+    """---JSON bytes for the current version: memory, then the artifact, then generated---"""
+
+    version = code_version()
+    data = _schema.get(version)
+    if data is not None:
+        return data
+    with _lock:
+        if version not in _schema:
+            path = artifact_path(version)
+            if path.exists():
+                _schema[version] = path.read_bytes()
+            else:
+                _schema[version] = build_schema()
+                try:
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    path.write_bytes(_schema[version])
+                except OSError:
+                    pass  # --> Read-only deploys (serverless) keep it in memory only
+        return _schema[version]
+
+
+class _VersionedSpecMixin:
+    """---Point the UI at the immutable /openapi.<version>.json---"""
+
+    spec_url = None
+
+    def get_swagger_ui_settings(self):
+        return {**super().get_swagger_ui_settings(), "url": self.spec_url}
+
+    def get_redoc_settings(self):
+        return {**super().get_redoc_settings(), "url": self.spec_url}
+
+
+class _SwaggerUI(_VersionedSpecMixin, SwaggerUIRenderer):
+    pass
+
+
+class _ReDoc(_VersionedSpecMixin, ReDocRenderer):
+    pass
+
+
+UI_RENDERERS = {"swagger": _SwaggerUI, "redoc": _ReDoc}
+
+
+def get_page(ui, request, spec_url):
+    """---Rendered /swagger/ or /redoc/ page, once per version and process---"""
+
+    key = (code_version(), ui)
+    page = _pages.get(key)
+    if page is None:
+        renderer = UI_RENDERERS[ui]()
+        renderer.spec_url = spec_url
+        # --> The page only needs the title and version; paths come from spec_url
+        stub = openapi.Swagger(
+            info=API_INFO, _prefix="/", _version="v1", paths=openapi.Paths({})
+        )
+        page = renderer.render(stub, renderer.media_type, {"request": request})
+        _pages[key] = page
+    return page
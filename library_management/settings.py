@@ -1,6 +1,7 @@
 from datetime import timedelta
 from pathlib import Path
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 import cloudinary
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -18,6 +19,15 @@ DEBUG = False
 
 ALLOWED_HOSTS = [".vercel.app", "127.0.0.1"]
 
+# --> Serverless functions (vercel.json) are frozen once the response is sent, so
+#     nothing may be left running in the background there. Detected from VERCEL /
+#     AWS_LAMBDA_FUNCTION_NAME; SERVERLESS=True/False overrides
+SERVERLESS = config(
+    "SERVERLESS",
+    default=bool(config("VERCEL", default="") or config("AWS_LAMBDA_FUNCTION_NAME", default="")),
+    cast=bool,
+)
+
 
 AUTH_USER_MODEL = "users.User"
 
@@ -38,7 +48,6 @@ INSTALLED_APPS = [
     "django_filters",
     "rest_framework",
     "djoser",
-    "debug_toolbar",
     #
     "api",
     "catalog",
@@ -51,11 +60,11 @@ INTERNAL_IPS = [
 ]
 
 MIDDLEWARE = [
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
+    "api.middleware.PerformanceMiddleware",  # --> First, so its timings cover the whole stack
     #
     "django.middleware.security.SecurityMiddleware",
     #
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "api.middleware.StaticFilesMiddleware",  # --> WhiteNoise, async-capable for the ASGI app
     #
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -65,6 +74,21 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# --> Django Debug Toolbar is for development only: DEBUG_TOOLBAR=True to enable it
+DEBUG_TOOLBAR = config("DEBUG_TOOLBAR", default=False, cast=bool)
+if DEBUG_TOOLBAR:
+    INSTALLED_APPS.append("debug_toolbar")
+    MIDDLEWARE.insert(1, "debug_toolbar.middleware.DebugToolbarMiddleware")
+
+# --> Request metrics (api.metrics): a Prometheus endpoint at /metrics, scraped with
+#     Authorization: Bearer <METRICS_TOKEN> (off when unset), and a Server-Timing
+#     header (SERVER_TIMING=True; off by default, it tells any client the query count)
+LIBRARY_METRICS = {
+    "SERVER_TIMING": config("SERVER_TIMING", default=False, cast=bool),
+    "TOKEN": config("METRICS_TOKEN", default=""),
+    "BUCKETS": (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+}
+
 ROOT_URLCONF = "library_management.urls"
 
 TEMPLATES = [
@@ -106,6 +130,79 @@ DATABASES = {
     }
 }
 
+# --> How workers hold database connections (DB_CONNECTION_MODE)
+#     persistent: one connection per worker thread, reused for DB_CONN_MAX_AGE
+#                 seconds and health-checked before each request reuses it;
+#                 under ASGI (asgi.py sets LIBRARY_ASGI) DB_CONN_MAX_AGE defaults
+#                 to 0, since connections of async requests are never handed back
+#     pool:       psycopg 3 connection pool per process (pip install "psycopg[binary,pool]"),
+#                 DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE connections, checked on checkout
+#     none:       a new connection for every request
+#     Live counts per worker: GET /api/v1/health/db/ (api.dbstats)
+DB_CONNECTION_MODE = config("DB_CONNECTION_MODE", default="persistent")
+LIBRARY_ASGI = config("LIBRARY_ASGI", default=False, cast=bool)
+
+if DB_CONNECTION_MODE == "persistent":
+    DATABASES["default"]["CONN_MAX_AGE"] = config(
+        "DB_CONN_MAX_AGE", default=0 if LIBRARY_ASGI else 60, cast=int
+    )
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+elif DB_CONNECTION_MODE == "pool":
+    try:
+        from psycopg_pool import ConnectionPool
+    except ImportError:
+        raise ImproperlyConfigured(
+            "DB_CONNECTION_MODE=pool needs psycopg 3 and psycopg_pool: "
+            'pip install "psycopg[binary,pool]"'
+        )
+
+    DATABASES["default"]["CONN_MAX_AGE"] = 0  # --> Required with a pool; the pool keeps them open
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": config("DB_POOL_MIN_SIZE", default=2, cast=int),
+            "max_size": config("DB_POOL_MAX_SIZE", default=10, cast=int),
+            "timeout": config("DB_POOL_TIMEOUT", default=10, cast=int),
+            "max_idle": config("DB_POOL_MAX_IDLE", default=300, cast=int),
+            "check": ConnectionPool.check_connection,
+        }
+    }
+elif DB_CONNECTION_MODE != "none":
+    raise ImproperlyConfigured(
+        f"DB_CONNECTION_MODE must be persistent, pool or none, not {DB_CONNECTION_MODE!r}"
+    )
+
+
+# Cache
+# --> "catalog" holds rendered-ready catalog responses (catalog.cache).
+#     The default LocMemCache is per process: invalidate() after a borrow or
+#     return only reaches the worker that handled it. With more than one
+#     worker use a shared backend, e.g. Redis (needs the redis package):
+#     CATALOG_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+#     CATALOG_CACHE_LOCATION=redis://127.0.0.1:6379/1
+#     or the database cache (python manage.py createcachetable first):
+#     CATALOG_CACHE_BACKEND=django.core.cache.backends.db.DatabaseCache
+#     CATALOG_CACHE_LOCATION=library_catalog_cache
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "catalog": {
+        "BACKEND": config(
+            "CATALOG_CACHE_BACKEND",
+            default="django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": config("CATALOG_CACHE_LOCATION", default="catalog-responses"),
+        "TIMEOUT": config("CATALOG_CACHE_TTL", default=300, cast=int),
+        "OPTIONS": {
+            # --> Size bound; LocMemCache evicts least recently used entries
+            "MAX_ENTRIES": config("CATALOG_CACHE_MAX_ENTRIES", default=2000, cast=int),
+        },
+    },
+}
+# --> On LocMemCache, book responses and dashboards (availability, loans) live
+#     this many seconds instead of CATALOG_CACHE_TTL (catalog.cache.live_timeout)
+CATALOG_CACHE_LOCAL_TTL = config("CATALOG_CACHE_LOCAL_TTL", default=10, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -141,6 +238,16 @@ cloudinary.config(
 # --> Media storage settings
 DEFAULT_FILE_STORAGE = "cloudinary_storage.storage.MediaCloudinaryStorage"
 
+# --> Covers and photos (catalog.images): where originals go, how derivatives are built
+LIBRARY_IMAGES = {
+    "BACKEND": config(
+        "IMAGE_STORAGE_BACKEND", default="catalog.images.CloudinaryImageStorage"
+    ),  # --> catalog.images.LocalImageStorage for offline development
+    # --> Derivatives on a background pool after the response; inline at upload on serverless
+    "ASYNC": config("IMAGE_DERIVATIVES_ASYNC", default=not SERVERLESS, cast=bool),
+    "WORKERS": 2,
+}
+
 
 LANGUAGE_CODE = "en-us"
 
@@ -170,14 +277,51 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 REST_FRAMEWORK = {
     "COERCE_DECIMAL_TO_STRING": False,
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.CachedJWTAuthentication",
+    ),
+}
+
+# --> Per-process cache of authenticated users (users.authentication.user_cache)
+AUTH_USER_CACHE = {
+    "MAX_ENTRIES": config("AUTH_USER_CACHE_MAX_ENTRIES", default=10000, cast=int),
+    "TTL": config("AUTH_USER_CACHE_TTL", default=60, cast=int),
+}
+
+
+# --> Overdue fines (circulation.fines): amount per day late, capped per loan; with
+#     CAP None a fine still stops at 999.99, the most Fine.amount can hold
+LIBRARY_FINES = {
+    "PER_DAY": "10.00",
+    "CAP": "500.00",
+}
+
+# --> Bulk member import (users.importers): rows per INSERT batch and password
+#     hashing processes (default: one per CPU)
+LIBRARY_MEMBER_IMPORT = {
+    "BATCH_SIZE": config("MEMBER_IMPORT_BATCH_SIZE", default=1000, cast=int),
+    "WORKERS": config("MEMBER_IMPORT_WORKERS", default=0, cast=int),
+    # --> Hashing processes per upload to members/import/ (1 = in the request process)
+    "REQUEST_WORKERS": config(
+        "MEMBER_IMPORT_REQUEST_WORKERS", default=1 if SERVERLESS else 2, cast=int
     ),
 }
 
+# --> Hold queues (circulation.holds): days a returned copy waits for the member
+#     at the head of the queue, and the /async/holds/ready/ long-poll/SSE limits
+LIBRARY_HOLDS = {
+    "PICKUP_DAYS": config("HOLD_PICKUP_DAYS", default=3, cast=int),
+    "WAIT_TIMEOUT": 30,  # --> Longest long-poll, seconds
+    "STREAM_TIMEOUT": 300,  # --> Idle seconds before an event stream is closed
+    "HEARTBEAT": 15,
+    "POLL_INTERVAL": 1.0,  # --> Cache check per waiting client
+    "RECHECK_INTERVAL": 10,  # --> Database check, for notifications from other processes
+}
+
 
 SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("JWT",),
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
+    "TOKEN_OBTAIN_SERIALIZER": "users.serializers.TokenObtainPairSerializer",
 }
 
 
@@ -192,6 +336,13 @@ DJOSER = {
     },
 }
 
+# --> Precomputed OpenAPI schema (library_management.schema); generate it at
+#     deploy with manage.py generate_openapi, otherwise the first docs hit does
+API_SCHEMA = {
+    "VERSION": config("APP_VERSION", default=config("VERCEL_GIT_COMMIT_SHA", default="")),
+    "DIR": BASE_DIR / "schema",
+}
+
 SWAGGER_SETTINGS = {
     "SECURITY_DEFINITIONS": {
         "Bearer": {
@@ -200,11 +351,29 @@ SWAGGER_SETTINGS = {
             "in": "header",
             "description": "JWT Authorization header using the Bearer scheme. Example: `JWT <your_token>`",
         },
-    }
+    },
+    # --> The API only takes JWTs; without the session login button the docs
+    #     page has no per-user content and is rendered once (library_management.schema)
+    "USE_SESSION_AUTH": False,
 }
 
 
-EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+# --> Mail goes out over SMTP from the request. EMAIL_BACKEND=api.mail.QueuedEmailBackend
+#     only writes it to the outbox instead; then something must run
+#     manage.py send_queued_email (a worker, or --once from cron), which delivers it
+#     through LIBRARY_EMAIL["DELIVERY_BACKEND"] with these SMTP settings
+EMAIL_BACKEND = config("EMAIL_BACKEND", default="django.core.mail.backends.smtp.EmailBackend")
+LIBRARY_EMAIL = {
+    "DELIVERY_BACKEND": config(
+        "EMAIL_DELIVERY_BACKEND", default="django.core.mail.backends.smtp.EmailBackend"
+    ),
+    "BATCH_SIZE": config("EMAIL_BATCH_SIZE", default=100, cast=int),
+    "MAX_ATTEMPTS": 8,
+    "BACKOFF": 30,  # --> Seconds before the first retry, doubling per attempt
+    "MAX_BACKOFF": 6 * 3600,
+    "LEASE": 300,  # --> Seconds a claimed batch is hidden from other workers
+    "POLL_INTERVAL": 2,
+}
 EMAIL_HOST = config("EMAIL_HOST")
 EMAIL_USE_TLS = config("EMAIL_USE_TLS", cast=bool)
 EMAIL_PORT = config("EMAIL_PORT")
@@ -1,46 +1,35 @@
 from django.contrib import admin
 from django.urls import path, include
-from debug_toolbar.toolbar import debug_toolbar_urls
 
-from .views import api_root_view
+from api.views import metrics_view
+
+from .views import api_root_view, docs_page, openapi_schema
 
 from django.conf.urls.static import static
 from django.conf import settings
 
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Library-Management-System --> API",
-        default_version="v1",
-        description="API documentation for Library-Management-System.",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="snazmulhossains24@gmail.com"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
-
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view, name="metrics"),
     path("", api_root_view),  # --> Opening Page...
     path("api/v1/", include("api.urls"), name="api-root"),
     #
+    # --> Docs are served from a precomputed schema (library_management.schema)
+    path("swagger/", docs_page("swagger"), name="schema-swagger-ui"),
+    path("redoc/", docs_page("redoc"), name="schema-redoc"),
+    path("openapi.json", openapi_schema, name="openapi-schema"),
     path(
-        "swagger/",
-        schema_view.with_ui("swagger", cache_timeout=0),
-        name="schema-swagger-ui",
+        "openapi.<str:version>.json",
+        openapi_schema,
+        name="openapi-schema-versioned",
     ),
-    path(
-        "redoc/",
-        schema_view.with_ui("redoc", cache_timeout=0),
-        name="schema-redoc",
-    ),
-] + debug_toolbar_urls()
+]
+
+if settings.DEBUG_TOOLBAR:
+    from debug_toolbar.toolbar import debug_toolbar_urls
+
+    urlpatterns += debug_toolbar_urls()
 
 
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
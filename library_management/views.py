@@ -1,4 +1,59 @@
+from django.http import HttpResponse
 from django.shortcuts import redirect
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import etag, require_GET
+
+from library_management import schema
+
+# --> Docs pages may change with a deploy, so browsers recheck them (a 304 is free)
+DOCS_MAX_AGE = 300
+
 
 def api_root_view(request):
     return redirect("api-root")
+
+
+def _schema_etag(request, *args, **kwargs):
+    return schema.code_version()
+
+
+def _schema_response():
+    return HttpResponse(schema.get_schema(), content_type="application/json")
+
+
+@require_GET
+@etag(_schema_etag)
+def openapi_schema(request, version=None):
+    """
+    The precomputed OpenAPI schema
+    - /openapi.<version>.json never changes: cached for a year, immutable
+    - /openapi.json always means the current version and is rechecked
+    """
+
+    if version is not None and version != schema.code_version():
+        return redirect("openapi-schema-versioned", version=schema.code_version())
+    response = _schema_response()
+    if version is None:
+        patch_cache_control(response, public=True, max_age=DOCS_MAX_AGE)
+    else:
+        patch_cache_control(response, public=True, max_age=31536000, immutable=True)
+    return response
+
+
+def docs_page(ui):
+    @require_GET
+    @etag(_schema_etag)
+    def view(request):
+        if request.GET.get("format") in ("openapi", "json"):
+            # --> drf_yasg's old spec URL (/swagger/?format=openapi) keeps working
+            response = _schema_response()
+        else:
+            spec_url = reverse(
+                "openapi-schema-versioned", kwargs={"version": schema.code_version()}
+            )
+            response = HttpResponse(schema.get_page(ui, request, spec_url))
+        patch_cache_control(response, public=True, max_age=DOCS_MAX_AGE)
+        return response
+
+    return view
@@ -0,0 +1,120 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+# --> Identity claims written into every token at login (see users.serializers)
+STAFF_CLAIM = "is_staff"
+MEMBER_CLAIM = "member_id"
+
+
+def identity_claims(user):
+    member = getattr(user, "member_profile", None)
+    return {STAFF_CLAIM: user.is_staff, MEMBER_CLAIM: member.pk if member else None}
+
+
+class UserCache:
+    """
+    Bounded, TTL'd per-process cache of authenticated users
+    - LRU eviction beyond max_entries, entries expire after ttl seconds
+    - Users are stored with member_profile already joined, so permission
+      checks and member-scoped querysets never go back to the database
+    - Invalidated on User/Member save (users.signals); other processes
+      catch up within ttl
+    """
+
+    def __init__(self, max_entries=10000, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+        # --> Hand out a copy so one request mutating request.user can't leak into another
+        return copy.copy(user)
+
+    def set(self, user):
+        with self._lock:
+            self._entries[user.pk] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user.pk)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _build_user_cache():
+    config = getattr(settings, "AUTH_USER_CACHE", {})
+    return UserCache(
+        max_entries=config.get("MAX_ENTRIES", 10000), ttl=config.get("TTL", 60)
+    )
+
+
+user_cache = _build_user_cache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the token's user from user_cache
+    - Cache hit: zero identity queries
+    - Cache miss: one query (User joined to its Member), then cached
+    - Tokens whose is_staff / member_id claims no longer match the account
+      are rejected, so a demoted librarian has to log in again
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = user_cache.get(user_id)
+        if user is None:
+            try:
+                user = self.user_model.objects.select_related("member_profile").get(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            user_cache.set(user)
+            user = copy.copy(user)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+
+        for claim, value in identity_claims(user).items():
+            if claim in validated_token and validated_token[claim] != value:
+                raise AuthenticationFailed(
+                    _("Token claims are out of date"), code="token_not_valid"
+                )
+        return user
@@ -0,0 +1,47 @@
+"""
+Password hashing across processes
+- PBKDF2 is CPU-bound and holds the GIL, so hashing thousands of passwords
+  only scales with processes
+- Workers are spawned, not forked (the caller may be a threaded web
+  worker), and unpickle what they run by importing it: this module must
+  not import models, the workers set Django up only in their initializer
+- Where processes can't be started (no sem_open on AWS Lambda / Vercel)
+  hashing stays in the calling process
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+
+
+def _setup_worker():
+    import django
+
+    django.setup()
+
+
+def password_pool(workers):
+    """---Process pool for hash_passwords(), or None when one process is all there is---"""
+
+    if workers < 2:
+        return None
+    try:
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_setup_worker,
+        )
+    except (ImportError, NotImplementedError, OSError):
+        return None
+
+
+def hash_passwords(passwords, pool=None):
+    """---make_password() over a list, in the pool when there is one---"""
+
+    if pool is None or len(passwords) < 2:
+        return [make_password(password) for password in passwords]
+    # --> A few chunks per worker: fewer round trips, still balanced
+    chunk = max(len(passwords) // ((os.cpu_count() or 1) * 4), 1)
+    return list(pool.map(make_password, passwords, chunksize=chunk))
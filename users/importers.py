@@ -0,0 +1,184 @@
+"""
+Bulk member onboarding
+- Rows (CSV: email, first_name, last_name, password, phone_number,
+  address) are streamed into batches; each batch is validated together:
+  email syntax and field lengths per row, duplicates within the file, and
+  addresses already registered in one query per batch; both ignore letter
+  case, so Ann@example.org and ann@example.org are one member
+- Passwords are hashed in a process pool (users.hashing), a batch at a
+  time; rows without one get an unusable password and set it through the
+  password reset flow
+- Each batch is two INSERTs, User then Member, in one transaction:
+  bulk_create skips post_save, so users.signals.create_member_profile never
+  runs and the profiles are created set-wise instead
+"""
+
+import os
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from catalog.importers import clean_fields
+from users.hashing import hash_passwords, password_pool
+from users.models import Member, User
+
+
+USER_FIELDS = ("first_name", "last_name")
+MEMBER_FIELDS = ("phone_number", "address")
+
+# --> Only the first rows with errors are listed; the rest are counted
+MAX_REPORTED_ERRORS = 1000
+
+
+def import_config():
+    config = getattr(settings, "LIBRARY_MEMBER_IMPORT", {})
+    return {
+        "BATCH_SIZE": config.get("BATCH_SIZE", 1000),
+        "WORKERS": config.get("WORKERS") or os.cpu_count() or 1,
+        "REQUEST_WORKERS": config.get("REQUEST_WORKERS", 2),
+    }
+
+
+class MemberImporter:
+    """
+    Streaming member import; feed() rows, then finish() and close()
+    - The hashing pool (workers processes) is only started once a batch has
+      passwords to hash
+    - dry_run validates everything (including registered emails) without
+      writing or hashing
+    - stats: rows, created, errors; errors: [(row number, message)]
+    - abort() instead of finish() when the file can't be read to the end:
+      batches already written stay, the rest is dropped
+    """
+
+    def __init__(self, batch_size=None, workers=None, dry_run=False):
+        config = import_config()
+        self.batch_size = batch_size or config["BATCH_SIZE"]
+        self.workers = workers or config["WORKERS"]
+        self.pool = None
+        self.dry_run = dry_run
+        self.seen = set()  # --> Emails earlier in the file
+        self.pending = []
+        self.stats = {"rows": 0, "created": 0, "errors": 0}
+        self.errors = []
+
+    def error(self, number, message):
+        self.stats["errors"] += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((number, message))
+
+    def feed(self, number, record):
+        self.stats["rows"] += 1
+        try:
+            row = self.clean(record)
+        except ValueError as error:
+            self.error(number, str(error))
+            return
+        if row["email"].lower() in self.seen:
+            self.error(number, f"email {row['email']} appears earlier in the file")
+            return
+        self.seen.add(row["email"].lower())
+        self.pending.append((number, row))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def clean(self, record):
+        if not isinstance(record, dict):
+            raise ValueError("expected a row of named columns")
+        email = User.objects.normalize_email((record.get("email") or "").strip())
+        if not email:
+            raise ValueError("email is required")
+        try:
+            validate_email(email)
+        except ValidationError:
+            raise ValueError(f"{email!r} is not a valid email address")
+        for name in (*USER_FIELDS, *MEMBER_FIELDS):
+            if isinstance(record.get(name), str):
+                record[name] = record[name].strip()
+        row = {
+            "email": email,
+            "password": record.get("password") or None,
+            "user": clean_fields(User, USER_FIELDS, record),
+            "member": clean_fields(Member, MEMBER_FIELDS, record),
+        }
+        if row["password"]:
+            # --> The same AUTH_PASSWORD_VALIDATORS as signup
+            try:
+                validate_password(row["password"], User(email=email, **row["user"]))
+            except ValidationError as error:
+                raise ValueError(f"password: {' '.join(error.messages)}")
+        return row
+
+    def registered(self, emails):
+        """---Which of emails already have an account, lowercased: one lookup on Lower(email)---"""
+
+        return set(
+            User.objects.annotate(email_lower=Lower("email"))
+            .filter(email_lower__in={email.lower() for email in emails})
+            .values_list("email_lower", flat=True)
+        )
+
+    def flush(self):
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        taken = self.registered([row["email"] for _, row in batch])
+        rows = []
+        for number, row in batch:
+            if row["email"].lower() in taken:
+                self.error(number, f"email {row['email']} is already registered")
+            else:
+                rows.append((number, row))
+        if self.dry_run:
+            self.stats["created"] += len(rows)  # --> Would be created
+            return
+        if not rows:
+            return
+
+        passwords = {number: row["password"] for number, row in rows if row["password"]}
+        if len(passwords) > 1 and self.pool is None:
+            self.pool = password_pool(self.workers)
+        hashes = dict(zip(passwords, hash_passwords(list(passwords.values()), self.pool)))
+        users = [
+            User(
+                email=row["email"],
+                password=hashes.get(number) or make_password(None),
+                is_active=True,
+                **row["user"],
+            )
+            for number, row in rows
+        ]
+        try:
+            with transaction.atomic():
+                users = User.objects.bulk_create(users)
+                Member.objects.bulk_create(
+                    [Member(user=user, **row["member"]) for user, (_, row) in zip(users, rows)]
+                )
+        except IntegrityError:
+            # --> Someone registered one of these addresses meanwhile: report it, keep the rest
+            if not self.registered([row["email"] for _, row in rows]):
+                raise
+            self.pending = rows
+            self.flush()
+            return
+        self.stats["created"] += len(users)
+
+    def finish(self):
+        self.flush()
+        self.errors.sort()  # --> Registered emails are only found at flush time
+        return self.stats
+
+    def abort(self):
+        self.pending = []
+        self.errors.sort()
+        return self.stats
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
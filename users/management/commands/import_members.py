@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.importers import iter_records
+from users.importers import MemberImporter, import_config
+
+
+class Command(BaseCommand):
+    help = (
+        "Create member accounts from a CSV file with a header row (email, "
+        "first_name, last_name, password, phone_number, address; only email is "
+        "required). Streams the file in batches, hashes passwords in a process "
+        "pool and inserts users and their member profiles in bulk. Rows without a "
+        "password get an unusable one (members then use the password reset flow)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--batch-size", type=int, help="Default: LIBRARY_MEMBER_IMPORT")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Password hashing processes (default: LIBRARY_MEMBER_IMPORT, else CPU count)",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Validate every row, write nothing"
+        )
+
+    def handle(self, *args, **options):
+        config = import_config()
+        batch_size = options["batch_size"] or config["BATCH_SIZE"]
+        workers = options["workers"] or config["WORKERS"]
+        if batch_size < 1 or workers < 1:
+            raise CommandError("--batch-size and --workers must be at least 1")
+
+        importer = MemberImporter(batch_size, workers, dry_run=options["dry_run"])
+        start = time.perf_counter()
+        file_error = None
+        try:
+            with open(options["path"], encoding="utf-8-sig", newline="") as stream:
+                for number, record in iter_records(stream, "csv"):
+                    importer.feed(number, record)
+            stats = importer.finish()
+        except (OSError, ValueError) as error:
+            stats = importer.abort()
+            if options["dry_run"] or not stats["created"]:
+                raise CommandError(str(error))
+            file_error = error  # --> Report what was created before failing
+        finally:
+            importer.close()
+        elapsed = time.perf_counter() - start
+
+        for number, message in importer.errors:
+            self.stderr.write(f"  row {number}: {message}")
+        if stats["errors"] > len(importer.errors):
+            self.stderr.write(f"  ... and {stats['errors'] - len(importer.errors)} more")
+
+        verb = "Would create" if options["dry_run"] else "Created"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Read {stats['rows']} rows in {elapsed:.2f}s "
+                f"({stats['rows'] / elapsed if elapsed else 0:.0f} rows/s): "
+                f"{verb} {stats['created']} members, {stats['errors']} rejected."
+            )
+        )
+        if file_error is not None:
+            raise CommandError(
+                f"Stopped reading {options['path']}: {file_error}. The members above were "
+                "created; importing the fixed file again reports them as already registered."
+            )
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:55
+
+import catalog.images
+import catalog.validators
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_alter_member_profile_picture'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='member',
+            name='profile_picture',
+            field=catalog.images.LibraryImageField(blank=True, kind='photo', null=True, validators=[catalog.validators.validate_file_size], verbose_name='profile_picture'),
+        ),
+    ]
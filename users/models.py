@@ -1,9 +1,10 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractUser
 from users.managers import CustomUserManager
 
 from catalog.validators import validate_file_size
-from cloudinary.models import CloudinaryField
+from catalog.images import LibraryImageField
 
 
 class User(AbstractUser):
@@ -18,6 +19,12 @@ class User(AbstractUser):
     def __str__(self):
         return self.email
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # --> Registered-email checks ignore letter case (users.importers)
+            models.Index(Lower("email"), name="user_email_lower_idx"),
+        ]
+
 
 class Member(models.Model):
     user = models.OneToOneField(
@@ -28,8 +35,9 @@ class Member(models.Model):
     membership_date = models.DateField(auto_now_add=True)
     address = models.TextField(blank=True, null=True)
     phone_number = models.CharField(max_length=20, blank=True, null=True)
-    profile_picture = CloudinaryField(
+    profile_picture = LibraryImageField(
         "profile_picture",
+        kind="photo",
         blank=True,
         null=True,
         validators=[validate_file_size],
@@ -1,5 +1,10 @@
 from djoser.serializers import UserCreateSerializer as BaseUserCreateSerializer
 from djoser.serializers import UserSerializer as BaseUserSerializer
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer as BaseTokenObtainPairSerializer,
+)
+
+from users.authentication import identity_claims
 
 
 class UserCreateSerializer(BaseUserCreateSerializer):
@@ -24,3 +29,14 @@ class UserSerializer(BaseUserSerializer):
             "last_name",
         )
         read_only_fields = ("id", "email", "password")
+
+
+class TokenObtainPairSerializer(BaseTokenObtainPairSerializer):
+    """---Login tokens carry is_staff / member_id so auth can skip identity lookups---"""
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim, value in identity_claims(user).items():
+            token[claim] = value  # --> refresh copies these into each access token
+        return token
@@ -1,5 +1,7 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from users.authentication import user_cache
 from users.models import User, Member
 
 
@@ -8,3 +10,21 @@ def create_member_profile(sender, instance, created, **kwargs):
     if created:
         if not instance.is_staff and not instance.is_superuser:
             Member.objects.create(user=instance)
+
+
+def _forget_user(user_id):
+    # --> Now, and again at commit so a request racing the write can't re-cache old data
+    user_cache.invalidate(user_id)
+    transaction.on_commit(lambda: user_cache.invalidate(user_id))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    _forget_user(instance.pk)
+
+
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+def invalidate_cached_member(sender, instance, **kwargs):
+    _forget_user(instance.user_id)
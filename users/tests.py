@@ -1,3 +1,188 @@
-from django.test import TestCase
+import tempfile
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient, APIRequestFactory
+
+from users import hashing
+from users.authentication import CachedJWTAuthentication, user_cache
+from users.importers import MemberImporter
+from users.models import Member, User
+from users.serializers import TokenObtainPairSerializer
+
+
+def members_csv(count, tail=b""):
+    rows = [f"member{i}@example.org,Member,{i}" for i in range(count)]
+    return ("email,first_name,last_name\n" + "\n".join(rows) + "\n").encode() + tail
+
+
+@override_settings(LIBRARY_MEMBER_IMPORT={"BATCH_SIZE": 50, "REQUEST_WORKERS": 1})
+class MemberImportTests(TestCase):
+    """---Letter case of registered emails, and files that break off halfway---"""
+
+    # --> Past the first decoded chunk, so whole batches are written before the error
+    BROKEN = members_csv(400, tail=b"\xff\xfe,broken\n")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.librarian = User.objects.create_user("desk@example.org", "pw", is_staff=True)
+
+    def upload(self, content):
+        client = APIClient()
+        client.force_authenticate(self.librarian)
+        return client.post(
+            "/api/v1/members/import/",
+            {"file": SimpleUploadedFile("members.csv", content, content_type="text/csv")},
+            format="multipart",
+        )
+
+    def imported(self):
+        return User.objects.filter(email__startswith="member").count()
+
+    def test_registered_emails_ignore_case(self):
+        User.objects.create_user("Ann@Example.org", "pw")
+        importer = MemberImporter(workers=1)
+        for number, email in enumerate(["ann@example.org", "ANN@example.org", "bo@example.org"]):
+            importer.feed(number + 2, {"email": email})
+
+        stats = importer.finish()
+
+        self.assertEqual((stats["created"], stats["errors"]), (1, 2))
+        self.assertIn("already registered", importer.errors[0][1])
+        self.assertIn("appears earlier in the file", importer.errors[1][1])
+        self.assertEqual(User.objects.filter(email__iexact="ann@example.org").count(), 1)
+
+    def test_upload_broken_after_created_batches(self):
+        response = self.upload(self.BROKEN)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(response.data["created"], 0)
+        self.assertEqual(response.data["created"], self.imported())
+        self.assertIn("Unreadable CSV", response.data["file_error"])
+        self.assertEqual(
+            Member.objects.filter(user__email__startswith="member").count(), self.imported()
+        )
+
+    def test_upload_broken_before_anything_was_created(self):
+        response = self.upload(members_csv(3, tail=b"\xff,broken\n"))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.imported(), 0)
+
+    def test_complete_upload_has_no_file_error(self):
+        response = self.upload(members_csv(3))
+
+        self.assertEqual((response.data["created"], response.data["file_error"]), (3, None))
+
+    def test_command_reports_created_members_then_fails(self):
+        with tempfile.NamedTemporaryFile(suffix=".csv") as file:
+            file.write(self.BROKEN)
+            file.flush()
+            output = StringIO()
+            with self.assertRaisesMessage(CommandError, "The members above were created"):
+                call_command("import_members", file.name, "--workers", "1", stdout=output)
+
+        self.assertIn(f"Created {self.imported()} members", output.getvalue())
+        self.assertGreater(self.imported(), 0)
+
+
+class PasswordPoolTests(TestCase):
+    """---No process pool where processes can't start: hashing stays in process---"""
+
+    def test_falls_back_without_sem_open(self):
+        error = OSError(38, "Function not implemented")
+        with mock.patch.object(hashing, "ProcessPoolExecutor", side_effect=error):
+            pool = hashing.password_pool(4)
+
+        self.assertIsNone(pool)
+        hashed = hashing.hash_passwords(["first-secret", "second-secret"], pool)
+        self.assertTrue(User(password=hashed[1]).check_password("second-secret"))
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    """---Token users come from user_cache until a save; stale claims, inactive users fail---"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user("reader@example.org", "pw")
+        cls.librarian = User.objects.create_user("desk@example.org", "pw", is_staff=True)
+
+    def setUp(self):
+        user_cache.clear()
+
+    def token(self, user):
+        return str(TokenObtainPairSerializer.get_token(user).access_token)
+
+    def authenticate(self, token):
+        request = APIRequestFactory().get("/api/v1/books/", HTTP_AUTHORIZATION=f"JWT {token}")
+        return CachedJWTAuthentication().authenticate(request)[0]
+
+    def test_warm_cache_resolves_without_queries(self):
+        token = self.token(self.reader)
+        with self.assertNumQueries(1):  # --> User joined to its Member
+            self.authenticate(token)
+
+        with self.assertNumQueries(0):
+            user = self.authenticate(token)
+            member_id = user.member_profile.pk
+
+        self.assertEqual((user.pk, member_id), (self.reader.pk, self.reader.member_profile.pk))
+
+    def test_demoted_librarian_must_log_in_again(self):
+        token = self.token(self.librarian)
+        self.assertTrue(self.authenticate(token).is_staff)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.librarian.is_staff = False
+            self.librarian.save()
+
+        with self.assertRaisesMessage(AuthenticationFailed, "Token claims are out of date"):
+            self.authenticate(token)
+        self.assertFalse(self.authenticate(self.token(self.librarian)).is_staff)
+
+    def test_token_for_a_removed_member_profile_is_refused(self):
+        token = self.token(self.reader)
+        self.authenticate(token)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Member.objects.filter(user=self.reader).get().delete()
+
+        with self.assertRaisesMessage(AuthenticationFailed, "Token claims are out of date"):
+            self.authenticate(token)
+
+    def test_user_and_member_saves_evict_the_cached_user(self):
+        token = self.token(self.reader)
+        self.authenticate(token)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reader.first_name = "Renamed"
+            self.reader.save()
+        self.assertIsNone(user_cache.get(self.reader.pk))
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate(token).first_name, "Renamed")
+
+        member = Member.objects.get(user=self.reader)
+        with self.captureOnCommitCallbacks(execute=True):
+            member.address = "12 Library Lane"
+            member.save()
+        self.assertIsNone(user_cache.get(self.reader.pk))
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate(token).member_profile.address, "12 Library Lane")
+
+    def test_inactive_user_is_refused_from_the_cache_too(self):
+        token = self.token(self.reader)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reader.is_active = False
+            self.reader.save()
+
+        with self.assertRaisesMessage(AuthenticationFailed, "User is inactive"):
+            self.authenticate(token)
+        self.assertFalse(user_cache.get(self.reader.pk).is_active)
+        with self.assertNumQueries(0), self.assertRaisesMessage(
+            AuthenticationFailed, "User is inactive"
+        ):
+            self.authenticate(token)
@@ -1,3 +1,77 @@
-from django.shortcuts import render
+import io
 
-# Create your views here.
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from catalog.importers import iter_records
+from circulation.permissions import IsLibrarian
+from users.importers import MemberImporter, import_config
+
+
+class MemberImportView(APIView):
+    """
+    Onboard members in bulk from an uploaded CSV (librarians)
+    - Columns: email (required), first_name, last_name, password,
+      phone_number, address; same processing as manage.py import_members
+    - ?dry_run=1 validates every row without creating anyone
+    - Reports per-row errors; valid rows are created even when others fail
+    - A file that can't be read to the end is a 400 when nothing was
+      written, else a 200 with the members created so far and file_error
+    - Hashes with at most LIBRARY_MEMBER_IMPORT["REQUEST_WORKERS"] processes
+    """
+
+    permission_classes = [IsLibrarian]
+    parser_classes = [MultiPartParser]
+
+    @swagger_auto_schema(
+        operation_summary="Bulk import members from CSV",
+        manual_parameters=[
+            openapi.Parameter("file", openapi.IN_FORM, type=openapi.TYPE_FILE, required=True),
+            openapi.Parameter(
+                "dry_run",
+                openapi.IN_QUERY,
+                type=openapi.TYPE_BOOLEAN,
+                description="Validate only",
+            ),
+        ],
+        responses={
+            200: "Counts, per-row errors and file_error (file not read to the end)",
+            400: "Bad Request",
+        },
+    )
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ValidationError({"file": "Upload the CSV as the multipart field 'file'."})
+        dry_run = request.query_params.get("dry_run", "").lower() in ("1", "true", "yes")
+
+        importer = MemberImporter(workers=import_config()["REQUEST_WORKERS"], dry_run=dry_run)
+        file_error = None
+        try:
+            # --> Read straight from the upload (a temp file past FILE_UPLOAD_MAX_MEMORY_SIZE)
+            stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+            for number, record in iter_records(stream, "csv"):
+                importer.feed(number, record)
+            stats = importer.finish()
+        except (UnicodeDecodeError, ValueError) as error:
+            stats = importer.abort()
+            if dry_run or not stats["created"]:
+                raise ValidationError({"file": f"Unreadable CSV: {error}"})
+            file_error = f"Unreadable CSV after {stats['created']} members were created: {error}"
+        finally:
+            importer.close()
+
+        return Response(
+            {
+                "dry_run": dry_run,
+                "rows": stats["rows"],
+                "created": stats["created"],
+                "rejected": stats["errors"],
+                "errors": [{"row": number, "error": message} for number, message in importer.errors],
+                "file_error": file_error,
+            }
+        )